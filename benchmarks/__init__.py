@@ -0,0 +1,11 @@
+"""
+LEANN Benchmarks
+"""
+
+import os
+import sys
+
+# Add packages to path
+_ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(_ROOT, 'packages', 'leann-core', 'src'))
+sys.path.insert(0, os.path.join(_ROOT, 'packages', 'leann-backend-hnsw', 'src'))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency benchmark for LEANN backends (ann-benchmarks style)
+
+Usage:
+    python -m benchmarks.ann_benchmark --sizes 10000 100000 --threads 1 4 8
+    python -m benchmarks.ann_benchmark --text-folder ./docs --sizes 2000
+"""
+
+import os
+import gc
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+import numpy as np
+import faiss
+
+from . import common, datasets
+from leann_backend_hnsw.hnsw_backend import HNSWBuilder, HNSWSearcher
+from leann_backend_hnsw.cascade_backend import CascadeBuilder, CascadeSearcher
+
+# Each config is built once and then swept over its search parameter
+CONFIGS = [
+    {'backend': 'hnsw', 'build': {'m': 16, 'ef_construction': 200},
+     'param': 'ef_search', 'sweep': [16, 32, 64, 128, 256, 512]},
+    {'backend': 'hnsw', 'build': {'m': 32, 'ef_construction': 200},
+     'param': 'ef_search', 'sweep': [16, 32, 64, 128, 256, 512]},
+    {'backend': 'hnsw', 'build': {'m': 16, 'ef_construction': 200, 'build_workers': 4, 'min_parallel_rows': 0},
+     'param': 'ef_search', 'sweep': [16, 32, 64, 128, 256, 512]},
+    {'backend': 'cascade', 'build': {},
+     'param': 'rerank_candidates', 'sweep': [50, 100, 200, 500, 1000, 2000]}
+]
+
+BACKENDS = {
+    'hnsw': (HNSWBuilder, HNSWSearcher),
+    'cascade': (CascadeBuilder, CascadeSearcher)
+}
+
+def ground_truth(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Exact neighbors by brute force"""
+    index = faiss.IndexFlatL2(corpus.shape[1])
+    index.add(corpus)
+    _, ids = index.search(queries, k)
+    return ids
+
+def set_search_param(searcher, param: str, value: int, k: int):
+    """Apply one point of the search parameter sweep"""
+    if param == 'ef_search':
+        searcher.ef_search = {k: value}
+    else:
+        setattr(searcher, param, value)
+
+def measure_queries(searcher, queries: np.ndarray, truth: np.ndarray, k: int,
+                    threads: List[int]) -> Dict[str, Any]:
+    """Recall, latency percentiles and QPS per thread count"""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        # Recall only needs ids, so skip building result dicts
+        _, ids = searcher.search_ids(query, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(ids.tolist()) & set(expected.tolist()))
+        
+    measurement = {'recall': hits / truth.size}
+    measurement.update(common.percentiles(latencies))
+    
+    qps = {}
+    for n in threads:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda q: searcher.search_ids(q, k), queries))
+            qps[n] = len(queries) / (time.perf_counter() - start)
+    measurement['qps'] = qps[threads[0]]
+    measurement['qps_by_threads'] = qps
+    return measurement
+
+def run_config(config: Dict[str, Any], corpus: np.ndarray, queries: np.ndarray,
+               truth: np.ndarray, k: int, threads: List[int], workdir: str) -> List[Dict[str, Any]]:
+    """Build one configuration and sweep its search parameter"""
+    builder_cls, searcher_cls = BACKENDS[config['backend']]
+    documents = [str(i) for i in range(len(corpus))]
+    path = os.path.join(workdir, 'index')
+    
+    gc.collect()
+    rss_before = common.rss_bytes()
+    with common.Timer() as build_timer:
+        builder = builder_cls(dimension=corpus.shape[1], **config['build'])
+        builder.build_index(corpus, documents)
+    with common.Timer() as save_timer:
+        builder.save_index(path)
+    build_ram = common.rss_bytes() - rss_before
+    del builder
+    gc.collect()
+    
+    rss_before = common.rss_bytes()
+    with common.Timer() as load_timer:
+        searcher = searcher_cls()
+        searcher.load_index(path)
+    search_ram = common.rss_bytes() - rss_before
+    
+    label = config['backend'] + ''.join(f" {key}={value}" for key, value in config['build'].items())
+    rows = []
+    for value in config['sweep']:
+        set_search_param(searcher, config['param'], value, k)
+        row = {
+            'backend': config['backend'],
+            'config': label,
+            'build_params': config['build'],
+            'search_param': config['param'],
+            'search_value': value,
+            'size': len(corpus),
+            'dimension': corpus.shape[1],
+            'k': k,
+            'build_s': build_timer.elapsed,
+            'save_s': save_timer.elapsed,
+            'load_s': load_timer.elapsed,
+            'build_ram_bytes': build_ram,
+            'search_ram_bytes': search_ram,
+            'disk_bytes': common.disk_bytes(path)
+        }
+        row.update(measure_queries(searcher, queries, truth, k, threads))
+        rows.append(row)
+        print(f"  {label} {config['param']}={value}: recall={row['recall']:.3f} "
+              f"p50={row['p50_ms']:.2f}ms p99={row['p99_ms']:.2f}ms qps={row['qps']:.0f}")
+              
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency benchmark for LEANN backends")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--backends', nargs='+', default=sorted(BACKENDS))
+    parser.add_argument('--text-folder', help="Embed real text from this folder instead of synthetic vectors")
+    parser.add_argument('--output', default='benchmarks/results')
+    args = parser.parse_args()
+    
+    # One OpenMP thread per query so QPS scaling reflects our thread pool
+    faiss.omp_set_num_threads(1)
+    
+    os.makedirs(args.output, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='leann-bench-')
+    results = []
+    try:
+        for size in args.sizes:
+            if args.text_folder:
+                corpus, queries = datasets.text_corpus(args.text_folder, size, args.queries)
+                dataset = f"text-{len(corpus)}"
+            else:
+                corpus, queries = datasets.synthetic_corpus(size, args.dimension, args.queries)
+                dataset = f"synthetic-{size}"
+            print(f"📊 {dataset}: {len(corpus)} vectors x {corpus.shape[1]} dims, {len(queries)} queries")
+            
+            truth = ground_truth(corpus, queries, args.k)
+            for config in CONFIGS:
+                if config['backend'] not in args.backends:
+                    continue
+                rows = run_config(config, corpus, queries, truth, args.k, args.threads, workdir)
+                for row in rows:
+                    row['dataset'] = dataset
+                results.extend(rows)
+                
+            common.plot_pareto(
+                [r for r in results if r['dataset'] == dataset],
+                os.path.join(args.output, f"{dataset}-recall-qps.png"),
+                group='config', title=f"{dataset} recall@{args.k} vs QPS"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    common.write_json(os.path.join(args.output, 'ann_results.json'), {
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count()
+        },
+        'args': vars(args),
+        'results': results,
+        'pareto': {
+            dataset: common.pareto_front([r for r in results if r['dataset'] == dataset], 'recall', 'qps')
+            for dataset in sorted({r['dataset'] for r in results})
+        }
+    })
+    print(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Shared benchmark helpers
+"""
+
+import os
+import glob
+import json
+import time
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # Peak, not current, but the best we have on this platform
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def disk_bytes(path: str) -> int:
+    """Total size of all files belonging to an index path"""
+    return sum(os.path.getsize(p) for p in glob.glob(glob.escape(path) + '*') if os.path.isfile(p))
+
+def percentiles(latencies: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    ms = np.asarray(latencies) * 1000
+    return {
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99))
+    }
+
+class Timer:
+    """Context manager measuring wall-clock time"""
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+        
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+def pareto_front(points: List[Dict[str, Any]], x: str, y: str) -> List[Dict[str, Any]]:
+    """Points not dominated on (higher x, higher y)"""
+    front = []
+    best_y = -np.inf
+    for point in sorted(points, key=lambda p: (-p[x], -p[y])):
+        if point[y] > best_y:
+            front.append(point)
+            best_y = point[y]
+    return front
+
+def write_json(path: str, data: Any):
+    """Write results as indented JSON"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def plot_pareto(results: List[Dict[str, Any]], path: str, x: str = 'recall',
+                y: str = 'qps', group: str = 'backend', title: Optional[str] = None) -> bool:
+    """Plot y against x per group with the Pareto front highlighted"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("⚠️ matplotlib not installed, skipping plot")
+        return False
+        
+    fig, ax = plt.subplots(figsize=(8, 6))
+    for name in sorted({r[group] for r in results}):
+        points = [r for r in results if r[group] == name]
+        ax.scatter([p[x] for p in points], [p[y] for p in points], label=name, alpha=0.6)
+        front = sorted(pareto_front(points, x, y), key=lambda p: p[x])
+        ax.plot([p[x] for p in front], [p[y] for p in front])
+        
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.set_yscale('log')
+    ax.set_title(title or f"{y} vs {x}")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return True
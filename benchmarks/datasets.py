@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark corpora
+"""
+
+import os
+from typing import List, Tuple
+import numpy as np
+
+TEXT_EXTENSIONS = ['.py', '.txt', '.md', '.json', '.yaml', '.yml', '.csv', '.log', '.js', '.html', '.css', '.xml', '.sql']
+
+def synthetic_corpus(size: int, dimension: int = 384, num_queries: int = 1000,
+                     num_clusters: int = 64, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered Gaussian vectors (closer to real embeddings than uniform noise)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dimension)).astype('float32')
+    
+    def draw(n):
+        assignment = rng.integers(0, num_clusters, n)
+        vectors = centers[assignment] + 0.5 * rng.standard_normal((n, dimension)).astype('float32')
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+    return draw(size), draw(num_queries)
+
+def text_chunks(folder: str, max_chunks: int, chunk_size: int = 1000) -> List[str]:
+    """Read text files from a folder into fixed-size chunks"""
+    chunks = []
+    for root, _, files in os.walk(folder):
+        for file in sorted(files):
+            if not any(file.endswith(ext) for ext in TEXT_EXTENSIONS):
+                continue
+            try:
+                with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            for start in range(0, len(content), chunk_size):
+                chunk = content[start:start + chunk_size]
+                if chunk.strip():
+                    chunks.append(chunk)
+                if len(chunks) >= max_chunks:
+                    return chunks
+    return chunks
+
+def text_corpus(folder: str, size: int, num_queries: int = 200,
+                model_name: str = "all-MiniLM-L6-v2", seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Embed real text chunks; queries are held-out chunks"""
+    from sentence_transformers import SentenceTransformer
+    
+    chunks = text_chunks(folder, size + num_queries)
+    if len(chunks) <= num_queries:
+        raise ValueError(f"Only {len(chunks)} chunks found in {folder}")
+        
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(chunks))
+    model = SentenceTransformer(model_name)
+    embeddings = model.encode([chunks[i] for i in order], batch_size=64,
+                              convert_to_numpy=True).astype('float32')
+    return embeddings[num_queries:], embeddings[:num_queries]
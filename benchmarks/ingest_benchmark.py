@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Ingestion pipeline benchmark with per-stage breakdown
+
+Runs the indexing stages (walk, read/decode, chunk, embed, index add,
+save) against a generated directory tree and reports time share and
+throughput per stage, serial and parallel. Files are walked and chunked
+with leann.ingest and embedded, indexed and saved by LeannBuilder, as the
+CLI and the app do.
+
+Usage:
+    python -m benchmarks.ingest_benchmark --files 2000 --workers 8
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+import numpy as np
+
+from . import common
+from leann import LeannBuilder
+from leann.ingest import iter_files, chunk_text
+
+STAGES = ['walk', 'read', 'chunk', 'embed', 'index_add', 'save']
+
+# Extension -> relative frequency in the generated tree
+FILE_MIX = {
+    '.py': 0.25, '.md': 0.15, '.txt': 0.15, '.json': 0.1, '.csv': 0.05,
+    '.log': 0.1, '.html': 0.05, '.js': 0.05, '.bin': 0.05, '.png': 0.05
+}
+
+WORDS = ("index search vector query embedding graph neighbor chunk file folder "
+         "document model token layer cache memory disk thread latency recall "
+         "def class return import self value result error config path").split()
+
+def generate_tree(root: str, num_files: int, median_kb: float = 4.0, seed: int = 0) -> int:
+    """Write a nested tree of mixed file types with log-normal sizes"""
+    rng = np.random.default_rng(seed)
+    extensions = list(FILE_MIX)
+    probabilities = np.array([FILE_MIX[e] for e in extensions])
+    probabilities /= probabilities.sum()
+    total_bytes = 0
+    for i in range(num_files):
+        ext = extensions[rng.choice(len(extensions), p=probabilities)]
+        folder = Path(root, f"d{i % 17}", f"s{i % 5}")
+        folder.mkdir(parents=True, exist_ok=True)
+        size = int(rng.lognormal(np.log(median_kb * 1024), 1.0))
+        if ext in ('.bin', '.png'):
+            data = rng.bytes(size)
+        else:
+            words = rng.choice(WORDS, size // 6 + 1)
+            lines = [' '.join(words[j:j + 12]) for j in range(0, len(words), 12)]
+            data = '\n'.join(lines).encode('utf-8')[:size]
+        with open(folder / f"f{i}{ext}", 'wb') as f:
+            f.write(data)
+        total_bytes += len(data)
+    return total_bytes
+
+def walk(folders: List[str], max_files: int) -> List[str]:
+    """Collect indexable file paths"""
+    return [path for _, path in iter_files(folders, max_files=max_files)]
+
+def read_file(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def chunk_file(content: str) -> List[str]:
+    return [c for c in chunk_text(content, max_chunk_size=1000) if c.strip()]
+
+def read_and_chunk(path: str) -> Tuple[float, float, int, List[str]]:
+    """Worker: read and chunk one file, timing both stages"""
+    start = time.perf_counter()
+    content = read_file(path)
+    read_time = time.perf_counter() - start
+    start = time.perf_counter()
+    chunks = chunk_file(content)
+    return read_time, time.perf_counter() - start, len(content), chunks
+
+def run_pipeline(folders: List[str], model_name: str, output: str, max_files: int,
+                 workers: int, batch_size: int) -> Dict[str, Any]:
+    """Run all stages, returning seconds and item counts per stage"""
+    stage_time = dict.fromkeys(STAGES, 0.0)
+    # Model loading is not an ingestion stage, so it happens before the clock starts
+    builder = LeannBuilder(embedding_model=model_name)
+    builder.load_model()
+    wall_start = time.perf_counter()
+    
+    start = time.perf_counter()
+    paths = walk(folders, max_files)
+    stage_time['walk'] = time.perf_counter() - start
+    
+    chunks = []
+    total_chars = 0
+    if workers > 1:
+        # Per-file stage times are summed across workers, so scale them to wall time
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(read_and_chunk, paths, chunksize=16))
+        wall = time.perf_counter() - start
+        read_cpu = sum(o[0] for o in outputs)
+        chunk_cpu = sum(o[1] for o in outputs)
+        share = read_cpu / max(read_cpu + chunk_cpu, 1e-12)
+        stage_time['read'] = wall * share
+        stage_time['chunk'] = wall * (1 - share)
+        for _, _, chars, file_chunks in outputs:
+            total_chars += chars
+            chunks.extend(file_chunks)
+    else:
+        for path in paths:
+            read_time, chunk_time, chars, file_chunks = read_and_chunk(path)
+            stage_time['read'] += read_time
+            stage_time['chunk'] += chunk_time
+            total_chars += chars
+            chunks.extend(file_chunks)
+            
+    start = time.perf_counter()
+    embeddings = builder.embed_documents(chunks, batch_size)
+    stage_time['embed'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    builder.build_from_embeddings(embeddings, chunks)
+    stage_time['index_add'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    builder.save_index(output + '.leann')
+    stage_time['save'] = time.perf_counter() - start
+    
+    total = time.perf_counter() - wall_start
+    counts = {
+        'walk': len(paths), 'read': len(paths), 'chunk': len(chunks),
+        'embed': len(chunks), 'index_add': len(chunks), 'save': len(chunks)
+    }
+    return {
+        'files': len(paths),
+        'chunks': len(chunks),
+        'chars': total_chars,
+        'total_s': total,
+        'files_per_s': len(paths) / total,
+        'stages': {
+            stage: {
+                'seconds': stage_time[stage],
+                'share': stage_time[stage] / total,
+                'items_per_s': counts[stage] / stage_time[stage] if stage_time[stage] else None
+            }
+            for stage in STAGES
+        }
+    }
+
+def print_report(label: str, report: Dict[str, Any]):
+    print(f"\n⏱️ {label}: {report['files']} files, {report['chunks']} chunks in "
+          f"{report['total_s']:.2f}s ({report['files_per_s']:.0f} files/s)")
+    for stage in STAGES:
+        s = report['stages'][stage]
+        rate = f"{s['items_per_s']:.0f}/s" if s['items_per_s'] else "-"
+        print(f"  {stage:<10} {s['seconds']:8.3f}s {s['share'] * 100:5.1f}%  {rate}")
+
+def main():
+    parser = argparse.ArgumentParser(description="LEANN ingestion benchmark")
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--median-kb', type=float, default=4.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--folder', help="Benchmark an existing folder instead of a generated tree")
+    parser.add_argument('--output', default='benchmarks/results')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='leann-ingest-')
+    try:
+        if args.folder:
+            folders = [args.folder]
+            generated_bytes = None
+        else:
+            folders = [os.path.join(workdir, 'tree')]
+            generated_bytes = generate_tree(folders[0], args.files, args.median_kb)
+            print(f"📁 Generated {args.files} files ({generated_bytes / 1e6:.1f} MB)")
+            
+        reports = {}
+        for label, workers in [('serial', 1), ('parallel', args.workers)]:
+            reports[label] = run_pipeline(folders, args.model, os.path.join(workdir, label),
+                                          args.files, workers, args.batch_size)
+            reports[label]['workers'] = workers
+            print_report(f"{label} ({workers} workers)", reports[label])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    common.write_json(os.path.join(args.output, 'ingest_results.json'), {
+        'machine': {
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'args': vars(args),
+        'generated_bytes': generated_bytes,
+        'reports': reports
+    })
+    print(f"\n✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Cascade Backend Implementation
+
+Binary (1-bit sign) quantized candidate pass in RAM, exact rerank from
+memory-mapped full-precision vectors.
+"""
+
+import os
+import copy
+import pickle
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+import faiss
+
+def binarize(embeddings: np.ndarray, center: np.ndarray) -> np.ndarray:
+    """Sign-quantize vectors to packed bits"""
+    bits = (np.asarray(embeddings, dtype='float32') - center) > 0
+    return np.packbits(bits, axis=1)
+
+class CascadeBuilder:
+    """Cascade Index Builder"""
+    
+    def __init__(self, dimension: int = 384, rerank_candidates: int = 100):
+        self.dimension = dimension
+        self.rerank_candidates = rerank_candidates
+        self.index = None
+        self.embeddings = None
+        self.center = None
+        self.documents = []
+        self.metadata = []
+        
+    def build_index(self, embeddings: np.ndarray, documents: List[str],
+                   metadata: List[Dict[str, Any]] = None):
+        """Build binary index"""
+        self.documents = documents
+        self.metadata = metadata or []
+        self.embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+        
+        # Center before taking signs so every bit carries information
+        self.center = self.embeddings.mean(axis=0)
+        codes = binarize(self.embeddings, self.center)
+        
+        self.index = faiss.IndexBinaryFlat(codes.shape[1] * 8)
+        self.index.add(codes)
+        
+    def add(self, embeddings: np.ndarray, documents: List[str],
+            metadata: Optional[List[Dict[str, Any]]] = None):
+        """Append vectors (binarized around the existing center)"""
+        embeddings = np.asarray(embeddings, dtype='float32')
+        self.embeddings = np.concatenate([self.embeddings, embeddings])
+        self.index.add(binarize(embeddings, self.center))
+        self.documents = list(self.documents) + list(documents)
+        if metadata:
+            self.metadata = list(self.metadata) + list(metadata)
+            
+    def get_embeddings(self, ids: List[int]) -> np.ndarray:
+        """Get stored vectors for rows"""
+        return self.embeddings[np.asarray(ids, dtype='int64')]
+    
+    def rebuilt(self, embeddings: np.ndarray, documents: List[str],
+                metadata: Optional[List[Dict[str, Any]]] = None) -> 'CascadeBuilder':
+        """New builder over the given rows, re-centering the codes (self is left alone)"""
+        builder = copy.copy(self)
+        builder.build_index(embeddings, list(documents), list(metadata or []))
+        return builder
+        
+    @property
+    def build_params(self) -> Dict[str, Any]:
+        """Parameters the index was built with"""
+        return {'rerank_candidates': self.rerank_candidates}
+        
+    def save_index(self, path: str):
+        """Save index to file"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+        # Save binary codes
+        faiss.write_index_binary(self.index, path + '.faiss')
+        
+        # Save full-precision vectors for memory-mapped rerank
+        np.save(path + '.vectors.npy', self.embeddings)
+        
+        # Save documents and metadata
+        with open(path + '.pkl', 'wb') as f:
+            pickle.dump({
+                'documents': self.documents,
+                'metadata': self.metadata,
+                'center': self.center,
+                'rerank_candidates': self.rerank_candidates
+            }, f)
+            
+    def get_sections(self) -> Dict[str, np.ndarray]:
+        """Index arrays for a single-file container"""
+        return {
+            'graph': faiss.serialize_index_binary(self.index),
+            'vectors': self.embeddings,
+            'center': self.center
+        }
+    
+    def save_graph(self, path: str):
+        """Atomically rewrite codes and vectors, leaving the document store alone"""
+        faiss.write_index_binary(self.index, path + '.faiss.tmp')
+        with open(path + '.vectors.npy.tmp', 'wb') as f:
+            np.save(f, self.embeddings)
+        os.replace(path + '.vectors.npy.tmp', path + '.vectors.npy')
+        os.replace(path + '.faiss.tmp', path + '.faiss')
+    
+    def load_index(self, path: str):
+        """Reopen a saved index for modification"""
+        self.index = faiss.read_index_binary(path + '.faiss')
+        self.embeddings = np.load(path + '.vectors.npy')
+        with open(path + '.pkl', 'rb') as f:
+            data = pickle.load(f)
+        self.documents = data['documents']
+        self.metadata = data['metadata']
+        self.center = data['center']
+        self.rerank_candidates = data['rerank_candidates']
+        self.dimension = self.embeddings.shape[1]
+        
+    def load_sections(self, sections: Dict[str, np.ndarray], documents, metadata,
+                      params: Optional[Dict[str, Any]] = None):
+        """Reopen a container index for modification"""
+        self.index = faiss.deserialize_index_binary(sections['graph'])
+        self.embeddings = np.array(sections['vectors'])
+        self.center = np.array(sections['center'])
+        self.documents = list(documents)
+        self.metadata = list(metadata)
+        self.rerank_candidates = (params or {}).get('rerank_candidates', self.rerank_candidates)
+        self.dimension = self.embeddings.shape[1]
+
+class CascadeSearcher:
+    """Cascade Index Searcher"""
+    
+    # Most a large delete may widen the Hamming candidate pass; past it, a
+    # search whose widened pass finds too few live rows ranks every live row
+    MAX_CANDIDATE_WIDENING = 8
+    
+    def __init__(self, rerank_candidates: Optional[int] = None):
+        self.index = None
+        self.vectors = None
+        self.center = None
+        self.rerank_candidates = rerank_candidates
+        self.deleted = None
+        self.deleted_fraction = 0.0
+        # Stats of each thread's last search
+        self._local = threading.local()
+        self.documents = []
+        self.metadata = []
+        
+    def load_index(self, path: str):
+        """Load cascade index"""
+        self.index = faiss.read_index_binary(path + '.faiss')
+        self.vectors = np.load(path + '.vectors.npy', mmap_mode='r')
+        
+        with open(path + '.pkl', 'rb') as f:
+            data = pickle.load(f)
+            self.documents = data['documents']
+            self.metadata = data['metadata']
+            self.center = data['center']
+            if self.rerank_candidates is None:
+                self.rerank_candidates = data['rerank_candidates']
+                
+    def load_sections(self, sections: Dict[str, np.ndarray], documents, metadata,
+                      params: Optional[Dict[str, Any]] = None):
+        """Load from container sections; vectors stay memory-mapped"""
+        self.index = faiss.deserialize_index_binary(sections['graph'])
+        self.vectors = sections['vectors']
+        self.center = np.array(sections['center'])
+        self.documents = documents
+        self.metadata = metadata
+        if self.rerank_candidates is None:
+            self.rerank_candidates = (params or {}).get('rerank_candidates', 100)
+                
+    def get_embeddings(self, ids: List[int]) -> np.ndarray:
+        """Get stored vectors for document ids"""
+        return np.asarray(self.vectors[np.asarray(ids, dtype='int64')], dtype='float32')
+        
+    def set_deleted(self, deleted: Optional[np.ndarray]):
+        """Drop tombstoned rows from the candidate set"""
+        self.deleted = deleted if deleted is not None and deleted.any() else None
+        self.deleted_fraction = float(self.deleted.mean()) if self.deleted is not None else 0.0
+        
+    def search_ids(self, query_embedding: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Hamming candidate pass and exact rerank, returning raw scores and ids"""
+        query = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+        deleted = self.deleted
+        
+        # Hamming candidate pass, widened so about as many live rows survive
+        # the delete filter as without deletes (capped)
+        wanted = max(self.rerank_candidates, top_k)
+        num_candidates = wanted
+        capped = False
+        if deleted is not None:
+            widening = 1.0 / max(1.0 - self.deleted_fraction, 1e-6)
+            capped = widening > self.MAX_CANDIDATE_WIDENING
+            num_candidates = int(np.ceil(num_candidates * min(widening, self.MAX_CANDIDATE_WIDENING)))
+        num_candidates = min(num_candidates, self.index.ntotal)
+        code = binarize(query, self.center)
+        _, candidates = self.index.search(code, num_candidates)
+        candidates = candidates[0]
+        candidates = candidates[candidates >= 0]
+        if deleted is not None:
+            candidates = candidates[~deleted[candidates]]
+        hamming_computations = self.index.ntotal
+        
+        # Too few live rows survived the capped pass: rank the live rows alone
+        exhaustive = capped and len(candidates) < wanted
+        if exhaustive:
+            candidates = self._live_candidates(code[0], deleted, wanted)
+            hamming_computations += len(deleted) - int(deleted.sum())
+        candidates = np.sort(candidates)
+        
+        # Exact rerank with squared L2, same metric as the HNSW backend
+        diffs = self.get_embeddings(candidates) - query
+        distances = np.einsum('ij,ij->i', diffs, diffs)
+        order = np.argsort(distances)[:top_k]
+        
+        self._local.stats = {
+            'hamming_candidates': num_candidates,
+            'rerank_candidates': len(candidates),
+            'distance_computations': len(candidates),
+            'hamming_computations': hamming_computations,
+            'exhaustive': exhaustive
+        }
+        return distances[order], candidates[order]
+        
+    def _live_candidates(self, code: np.ndarray, deleted: np.ndarray, count: int) -> np.ndarray:
+        """The count live rows nearest to code in Hamming distance"""
+        live = np.flatnonzero(~deleted)
+        codes = faiss.vector_to_array(self.index.xb).reshape(self.index.ntotal, -1)[live]
+        distances = np.unpackbits(codes ^ code, axis=1).sum(axis=1)
+        if len(live) > count:
+            live = live[np.argpartition(distances, count)[:count]]
+        return live
+    
+    def reset_stats(self):
+        self._local.stats = {}
+        
+    def get_stats(self) -> Dict[str, Any]:
+        """Candidate counts of this thread's last search"""
+        return dict(getattr(self._local, 'stats', {}))
+        
+    def hydrate(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Format raw hits as result dicts"""
+        results = []
+        for score, idx in zip(scores, indices):
+            if 0 <= idx < len(self.documents):
+                result = {
+                    'content': self.documents[idx],
+                    'score': float(score),
+                    'index': int(idx)
+                }
+                
+                # Add metadata if available
+                if idx < len(self.metadata):
+                    result.update(self.metadata[idx])
+                    
+                results.append(result)
+                
+        return results
+        
+    def search(self, query_embedding: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
+        """Search with Hamming candidate pass and exact rerank"""
+        if self.index is None:
+            return []
+            
+        scores, indices = self.search_ids(query_embedding, top_k)
+        return self.hydrate(scores, indices)
@@ -4,18 +4,38 @@ HNSW Backend Implementation
 """
 
 import os
+import copy
 import pickle
+import threading
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import faiss
 
+from .tuner import tune_hnsw, ef_search_for
+from .parallel_build import build_parallel
+
 class HNSWBuilder:
     """HNSW Index Builder"""
     
-    def __init__(self, dimension: int = 384, m: int = 16, ef_construction: int = 200):
+    def __init__(self, dimension: int = 384, m: int = 16, ef_construction: int = 200,
+                 ef_search: Optional[Dict[int, int]] = None, auto_tune: bool = False,
+                 target_recall: float = 0.95, tune_kwargs: Optional[Dict[str, Any]] = None,
+                 build_workers: int = 1, num_shards: Optional[int] = None,
+                 min_parallel_rows: int = 100000, boundary_margin: float = 0.1):
         self.dimension = dimension
         self.m = m
         self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.auto_tune = auto_tune
+        self.target_recall = target_recall
+        self.tune_kwargs = tune_kwargs or {}
+        self.tuning = None
+        
+        # Shard-and-merge construction for large builds (build_workers > 1)
+        self.build_workers = build_workers
+        self.num_shards = num_shards
+        self.min_parallel_rows = min_parallel_rows
+        self.boundary_margin = boundary_margin
         self.index = None
         self.documents = []
         self.metadata = []
@@ -25,17 +45,61 @@ class HNSWBuilder:
         """Build HNSW index"""
         self.documents = documents
         self.metadata = metadata or []
+        embeddings = np.asarray(embeddings, dtype='float32')
+        
+        # Calibrate parameters on a sample
+        if self.auto_tune:
+            self.tuning = tune_hnsw(embeddings, self.target_recall, **self.tune_kwargs)
+            self.m = self.tuning['m']
+            self.ef_construction = self.tuning['ef_construction']
+            self.ef_search = self.tuning['ef_search']
         
-        # Create FAISS HNSW index
-        self.index = faiss.IndexHNSWFlat(self.dimension, self.m)
-        self.index.hnsw.efConstruction = self.ef_construction
+        self.index = self._new_graph(embeddings)
         
-        # Add embeddings to index
-        self.index.add(embeddings.astype('float32'))
+    def _new_graph(self, embeddings: np.ndarray) -> faiss.IndexHNSWFlat:
+        """Construct the graph, in parallel shards when it is large enough"""
+        if self.build_workers > 1 and len(embeddings) >= self.min_parallel_rows:
+            return build_parallel(embeddings, self.m, self.ef_construction, self.build_workers,
+                                  self.num_shards or self.build_workers, self.boundary_margin)
+        index = faiss.IndexHNSWFlat(self.dimension, self.m)
+        index.hnsw.efConstruction = self.ef_construction
+        index.add(embeddings)
+        return index
+        
+    def add(self, embeddings: np.ndarray, documents: List[str],
+            metadata: Optional[List[Dict[str, Any]]] = None):
+        """Insert more vectors into the existing graph"""
+        self.index.add(np.asarray(embeddings, dtype='float32'))
+        self.documents = list(self.documents) + list(documents)
+        if metadata:
+            self.metadata = list(self.metadata) + list(metadata)
+            
+    def get_embeddings(self, ids: List[int]) -> np.ndarray:
+        """Get stored vectors for rows"""
+        return self.index.reconstruct_batch(np.asarray(ids, dtype='int64'))
+    
+    def rebuilt(self, embeddings: np.ndarray, documents: List[str],
+                metadata: Optional[List[Dict[str, Any]]] = None) -> 'HNSWBuilder':
+        """New builder with the same parameters over the given rows (self is left alone)"""
+        builder = copy.copy(self)
+        builder.index = self._new_graph(np.asarray(embeddings, dtype='float32').reshape(-1, self.dimension))
+        builder.documents = list(documents)
+        builder.metadata = list(metadata or [])
+        return builder
+    
+    @property
+    def build_params(self) -> Dict[str, Any]:
+        """Parameters the index was built with"""
+        return {
+            'm': self.m,
+            'ef_construction': self.ef_construction,
+            'ef_search': self.ef_search
+        }
         
     def save_index(self, path: str):
         """Save index to file"""
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
         
         # Save FAISS index
         faiss.write_index(self.index, path + '.faiss')
@@ -44,16 +108,57 @@ class HNSWBuilder:
         with open(path + '.pkl', 'wb') as f:
             pickle.dump({
                 'documents': self.documents,
-                'metadata': self.metadata
+                'metadata': self.metadata,
+                'params': self.build_params
             }, f)
+            
+    def get_sections(self) -> Dict[str, np.ndarray]:
+        """Index arrays for a single-file container"""
+        return {'graph': faiss.serialize_index(self.index)}
+    
+    def save_graph(self, path: str):
+        """Atomically rewrite only the graph, leaving the document store alone"""
+        faiss.write_index(self.index, path + '.faiss.tmp')
+        os.replace(path + '.faiss.tmp', path + '.faiss')
+    
+    def load_index(self, path: str):
+        """Reopen a saved index for modification"""
+        self.index = faiss.read_index(path + '.faiss')
+        with open(path + '.pkl', 'rb') as f:
+            data = pickle.load(f)
+        self.documents = data['documents']
+        self.metadata = data['metadata']
+        self._set_params(data.get('params', {}))
+        
+    def load_sections(self, sections: Dict[str, np.ndarray], documents, metadata,
+                      params: Optional[Dict[str, Any]] = None):
+        """Reopen a container index for modification"""
+        self.index = faiss.deserialize_index(sections['graph'])
+        self.documents = list(documents)
+        self.metadata = list(metadata)
+        self._set_params(params or {})
+        
+    def _set_params(self, params: Dict[str, Any]):
+        self.dimension = self.index.d
+        self.m = params.get('m', self.m)
+        self.ef_construction = params.get('ef_construction', self.ef_construction)
+        self.ef_search = params.get('ef_search', self.ef_search)
+
+def _hnsw_counters() -> Tuple[int, int, int]:
+    stats = faiss.cvar.hnsw_stats
+    return int(stats.ndis), int(stats.nhops), int(stats.n2)
 
 class HNSWSearcher:
     """HNSW Index Searcher"""
     
-    def __init__(self):
+    def __init__(self, ef_search: Optional[Dict[int, int]] = None):
         self.index = None
+        self.ef_search = ef_search
+        self.live_filter = None
         self.documents = []
         self.metadata = []
+        # Stats of each thread's last search
+        self._local = threading.local()
         
     def load_index(self, path: str):
         """Load HNSW index"""
@@ -65,22 +170,81 @@ class HNSWSearcher:
             data = pickle.load(f)
             self.documents = data['documents']
             self.metadata = data['metadata']
+            if self.ef_search is None:
+                self.ef_search = data.get('params', {}).get('ef_search')
+                
+    def load_sections(self, sections: Dict[str, np.ndarray], documents, metadata,
+                      params: Optional[Dict[str, Any]] = None):
+        """Load from container sections (documents/metadata may be lazy sequences)"""
+        graph = sections['graph']
+        if hasattr(faiss, 'ZeroCopyIOReader'):
+            # Vectors are used in place from the mapped section; only the
+            # neighbor lists are copied. FAISS keeps pointers into the buffer,
+            # so it (and its mmap) must outlive the index.
+            reader = faiss.ZeroCopyIOReader(faiss.swig_ptr(graph), graph.size)
+            self.index = faiss.read_index(reader, faiss.IO_FLAG_MMAP_IFC)
+            self._graph = graph
+        else:
+            self.index = faiss.deserialize_index(graph)
+        self.documents = documents
+        self.metadata = metadata
+        if self.ef_search is None:
+            self.ef_search = (params or {}).get('ef_search')
     
-    def search(self, query_embedding: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
-        """Search HNSW index"""
-        if self.index is None:
-            return []
-        
-        # Set search parameters
-        self.index.hnsw.efSearch = max(50, top_k * 2)
+    def get_embeddings(self, ids: List[int]) -> np.ndarray:
+        """Get stored vectors for document ids"""
+        return self.index.reconstruct_batch(np.asarray(ids, dtype='int64'))
+    
+    def set_deleted(self, deleted: Optional[np.ndarray]):
+        """Skip tombstoned rows during graph traversal"""
+        if deleted is None or not deleted.any():
+            self.live_filter = None
+            return
+        # FAISS reads the bitmap in place, so keep it alive with the selector
+        live = np.packbits(~deleted, bitorder='little')
+        self.live_filter = (live, faiss.IDSelectorBitmap(len(live), faiss.swig_ptr(live)))
+    
+    def search_ids(self, query_embedding: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Search HNSW index, returning raw scores and ids"""
+        # Per-call parameters: concurrent searches must not share efSearch
+        ef_search = ef_search_for(top_k, self.ef_search)
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = ef_search
+        live_filter = self.live_filter
+        if live_filter is not None:
+            params.sel = live_filter[1]
+        query = query_embedding.reshape(1, -1).astype('float32')
         
         # Search
-        scores, indices = self.index.search(query_embedding.reshape(1, -1).astype('float32'), top_k)
+        before = _hnsw_counters()
+        scores, indices = self.index.search(query, top_k, params=params)
+        after = _hnsw_counters()
+        self._local.stats = {
+            'ef_search': ef_search,
+            'distance_computations': after[0] - before[0],
+            'visited_nodes': after[1] - before[1],
+            'exhausted_queries': after[2] - before[2]
+        }
+        return scores[0], indices[0]
+    
+    def reset_stats(self):
+        """Forget this thread's last search stats"""
+        self._local.stats = {}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """HNSW traversal statistics of this thread's last search
         
-        # Format results
+        FAISS only keeps process-wide counters, so these are the counters'
+        change over the call: exact for a lone query, approximate when other
+        threads search at the same time.
+        """
+        return dict(getattr(self._local, 'stats', {}))
+    
+    def hydrate(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Format raw hits as result dicts"""
         results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx < len(self.documents):
+        for score, idx in zip(scores, indices):
+            if 0 <= idx < len(self.documents):
                 result = {
                     'content': self.documents[idx],
                     'score': float(score),
@@ -93,4 +257,12 @@ class HNSWSearcher:
                 
                 results.append(result)
         
-        return results
\ No newline at end of file
+        return results
+    
+    def search(self, query_embedding: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
+        """Search HNSW index"""
+        if self.index is None:
+            return []
+        
+        scores, indices = self.search_ids(query_embedding, top_k)
+        return self.hydrate(scores, indices)
\ No newline at end of file
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Parallel HNSW Construction
+
+Builds one IndexHNSWFlat from shards instead of a single sequential add:
+
+1. Coarse k-means splits the vectors into one shard per cluster.
+2. Each shard's sub-graph is built in its own worker process.
+3. The sub-graphs are stitched into a single graph. Level-0 lists are
+   copied with ids remapped; the upper levels hold only ~1/M of the nodes
+   and are rebuilt globally, so every shard hangs off one entry point.
+4. Vectors near a shard boundary search the stitched graph, and the
+   cross-shard neighbors they find (plus reverse links) are merged into
+   their level-0 lists.
+"""
+
+import os
+import shutil
+import tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import numpy as np
+import faiss
+
+def _build_shard(vectors_path: str, rows_path: str, m: int, ef_construction: int,
+                 threads: int, out_path: str) -> str:
+    """Worker: build the sub-graph of one shard and write it to out_path"""
+    faiss.omp_set_num_threads(threads)
+    vectors = np.load(vectors_path, mmap_mode='r')
+    rows = np.load(rows_path)
+    index = faiss.IndexHNSWFlat(vectors.shape[1], m)
+    index.hnsw.efConstruction = ef_construction
+    index.add(np.ascontiguousarray(vectors[rows], dtype='float32'))
+    faiss.write_index(index, out_path)
+    return out_path
+
+def partition(vectors: np.ndarray, num_shards: int, boundary_margin: float = 0.1,
+              seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Shard of each vector, and which vectors lie near a second shard"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), num_shards * 256)
+    sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    kmeans = faiss.Kmeans(vectors.shape[1], num_shards, niter=10, seed=seed)
+    kmeans.train(np.ascontiguousarray(sample, dtype='float32'))
+    distances, assignment = kmeans.index.search(vectors, 2)
+    # Squared L2, so compare against the squared margin
+    boundary = distances[:, 1] <= (1 + boundary_margin) ** 2 * distances[:, 0]
+    return assignment[:, 0], boundary
+
+def _ranges(starts: np.ndarray, lengths) -> np.ndarray:
+    """Concatenated arange(start, start + length) for each start"""
+    lengths = np.broadcast_to(np.asarray(lengths, dtype='int64'), starts.shape)
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype='int64')
+    shifts = np.repeat(starts.astype('int64') - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return shifts + np.arange(total, dtype='int64')
+
+def _merge_links(vectors: np.ndarray, nodes: np.ndarray, existing: np.ndarray,
+                 candidates: np.ndarray, reserve: int) -> np.ndarray:
+    """Add the nearest new candidates to each neighbor list
+    
+    Existing lists came out of FAISS's diversity heuristic and are kept
+    whole where there is room; only up to `reserve` of their farthest
+    entries are given up for new links.
+    """
+    width = existing.shape[1]
+    candidates = candidates.astype('int64')
+    candidates[(candidates == nodes[:, None]) | (candidates[:, :, None] == existing[:, None, :]).any(axis=2)] = -1
+    candidates.sort(axis=1)
+    candidates[:, 1:][candidates[:, 1:] == candidates[:, :-1]] = -1
+    valid = candidates >= 0
+    diffs = vectors[np.where(valid, candidates, 0)] - vectors[nodes][:, None, :]
+    distances = np.einsum('ijk,ijk->ij', diffs, diffs)
+    distances[~valid] = np.inf
+    order = np.argsort(distances, axis=1, kind='stable')
+    candidates = np.take_along_axis(np.where(valid, candidates, -1), order, axis=1)
+    
+    num_existing = (existing >= 0).sum(axis=1)
+    num_new = np.minimum(valid.sum(axis=1), width - num_existing + reserve)
+    keep = np.minimum(num_existing, width - num_new)
+    
+    merged = np.full_like(existing, -1)
+    columns = np.arange(width)
+    kept = columns < keep[:, None]
+    merged[kept] = existing[kept]
+    added = columns < num_new[:, None]
+    rows, cols = np.nonzero(added)
+    merged[rows, keep[rows] + cols] = candidates[rows, cols]
+    return merged
+
+class _Graph:
+    """Numpy copy of an HNSW graph's level/offset/neighbor tables"""
+    
+    def __init__(self, index: faiss.IndexHNSWFlat):
+        hnsw = index.hnsw
+        self.levels = faiss.vector_to_array(hnsw.levels)
+        self.offsets = faiss.vector_to_array(hnsw.offsets).astype('int64')
+        self.neighbors = faiss.vector_to_array(hnsw.neighbors)
+        self.entry_point = hnsw.entry_point
+        self.max_level = hnsw.max_level
+
+def stitch(vectors: np.ndarray, m: int, ef_construction: int,
+           shards: List[Tuple[np.ndarray, faiss.IndexHNSWFlat]]) -> Tuple[faiss.IndexHNSWFlat, np.ndarray]:
+    """Combine shard sub-graphs into one index over all vectors (in original order)"""
+    n, dimension = vectors.shape
+    index = faiss.IndexHNSWFlat(dimension, m)
+    index.hnsw.efConstruction = ef_construction
+    cum = faiss.vector_to_array(index.hnsw.cum_nneighbor_per_level).astype('int64')
+    nb0 = int(cum[1])
+    
+    graphs = []
+    levels = np.zeros(n, dtype='int32')
+    for rows, sub in shards:
+        graph = _Graph(sub)
+        levels[rows] = graph.levels
+        graphs.append((rows, graph))
+    offsets = np.zeros(n + 1, dtype='int64')
+    np.cumsum(cum[levels], out=offsets[1:])
+    neighbors = np.full(offsets[-1], -1, dtype='int32')
+    
+    # Level 0: each node keeps its in-shard neighbors, remapped to global ids
+    for rows, graph in graphs:
+        local = graph.neighbors[_ranges(graph.offsets[:-1], nb0)]
+        neighbors[_ranges(offsets[rows], nb0)] = np.where(local >= 0, rows[np.maximum(local, 0)], -1)
+        
+    # Upper levels: one small graph over every node above level 0, where
+    # global level l is its level l - 1 (M neighbors per level throughout)
+    upper = np.flatnonzero(levels > 1)
+    entry_point, max_level = 0, 0
+    if len(upper):
+        top = faiss.IndexHNSWFlat(dimension, m)
+        top.hnsw.set_nb_neighbors(0, m)
+        top.hnsw.efConstruction = ef_construction
+        faiss.copy_array_to_vector((levels[upper] - 1).astype('int32'), top.hnsw.levels)
+        top.add(np.ascontiguousarray(vectors[upper], dtype='float32'))
+        graph = _Graph(top)
+        linked = graph.neighbors
+        neighbors[_ranges(offsets[upper] + nb0, cum[levels[upper]] - nb0)] = \
+            np.where(linked >= 0, upper[np.maximum(linked, 0)], -1)
+        entry_point, max_level = int(upper[graph.entry_point]), graph.max_level + 1
+        
+    index.storage.add(np.ascontiguousarray(vectors, dtype='float32'))
+    index.ntotal = n
+    faiss.copy_array_to_vector(levels, index.hnsw.levels)
+    faiss.copy_array_to_vector(offsets.astype('uint64'), index.hnsw.offsets)
+    faiss.copy_array_to_vector(neighbors, index.hnsw.neighbors)
+    index.hnsw.entry_point = entry_point
+    index.hnsw.max_level = max_level
+    return index, offsets
+
+def refine(index: faiss.IndexHNSWFlat, vectors: np.ndarray, offsets: np.ndarray,
+           nodes: np.ndarray, assignment: np.ndarray, ef_search: int, batch_size: int = 1024):
+    """Merge cross-shard level-0 neighbors into the lists of boundary nodes"""
+    nb0 = index.hnsw.nb_neighbors(0)
+    reserve = max(1, nb0 // 4)
+    neighbors = faiss.vector_to_array(index.hnsw.neighbors)
+    index.hnsw.efSearch = ef_search
+    
+    def update(batch, candidates):
+        slots = offsets[batch][:, None] + np.arange(nb0)
+        neighbors[slots] = _merge_links(vectors, batch, neighbors[slots], candidates, reserve)
+        return candidates
+        
+    sources, targets = [], []
+    for start in range(0, len(nodes), batch_size):
+        batch = nodes[start:start + batch_size]
+        _, found = index.search(np.ascontiguousarray(vectors[batch], dtype='float32'), reserve + 1)
+        # Only neighbors from other shards are new information
+        found[(found >= 0) & (assignment[np.maximum(found, 0)] == assignment[batch][:, None])] = -1
+        update(batch, found)
+        # Link back so the other shard can reach this one too
+        cross = found >= 0
+        sources.append(np.repeat(batch, cross.sum(axis=1)))
+        targets.append(found[cross])
+        
+    if sources:
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        order = np.argsort(targets, kind='stable')
+        sources, targets = sources[order], targets[order]
+        nodes, starts, counts = np.unique(targets, return_index=True, return_counts=True)
+        position = np.arange(len(targets)) - np.repeat(starts, counts)
+        keep = position < reserve
+        reverse = np.full((len(nodes), reserve), -1, dtype='int64')
+        reverse[np.repeat(np.arange(len(nodes)), counts)[keep], position[keep]] = sources[keep]
+        for start in range(0, len(nodes), batch_size):
+            update(nodes[start:start + batch_size], reverse[start:start + batch_size])
+            
+    faiss.copy_array_to_vector(neighbors, index.hnsw.neighbors)
+
+def build_parallel(vectors: np.ndarray, m: int = 16, ef_construction: int = 200,
+                   num_workers: int = 0, num_shards: int = 0,
+                   boundary_margin: float = 0.1) -> faiss.IndexHNSWFlat:
+    """Build an IndexHNSWFlat from sub-graphs constructed in worker processes"""
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    num_workers = num_workers or os.cpu_count() or 1
+    num_shards = num_shards or num_workers
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    
+    assignment, boundary = partition(vectors, num_shards, boundary_margin)
+    workdir = tempfile.mkdtemp(prefix='leann-hnsw-')
+    try:
+        # Workers memory-map the vectors instead of receiving them through a pipe
+        vectors_path = os.path.join(workdir, 'vectors.npy')
+        np.save(vectors_path, vectors)
+        shard_rows = [np.flatnonzero(assignment == shard) for shard in range(num_shards)]
+        shard_rows = [rows for rows in shard_rows if len(rows)]
+        
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=mp.get_context('spawn')) as pool:
+            futures = []
+            for i, rows in enumerate(shard_rows):
+                rows_path = os.path.join(workdir, f'rows-{i}.npy')
+                np.save(rows_path, rows)
+                futures.append(pool.submit(_build_shard, vectors_path, rows_path, m, ef_construction,
+                                           threads, os.path.join(workdir, f'shard-{i}.faiss')))
+            shards = [(rows, faiss.read_index(future.result())) for rows, future in zip(shard_rows, futures)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    index, offsets = stitch(vectors, m, ef_construction, shards)
+    del shards
+    refine(index, vectors, offsets, np.flatnonzero(boundary), assignment, ef_construction)
+    return index
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+HNSW Parameter Tuner
+"""
+
+import time
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence
+import faiss
+
+EF_SEARCH_LADDER = [16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512, 768, 1024]
+# Below this many rows there is too little to tune on; defaults are used
+MIN_TUNE_ROWS = 50
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Mean fraction of true neighbors found"""
+    k = truth.shape[1]
+    hits = sum(len(np.intersect1d(f[:k], t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def _search_timed(index, queries: np.ndarray, k: int):
+    """Search one query at a time, returning ids and mean latency"""
+    ids = np.empty((len(queries), k), dtype='int64')
+    start = time.perf_counter()
+    for i in range(len(queries)):
+        _, found = index.search(queries[i:i + 1], k)
+        ids[i] = found[0]
+    return ids, (time.perf_counter() - start) / len(queries)
+
+def scale_ef_search(ef_search: Dict[int, int], sample_size: int, corpus_size: int) -> Dict[int, int]:
+    """Carry efSearch tuned on a sample over to the full corpus
+
+    At a fixed recall the search beam of an HNSW graph grows roughly with
+    log(n), so calibrated values are scaled by log(corpus) / log(sample).
+    """
+    if corpus_size <= sample_size or sample_size < 2:
+        return dict(ef_search)
+    factor = np.log(corpus_size) / np.log(sample_size)
+    return {k: int(np.ceil(ef * factor)) for k, ef in ef_search.items()}
+
+def tune_hnsw(embeddings: np.ndarray, target_recall: float = 0.95,
+              top_ks: Sequence[int] = (1, 10, 50), sample_size: int = 20000,
+              num_queries: int = 200,
+              m_values: Sequence[int] = (8, 16, 32),
+              ef_construction_values: Sequence[int] = (100, 200, 400),
+              seed: int = 0) -> Dict[str, Any]:
+    """Choose M, efConstruction and per-k efSearch for a target recall
+    
+    Builds candidate graphs on a sample of the corpus, measures recall
+    against exact search and single-query latency, and returns the
+    configuration with the lowest latency at the largest k that reaches
+    the target. efSearch is then scaled from the sample to the corpus size
+    (see scale_ef_search); 'sample_ef_search' keeps the measured values.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    if len(embeddings) < MIN_TUNE_ROWS:
+        return {
+            'm': sorted(m_values)[len(m_values) // 2],
+            'ef_construction': sorted(ef_construction_values)[len(ef_construction_values) // 2],
+            'ef_search': {},
+            'recall': {},
+            'latency': {},
+            'build_time': 0.0,
+            'target_recall': target_recall,
+            'sample_size': len(embeddings),
+            'corpus_size': len(embeddings),
+            'skipped': True
+        }
+    rng = np.random.default_rng(seed)
+    
+    # Held-out queries from the corpus, the rest (capped) as build sample
+    order = rng.permutation(len(embeddings))
+    num_queries = min(num_queries, max(1, len(embeddings) // 10))
+    queries = embeddings[order[:num_queries]]
+    sample = embeddings[order[num_queries:num_queries + sample_size]]
+    top_ks = sorted(k for k in top_ks if k <= len(sample)) or [len(sample)]
+    
+    # Exact ground truth
+    flat = faiss.IndexFlatL2(sample.shape[1])
+    flat.add(sample)
+    _, truth = flat.search(queries, top_ks[-1])
+    
+    trials = []
+    for m in m_values:
+        for ef_construction in ef_construction_values:
+            index = faiss.IndexHNSWFlat(sample.shape[1], m)
+            index.hnsw.efConstruction = ef_construction
+            start = time.perf_counter()
+            index.add(sample)
+            build_time = time.perf_counter() - start
+            
+            ef_search = {}
+            latency = {}
+            recall = {}
+            for k in top_ks:
+                for ef in [ef for ef in EF_SEARCH_LADDER if ef >= k] or [k]:
+                    index.hnsw.efSearch = ef
+                    found, mean_latency = _search_timed(index, queries, k)
+                    ef_search[k], latency[k] = ef, mean_latency
+                    recall[k] = recall_at_k(found, truth[:, :k])
+                    if recall[k] >= target_recall:
+                        break
+                        
+            trials.append({
+                'm': m,
+                'ef_construction': ef_construction,
+                'ef_search': ef_search,
+                'recall': recall,
+                'latency': latency,
+                'build_time': build_time
+            })
+            
+    # Prefer configs meeting the target, then fastest search, then fastest build
+    k = top_ks[-1]
+    
+    def rank(trial):
+        worst = min(trial['recall'].values())
+        if worst >= target_recall:
+            return (0, trial['latency'][k], trial['build_time'])
+        return (1, -worst, trial['build_time'])
+        
+    best = min(trials, key=rank)
+    best = dict(best)
+    best['target_recall'] = target_recall
+    best['sample_size'] = len(sample)
+    best['corpus_size'] = len(embeddings)
+    best['sample_ef_search'] = best['ef_search']
+    best['ef_search'] = scale_ef_search(best['ef_search'], len(sample), len(embeddings))
+    return best
+
+def ef_search_for(top_k: int, ef_search: Optional[Dict[int, int]]) -> int:
+    """Look up calibrated efSearch for top_k, falling back to the default heuristic"""
+    if not ef_search:
+        return max(50, top_k * 2)
+    calibrated = sorted((int(k), int(ef)) for k, ef in ef_search.items())
+    for k, ef in calibrated:
+        if k >= top_k:
+            return max(ef, top_k)
+    # Larger k than calibrated: scale the largest calibrated value
+    k, ef = calibrated[-1]
+    return max(top_k, int(np.ceil(ef * top_k / k)))
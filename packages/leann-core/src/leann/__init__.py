@@ -4,5 +4,15 @@ if os.uname().machine == 'arm64' and os.uname().sysname == 'Darwin':
     os.environ['OMP_NUM_THREADS'] = '1'
 
 from .api import LeannBuilder, LeannChat, LeannSearcher
+from .cache import SemanticCache
+from .context import ContextAssembler
+from .metrics import MetricsRegistry, REGISTRY, serve_metrics
+from .slowlog import SlowQueryLog, analyze_slow_log
+from .governor import ResourceGovernor
+from .segments import SegmentedIndex
+from .results import SearchResults
 
-__all__ = ['LeannBuilder', 'LeannChat', 'LeannSearcher']
\ No newline at end of file
+__all__ = ['LeannBuilder', 'LeannChat', 'LeannSearcher', 'SemanticCache', 'ContextAssembler',
+           'MetricsRegistry', 'REGISTRY', 'serve_metrics',
+           'SlowQueryLog', 'analyze_slow_log', 'ResourceGovernor', 'SegmentedIndex',
+           'SearchResults']
\ No newline at end of file
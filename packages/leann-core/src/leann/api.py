@@ -8,16 +8,92 @@ import sys
 import time
 import json
 import pickle
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Iterator, AsyncIterator, Tuple, Callable
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import torch
 
 # Add backend paths
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..', 'leann-backend-hnsw', 'src'))
 
 from leann_backend_hnsw.hnsw_backend import HNSWBuilder, HNSWSearcher
+from leann_backend_hnsw.cascade_backend import CascadeBuilder, CascadeSearcher
+from .cache import SemanticCache
+from .context import ContextAssembler
+from .metrics import MetricsRegistry, REGISTRY
+from .slowlog import SlowQueryLog
+from .embeddings import load_embedding_model, LOCAL_EMBEDDING_MODES
+from .projection import Projection
+from .governor import ResourceGovernor
+from .container import is_container, is_container_file, write_container, read_container_meta, LeannContainer
+from .versions import IndexStore
+from .tombstones import (save_tombstones, load_tombstones, tombstones_version,
+                         save_ids, load_ids)
+from .appendlog import append_documents, read_append_log, truncate_append_log, clear_append_log
+from .checkpoint import BuildCheckpoint, fingerprint
+from .references import REFERENCE_FIELDS, ReferencedDocuments, is_stale
+from .results import SearchResults
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> (builder class, searcher class)
+BACKENDS = {
+    "hnsw": (HNSWBuilder, HNSWSearcher),
+    "cascade": (CascadeBuilder, CascadeSearcher)
+}
+
+def read_index_meta(path: str) -> Dict[str, Any]:
+    """Read index metadata written by LeannBuilder.save_index"""
+    from .segments import is_segmented, read_segments
+    if is_segmented(path):
+        return read_segments(path)['meta'] or {}
+    if IndexStore.is_store(path):
+        current = IndexStore(path).current()
+        if current is None:
+            return {}
+        path = current[1]
+    if is_container_file(path):
+        return read_container_meta(path)
+    try:
+        with open(path + '.meta.json', 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+class TornIndexError(RuntimeError):
+    """Index files were read while a writer was replacing them"""
+
+def _writes_container(path: str) -> bool:
+    """Whether saving to path writes a single file (a legacy index keeps its layout)"""
+    return is_container_file(path) or (is_container(path) and not os.path.exists(path + '.meta.json'))
+
+def _index_file_version(path: str) -> Tuple:
+    """Stat signature of an index's files (changes whenever it is rewritten)"""
+    suffixes = ('',) if is_container_file(path) else ('.faiss', '.pkl', '.append.jsonl')
+    version = []
+    for suffix in suffixes:
+        try:
+            stat = os.stat(path + suffix)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+def _load_appended(path: str, backend) -> List[str]:
+    """Extend a multi-file backend with append-log rows, returning all external IDs"""
+    base = len(backend.documents)
+    ids = load_ids(path, base)
+    new_ids, documents, metadata = read_append_log(path, backend.index.ntotal - base)
+    if new_ids:
+        backend.documents = list(backend.documents) + documents
+        if backend.metadata or any(metadata):
+            backend.metadata = list(backend.metadata) + [{}] * (base - len(backend.metadata)) + metadata
+    return ids + new_ids
 
 class LeannBuilder:
     """LEANN Index Builder"""
@@ -25,172 +101,1008 @@ class LeannBuilder:
     def __init__(self, embedding_model: str = "all-MiniLM-L6-v2", 
                  embedding_mode: str = "sentence-transformers",
                  backend_name: str = "hnsw",
-                 embedding_function: Optional[callable] = None):
+                 embedding_function: Optional[callable] = None,
+                 backend_kwargs: Optional[Dict[str, Any]] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 embedding_options: Optional[Dict[str, Any]] = None,
+                 reduce_dimensions: Optional[int] = None,
+                 reduction_method: str = "pca",
+                 governor: Optional[ResourceGovernor] = None,
+                 compaction_threshold: float = 0.25,
+                 compression: Optional[str] = "auto",
+                 reference_only: bool = False):
+        if backend_name not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend_name}")
         self.embedding_model = embedding_model
         self.embedding_mode = embedding_mode
         self.backend_name = backend_name
         self.embedding_function = embedding_function
+        self.embedding_options = embedding_options or {}
+        self.backend_kwargs = backend_kwargs or {}
+        self.metrics = metrics or REGISTRY
+        self.reduce_dimensions = reduce_dimensions
+        self.reduction_method = reduction_method
+        self.governor = governor
+        self.compaction_threshold = compaction_threshold
+        self.compression = compression
+        # Keep only file references per chunk; text is read from the source on demand
+        self.reference_only = reference_only
         self.model = None
         self.backend_builder = None
+        self.projection = None
+        self.dimension = None
+        
+        # External IDs, tombstones and where the index was last saved
+        self.ids: List[str] = []
+        self.deleted = np.zeros(0, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        self.index_path = None
+        self._rewrite = False
+        self._saved_rows = 0
+        # Append-log entries covered by the saved graph
+        self._logged_rows = 0
+        self._lock = threading.RLock()
+        self._compaction = None
+        self._compact_lock = threading.Lock()
+        self._checkpoint = None
+        
+    @classmethod
+    def open(cls, path: str, **kwargs) -> 'LeannBuilder':
+        """Reopen a saved index (file, prefix or store) for updates"""
+        if IndexStore.is_store(path):
+            current = IndexStore(path).current()
+            if current is None:
+                raise FileNotFoundError(f"No published index version in {path}")
+            path = current[1]
+        meta = read_index_meta(path)
+        if not meta:
+            raise FileNotFoundError(f"No LEANN index metadata for {path}")
+        options = {
+            'embedding_model': meta['embedding_model'],
+            'embedding_mode': meta['embedding_mode'],
+            'backend_name': meta['backend_name'],
+            'backend_kwargs': meta.get('backend_kwargs'),
+            'reference_only': meta.get('reference_only', False)
+        }
+        options.update(kwargs)
+        builder = cls(**options)
+        
+        backend = BACKENDS[builder.backend_name][0](dimension=meta['dimension'], **builder.backend_kwargs)
+        if is_container_file(path):
+            container = LeannContainer(path)
+            sections = container.sections
+            backend.load_sections(sections, container.documents, container.metadata, meta.get('build_params'))
+            ids = list(container.ids) if container.ids is not None else None
+            if meta.get('projection'):
+                builder.projection = Projection.from_sections(meta['projection'], sections)
+        else:
+            backend.load_index(path)
+            base = len(backend.documents)
+            ids = _load_appended(path, backend)
+            builder._logged_rows = len(backend.documents) - base
+            if meta.get('projection'):
+                builder.projection = Projection.load(path)
+        if ids is None:
+            ids = [str(i) for i in range(len(backend.documents))]
+            
+        builder.backend_builder = backend
+        builder.dimension = meta['dimension']
+        builder._set_ids(ids, load_tombstones(path, len(ids)))
+        builder.index_path = path
+        builder._saved_rows = len(ids)
+        return builder
+        
+    def _set_ids(self, ids: List[str], deleted: np.ndarray):
+        self.ids = list(ids)
+        self.deleted = deleted
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids) if not deleted[row]}
         
     def load_model(self):
-        """Load embedding model"""
+        """Load embedding model (in a budgeted worker process when governed)"""
         if self.model is None:
-            if self.embedding_mode == "sentence-transformers":
-                self.model = SentenceTransformer(self.embedding_model)
-            elif self.embedding_mode == "ollama":
-                # Ollama embedding mode
-                pass
-            elif self.embedding_mode == "gemini":
-                # Gemini embedding mode
-                pass
+            options = self.embedding_options
+            if self.governor and self.embedding_mode in LOCAL_EMBEDDING_MODES:
+                options = self.governor.embedding_options(options)
+            self.model = load_embedding_model(self.embedding_model, self.embedding_mode, options)
         return self.model
-    
-    def build_index(self, documents: List[str], metadata: List[Dict] = None):
-        """Build search index"""
+        
+    def embed_documents(self, documents: List[str], batch_size: Optional[int] = None,
+                        progress_callback: Optional[callable] = None,
+                        checkpoint: Optional[BuildCheckpoint] = None) -> np.ndarray:
+        """Generate document embeddings, optionally in batches with progress"""
+        # Governed and checkpointed builds need batch boundaries to pause or save at
+        batch_size = batch_size or (256 if self.governor or checkpoint else len(documents))
+        batches = checkpoint.load() if checkpoint else []
+        resumed = sum(len(batch) for batch in batches)
+        if resumed and progress_callback:
+            progress_callback(resumed, len(documents))
+        for start in range(resumed, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            if self.governor:
+                self.metrics.inc('leann_build_paused_seconds_total', self.governor.throttle())
+            if self.embedding_function:
+                batches.append(np.asarray([self.embedding_function(doc) for doc in batch], dtype='float32'))
+            else:
+                model = self.load_model()
+                batches.append(np.asarray(model.encode(batch), dtype='float32'))
+            if checkpoint:
+                checkpoint.add(batches[-1])
+            done = start + len(batch)
+            self.metrics.set('leann_build_progress', 0.9 * done / len(documents))
+            if progress_callback:
+                progress_callback(done, len(documents))
+        if checkpoint:
+            checkpoint.flush()
+        return np.concatenate(batches)
+        
+    def build_index(self, documents: List[str], metadata: List[Dict] = None,
+                    batch_size: Optional[int] = None, progress_callback: Optional[callable] = None,
+                    ids: Optional[List[str]] = None,
+                    checkpoint: Optional[Union[str, BuildCheckpoint]] = None):
+        """Build search index; ids are stable external IDs (default: row numbers)
+        
+        With a checkpoint (directory or BuildCheckpoint), embedded batches are
+        saved periodically and a rerun on the same documents resumes from
+        them. The checkpoint is removed by the next successful save_index.
+        """
         if not documents:
             return None
+        ids = [str(doc_id) for doc_id in ids] if ids is not None else [str(i) for i in range(len(documents))]
+        if len(ids) != len(documents) or len(set(ids)) != len(ids):
+            raise ValueError("ids must be unique and one per document")
+        self._stored_documents(documents, metadata)
+        self.metrics.set('leann_build_progress', 0.0)
+        
+        if isinstance(checkpoint, str):
+            checkpoint = BuildCheckpoint(checkpoint)
+        if checkpoint:
+            resumed = checkpoint.open(fingerprint(documents, self.embedding_model, self.embedding_mode))
+            if resumed:
+                logger.info("Resuming build: %d/%d documents already embedded", resumed, len(documents))
+            self._checkpoint = checkpoint
             
         # Generate embeddings
-        if self.embedding_function:
-            embeddings = [self.embedding_function(doc) for doc in documents]
-        else:
-            model = self.load_model()
-            embeddings = model.encode(documents)
+        with self.metrics.timer('leann_build_embedding_seconds'):
+            embeddings = self._run_phase('embedding', self.embed_documents, documents, batch_size,
+                                         progress_callback, checkpoint)
+            
+        # Optional dimensionality reduction, applied to queries at search time
+        if self.reduce_dimensions and self.reduce_dimensions < embeddings.shape[1]:
+            self.projection = Projection.fit(embeddings, self.reduce_dimensions, self.reduction_method)
+            embeddings = self.projection.transform(embeddings)
+        elif self.projection is not None:
+            embeddings = self.projection.transform(embeddings)
+        self.metrics.inc('leann_build_documents_total', len(documents))
         
-        # Build backend index
-        if self.backend_name == "hnsw":
-            self.backend_builder = HNSWBuilder()
-            self.backend_builder.build_index(embeddings, documents, metadata)
+        self.build_from_embeddings(embeddings, documents, metadata, ids)
+        self.metrics.set('leann_build_progress', 1.0)
+        return self.backend_builder
         
+    def build_from_embeddings(self, embeddings: np.ndarray, documents: List[str],
+                              metadata: List[Dict] = None, ids: Optional[List[str]] = None):
+        """Build the backend index from vectors already in the index space"""
+        ids = [str(doc_id) for doc_id in ids] if ids is not None else [str(i) for i in range(len(documents))]
+        self.dimension = embeddings.shape[1]
+        builder_cls = BACKENDS[self.backend_name][0]
+        self.backend_builder = builder_cls(dimension=self.dimension, **self.backend_kwargs)
+        with self.metrics.timer('leann_build_index_seconds'):
+            self._run_phase('index', self.backend_builder.build_index, embeddings,
+                            self._stored_documents(documents, metadata), metadata)
+        self._set_ids(ids, np.zeros(len(ids), dtype=bool))
+        self._rewrite = True
         return self.backend_builder
-    
+        
+    def _stored_documents(self, documents: List[str], metadata: Optional[List[Dict]]) -> List[str]:
+        """Text to keep in the document store (none for reference-only indexes)"""
+        if not self.reference_only:
+            return documents
+        if not metadata or len(metadata) != len(documents) or \
+                any(field not in meta for meta in metadata for field in REFERENCE_FIELDS):
+            raise ValueError(f"reference-only indexes need {', '.join(REFERENCE_FIELDS)} in every document's metadata")
+        return [''] * len(documents)
+        
+    def delete(self, ids: List[str]) -> int:
+        """Tombstone documents by external ID, returning how many were live"""
+        with self._lock:
+            count = 0
+            for doc_id in ids:
+                row = self._rows.pop(str(doc_id), None)
+                if row is not None:
+                    self.deleted[row] = True
+                    count += 1
+        self._maybe_compact()
+        return count
+        
+    def add_documents(self, documents: List[str], metadata: Optional[List[Dict]] = None,
+                      ids: Optional[List[str]] = None, batch_size: Optional[int] = None) -> int:
+        """Embed and insert new documents into the existing index"""
+        if ids is None:
+            # Continue numeric IDs past any existing ones
+            start = max((int(doc_id) + 1 for doc_id in self.ids if doc_id.isdigit()), default=0)
+            ids = [str(start + i) for i in range(len(documents))]
+        return self.upsert(documents, ids, metadata, batch_size)
+        
+    def upsert(self, documents: List[str], ids: List[str], metadata: Optional[List[Dict]] = None,
+               batch_size: Optional[int] = None) -> int:
+        """Insert documents, replacing any existing ones with the same IDs"""
+        ids = [str(doc_id) for doc_id in ids]
+        if len(ids) != len(documents) or len(set(ids)) != len(ids):
+            raise ValueError("ids must be unique and one per document")
+        if not documents:
+            return 0
+        if self.backend_builder is None:
+            self.build_index(documents, metadata, batch_size, ids=ids)
+            return len(documents)
+        stored = self._stored_documents(documents, metadata)
+        
+        # Embed outside the lock so searches of a shared builder aren't blocked
+        embeddings = self._run_phase('embedding', self.embed_documents, documents, batch_size)
+        if self.projection:
+            embeddings = self.projection.transform(embeddings)
+            
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is not None:
+                    self.deleted[row] = True
+                    
+            # Keep metadata aligned with documents once either side has any
+            builder = self.backend_builder
+            if metadata or builder.metadata:
+                builder.metadata = list(builder.metadata) + [{}] * (len(builder.documents) - len(builder.metadata))
+                metadata = list(metadata or []) + [{}] * (len(documents) - len(metadata or []))
+            self._run_phase('index', builder.add, embeddings, stored, metadata)
+                
+            start = len(self.ids)
+            self.ids.extend(ids)
+            self.deleted = np.concatenate([self.deleted, np.zeros(len(ids), dtype=bool)])
+            self._rows.update((doc_id, start + i) for i, doc_id in enumerate(ids))
+        self.metrics.inc('leann_build_documents_total', len(documents))
+        self._maybe_compact()
+        return len(documents)
+        
+    @property
+    def tombstone_ratio(self) -> float:
+        return float(self.deleted.mean()) if len(self.deleted) else 0.0
+        
+    def compact(self):
+        """Rebuild the index without tombstoned rows
+        
+        Live rows are copied under the lock and the graph is rebuilt without
+        it, so searches, deletes and upserts carry on meanwhile; rows added
+        and deleted during the rebuild are applied to it before the swap.
+        """
+        with self._compact_lock:
+            with self._lock:
+                if not self.deleted.any():
+                    return
+                builder = self.backend_builder
+                snapshot_rows = len(self.ids)
+                rows = np.flatnonzero(~self.deleted)
+                vectors = builder.get_embeddings(rows)
+                documents = [builder.documents[i] for i in rows]
+                
+            with self.metrics.timer('leann_build_index_seconds'):
+                compacted = self._run_phase('index', builder.rebuilt, vectors, documents)
+                
+            with self._lock:
+                if self.backend_builder is not builder:
+                    # Rebuilt from scratch meanwhile
+                    return
+                # Metadata is padded when first added, so take it at swap time
+                if builder.metadata:
+                    compacted.metadata = [builder.metadata[i] for i in rows]
+                added = np.arange(snapshot_rows, len(self.ids))
+                if len(added):
+                    self._run_phase('index', compacted.add, builder.get_embeddings(added),
+                                    [builder.documents[i] for i in added],
+                                    [builder.metadata[i] for i in added] if builder.metadata else None)
+                self.backend_builder = compacted
+                self._set_ids([self.ids[i] for i in rows] + self.ids[snapshot_rows:],
+                              np.concatenate([self.deleted[rows], self.deleted[snapshot_rows:]]))
+                self._rewrite = True
+                self.metrics.inc('leann_compactions_total')
+            
+    def _maybe_compact(self):
+        """Start a background compaction once enough rows are tombstoned"""
+        if self.tombstone_ratio <= self.compaction_threshold:
+            return
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(target=self.compact, name="leann-compaction", daemon=True)
+            self._compaction.start()
+            
+    def wait_for_compaction(self):
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+            
+    def _run_phase(self, name: str, fn: Callable, *args):
+        """Run build work through the governor (on its own lowered-priority thread)"""
+        return self.governor.run(name, fn, *args) if self.governor else fn(*args)
+        
+    def index_meta(self) -> Dict[str, Any]:
+        """Metadata searchers need to open the index"""
+        return {
+            'backend_name': self.backend_name,
+            'embedding_model': self.embedding_model,
+            'embedding_mode': self.embedding_mode,
+            'dimension': self.dimension,
+            'metric': 'l2',
+            'backend_kwargs': self.backend_kwargs,
+            'build_params': getattr(self.backend_builder, 'build_params', {}),
+            'projection': self.projection.describe() if self.projection else None,
+            'reference_only': self.reference_only
+        }
+        
     def save_index(self, path: str):
-        """Save index to file"""
-        if self.backend_builder:
-            self.backend_builder.save_index(path)
+        """Save index to file (a single file if path ends with .leann, unless a legacy index is there)"""
+        if not self.backend_builder:
+            return
+        with self._lock:
+            if path == self.index_path and not self._rewrite:
+                if len(self.ids) > self._saved_rows and not _writes_container(path):
+                    self._save_appended(path)
+                if len(self.ids) == self._saved_rows:
+                    # Only deletes since the last save: just replace the tombstone bitmap
+                    save_tombstones(path, self.deleted)
+                    return
+            self._save_index(path)
+            if not _writes_container(path):
+                clear_append_log(path)
+            self._logged_rows = 0
+            save_tombstones(path, self.deleted)
+            self.index_path = path
+            self._rewrite = False
+            self._saved_rows = len(self.ids)
+            if self._checkpoint is not None:
+                self._checkpoint.clear()
+                self._checkpoint = None
+                
+    def _save_appended(self, path: str):
+        """Append new rows to the document log, then rewrite only the graph"""
+        builder = self.backend_builder
+        rows = range(self._saved_rows, len(self.ids))
+        # Entries past the saved graph were left by a failed save
+        truncate_append_log(path, self._logged_rows)
+        append_documents(
+            path, [self.ids[i] for i in rows], [builder.documents[i] for i in rows],
+            [builder.metadata[i] for i in rows] if builder.metadata else None
+        )
+        builder.save_graph(path)
+        self._saved_rows = len(self.ids)
+        self._logged_rows += len(rows)
+        
+    def _save_index(self, path: str):
+        builder = self.backend_builder
+        if _writes_container(path):
+            sections = builder.get_sections()
+            if self.projection:
+                sections.update(self.projection.get_sections())
+            write_container(path, self.index_meta(), sections, builder.documents, builder.metadata,
+                            ids=self.ids, compression=self.compression)
+            return
+            
+        builder.save_index(path)
+        save_ids(path, self.ids)
+        if self.projection:
+            self.projection.save(path)
+            
+        # Save index metadata so searchers pick the right backend
+        with open(path + '.meta.json', 'w') as f:
+            json.dump(self.index_meta(), f, indent=2)
+            
+    def save_version(self, root: str, keep: int = 3) -> str:
+        """Save as a new version in an IndexStore and make it current"""
+        store = IndexStore(root)
+        version, path = store.create_version()
+        self.save_index(path)
+        store.publish(version)
+        store.prune(keep)
+        return version
+
+class LoadedIndex:
+    """One opened index version; swapped in as a unit on reload"""
+    
+    def __init__(self, path: str, backend_kwargs: Dict[str, Any], version: Optional[str] = None):
+        self.path = path
+        self.version = version
+        self.container = None
+        self.projection = None
+        self.meta = read_index_meta(path)
+        
+        if is_container_file(path):
+            # Documents, metadata and vectors stay on disk
+            self.container = LeannContainer(path)
+            sections = self.container.sections
+            self.backend = BACKENDS[self.meta['backend_name']][1](**backend_kwargs)
+            self.backend.load_sections(sections, self.container.documents, self.container.metadata,
+                                       self.meta.get('build_params'))
+            if self.meta.get('projection'):
+                self.projection = Projection.from_sections(self.meta['projection'], sections)
+            self.ids = self.container.ids
+        else:
+            self.backend = BACKENDS[self.meta.get('backend_name', 'hnsw')][1](**backend_kwargs)
+            self.backend.load_index(path)
+            if self.meta.get('projection'):
+                self.projection = Projection.load(path)
+            self.ids = _load_appended(path, self.backend)
+            if self.backend.index.ntotal != len(self.backend.documents):
+                raise TornIndexError(f"{path}: graph and documents are from different saves")
+        if self.meta.get('reference_only'):
+            self.backend.documents = ReferencedDocuments(self.backend.metadata)
+        self.tombstones_version = None
+        self.refresh_tombstones()
+        
+    def refresh_tombstones(self) -> bool:
+        """Reload the tombstone bitmap if it changed on disk"""
+        version = tombstones_version(self.path)
+        if version == self.tombstones_version:
+            return False
+        self.tombstones_version = version
+        if hasattr(self.backend, 'set_deleted'):
+            self.backend.set_deleted(load_tombstones(self.path, len(self.backend.documents)))
+        return True
+        
+    def warm(self):
+        """Run one throwaway search so the first real query doesn't pay for page faults"""
+        dimension = self.meta.get('dimension')
+        if dimension and hasattr(self.backend, 'search_ids') and len(self.backend.documents):
+            scores, ids = self.backend.search_ids(np.zeros(dimension, dtype='float32'), 1)
+            self.backend.hydrate(scores, ids)
 
 class LeannSearcher:
-    """LEANN Index Searcher"""
+    """LEANN Index Searcher
     
-    def __init__(self, index_path: str, embedding_model: str = "all-MiniLM-L6-v2",
-                 embedding_mode: str = "sentence-transformers",
-                 embedding_function: Optional[callable] = None):
+    index_path may be an index file/prefix or an IndexStore directory. Newly
+    published versions (or a rewritten index file) are loaded in the
+    background and swapped in between queries. The embedding model and mode
+    default to the ones recorded in the index.
+    """
+    
+    MAX_OPEN_ATTEMPTS = 5
+    
+    def __init__(self, index_path: str, embedding_model: Optional[str] = None,
+                 embedding_mode: Optional[str] = None,
+                 embedding_function: Optional[callable] = None,
+                 backend_kwargs: Optional[Dict[str, Any]] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 slow_query_log: Optional[SlowQueryLog] = None,
+                 embedding_options: Optional[Dict[str, Any]] = None,
+                 governor: Optional[ResourceGovernor] = None,
+                 reload_interval: float = 1.0):
         self.index_path = index_path
         self.embedding_model = embedding_model
         self.embedding_mode = embedding_mode
         self.embedding_function = embedding_function
+        self.embedding_options = embedding_options or {}
+        self.backend_kwargs = backend_kwargs or {}
+        self.metrics = metrics or REGISTRY
+        self.slow_query_log = slow_query_log
+        self.governor = governor
+        self.store = IndexStore(index_path) if IndexStore.is_store(index_path) else None
+        from .segments import is_segmented
+        self.segmented = is_segmented(index_path)
+        self.reload_interval = reload_interval
         self.model = None
-        self.backend_searcher = None
+        self._index = None
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._last_reload_check = 0.0
+        
+    @property
+    def backend_searcher(self):
+        return self._index.backend if self._index else None
+        
+    @property
+    def container(self) -> Optional[LeannContainer]:
+        return self._index.container if self._index else None
+        
+    @property
+    def projection(self) -> Optional[Projection]:
+        return self._index.projection if self._index else None
         
     def load_model(self):
-        """Load embedding model"""
+        """Load embedding model (by default the one the index was built with)"""
         if self.model is None:
-            if self.embedding_mode == "sentence-transformers":
-                self.model = SentenceTransformer(self.embedding_model)
-            elif self.embedding_mode == "ollama":
-                # Ollama embedding mode
-                pass
-            elif self.embedding_mode == "gemini":
-                # Gemini embedding mode
-                pass
+            if self.embedding_model is None or self.embedding_mode is None:
+                meta = self._current_index().meta
+                self.embedding_model = self.embedding_model or meta.get('embedding_model', "all-MiniLM-L6-v2")
+                self.embedding_mode = self.embedding_mode or meta.get('embedding_mode', "sentence-transformers")
+            self.model = load_embedding_model(self.embedding_model, self.embedding_mode,
+                                              self.embedding_options)
         return self.model
-    
+        
     def load_index(self):
         """Load search index"""
-        if self.backend_searcher is None:
-            self.backend_searcher = HNSWSearcher()
-            self.backend_searcher.load_index(self.index_path)
-        return self.backend_searcher
-    
-    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
-        """Search index"""
-        if not self.backend_searcher:
+        if self._index is None:
+            with self._reload_lock:
+                if self._index is None:
+                    self._set_index(self._open_current())
+        return self._index.backend
+        
+    def _latest(self) -> Optional[Tuple[Any, str]]:
+        """(version, path) of the newest index on disk"""
+        from .segments import is_segmented, read_segments
+        # Checked every time, so an index converted to segments in place is picked up
+        self.segmented = is_segmented(self.index_path)
+        if self.segmented:
+            return read_segments(self.index_path)['generation'], self.index_path
+        if self.store is None:
+            return _index_file_version(self.index_path), self.index_path
+        return self.store.current()
+        
+    def _open(self, latest: Tuple[Any, str]):
+        from .segments import SegmentSet, is_segmented
+        segmented = is_segmented(latest[1])
+        if self.store is not None or (not segmented and is_container_file(latest[1])):
+            # Versions and containers are replaced whole, never rewritten in place
+            return LoadedIndex(latest[1], self.backend_kwargs, latest[0])
+            
+        # Plain index files are replaced one by one, and merges retire the
+        # segments they replace: accept a load only if the index did not
+        # change while it ran
+        for attempt in range(self.MAX_OPEN_ATTEMPTS):
+            try:
+                if segmented:
+                    previous = self._index if isinstance(self._index, SegmentSet) else None
+                    index = SegmentSet(latest[1], self.backend_kwargs, latest[0], previous=previous)
+                else:
+                    index = LoadedIndex(latest[1], self.backend_kwargs, latest[0])
+            except (TornIndexError, OSError, EOFError, pickle.UnpicklingError):
+                index = None
+            now = self._latest()
+            if index is not None and now == latest:
+                return index
+            latest = now
+            segmented = is_segmented(latest[1])
+            time.sleep(0.05 * (attempt + 1))
+        raise TornIndexError(f"{self.index_path} kept changing while being loaded")
+        
+    def _open_current(self):
+        latest = self._latest()
+        if latest is None:
+            raise FileNotFoundError(f"No published index version in {self.index_path}")
+        return self._open(latest)
+        
+    def _set_index(self, index: LoadedIndex):
+        # A single reference assignment: in-flight queries keep the old index
+        self._index = index
+        self.metrics.set('leann_index_documents', len(index.backend.documents))
+        
+    def _current_index(self) -> LoadedIndex:
+        """Loaded index for the next query, checking for a newer version"""
+        if self._index is None:
             self.load_index()
+        else:
+            now = time.monotonic()
+            if now - self._last_reload_check >= self.reload_interval:
+                self._last_reload_check = now
+                self._index.refresh_tombstones()
+                self.refresh()
+        return self._index
+        
+    def refresh(self, wait: bool = False) -> bool:
+        """Load a newer index version in the background; True if one was found"""
+        current = self._latest()
+        if current is None or (self._index is not None and current[0] == self._index.version):
+            return False
+        with self._reload_lock:
+            if self._reloading:
+                return True
+            self._reloading = True
+        thread = threading.Thread(target=self._reload, args=(current,),
+                                  name="leann-index-reload", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+        
+    def _reload(self, current: Tuple[str, str]):
+        try:
+            index = self._open(current)
+            index.warm()
+            self._set_index(index)
+            self.metrics.inc('leann_index_reloads_total')
+        except Exception as e:
+            logger.warning("Failed to load index version %s: %s", current[0], e)
+        finally:
+            self._reloading = False
+            
+    def index_version(self) -> Tuple:
+        """Version of the loaded index, including its tombstones"""
+        if self._index is None:
+            return (None, None)
+        return (self._index.version, self._index.tombstones_version)
+        
+    def embed_query(self, query: str) -> np.ndarray:
+        """Generate query embedding (projected like the indexed vectors)"""
+        index = self._current_index()
+        with self._query(), self.metrics.timer('leann_query_embedding_seconds'):
+            if self.embedding_function:
+                embedding = np.asarray(self.embedding_function(query))
+            else:
+                embedding = self.load_model().encode([query])[0]
+            return self._project(embedding, index.projection)
+            
+    def _query(self):
+        """Let a shared governor pause background builds during a query"""
+        return self.governor.query() if self.governor else nullcontext()
+        
+    @staticmethod
+    def _project(embedding: np.ndarray, projection: Optional[Projection]) -> np.ndarray:
+        """Apply the index projection to a full-size embedding"""
+        if projection is not None and projection.applies_to(embedding):
+            return projection.transform(embedding)
+        return embedding
+        
+    def search_embedding(self, query_embedding: np.ndarray, top_k: int = 10,
+                         query: Optional[str] = None) -> SearchResults:
+        """Search index with a precomputed query embedding"""
+        return self._search_backend(query_embedding, top_k, {}, query)
+        
+    def _search_backend(self, query_embedding: np.ndarray, top_k: int,
+                        timings: Dict[str, float], query: Optional[str]) -> SearchResults:
+        """Run backend search, recording stage timings
         
+        Hits come back as a SearchResults over the index's document store;
+        text and metadata are only read for the hits a caller looks at.
+        """
+        index = self._current_index()
+        self.metrics.inc('leann_queries_total')
+        backend = index.backend
+        query_embedding = self._project(query_embedding, index.projection)
+        
+        track_stats = self.slow_query_log is not None and hasattr(backend, 'reset_stats')
+        if track_stats:
+            backend.reset_stats()
+            
+        with self._query():
+            start = time.perf_counter()
+            if hasattr(backend, 'search_ids'):
+                scores, ids = backend.search_ids(query_embedding, top_k)
+                ann_end = time.perf_counter()
+                results = SearchResults(scores, ids, backend.documents, backend.metadata, index.ids,
+                                        reference_only=bool(index.meta.get('reference_only')))
+            else:
+                results = backend.search(query_embedding, top_k)
+                ann_end = time.perf_counter()
+                if index.meta.get('reference_only'):
+                    for result in results:
+                        result['stale'] = is_stale(result)
+                        
+        # Results are hydrated lazily as they are read, so there is no
+        # separate hydration stage to time here
+        timings['ann_search'] = ann_end - start
+        self.metrics.observe('leann_ann_search_seconds', timings['ann_search'])
+        
+        if self.slow_query_log is not None and self.slow_query_log.is_slow(sum(timings.values())):
+            stats = backend.get_stats() if track_stats else None
+            self.slow_query_log.record(query, top_k, timings, stats, index.path)
+            
+        return results
+        
+    def get_embeddings(self, ids: List[int]) -> Optional[np.ndarray]:
+        """Get stored vectors for result ids, if the backend keeps them"""
+        backend = self._current_index().backend
+        if not hasattr(backend, 'get_embeddings'):
+            return None
+        try:
+            return backend.get_embeddings(ids)
+        except RuntimeError:
+            return None
+            
+    def search(self, query: str, top_k: int = 10) -> SearchResults:
+        """Search index"""
         # Generate query embedding
-        if self.embedding_function:
-            query_embedding = self.embedding_function(query)
-        else:
-            model = self.load_model()
-            query_embedding = model.encode([query])[0]
+        start = time.perf_counter()
+        query_embedding = self.embed_query(query)
+        timings = {'embedding': time.perf_counter() - start}
         
         # Search backend
-        results = self.backend_searcher.search(query_embedding, top_k)
+        results = self._search_backend(query_embedding, top_k, timings, query)
         return results
+        
+    def search_batch(self, queries: List[str], top_k: int = 10) -> List[SearchResults]:
+        """Search several queries, embedding them in one model call"""
+        if not queries:
+            return []
+        start = time.perf_counter()
+        with self._query(), self.metrics.timer('leann_query_embedding_seconds'):
+            if self.embedding_function:
+                embeddings = [np.asarray(self.embedding_function(query)) for query in queries]
+            else:
+                embeddings = self.load_model().encode(queries)
+        # Projection happens per query in _search_backend
+        embedding_time = (time.perf_counter() - start) / len(queries)
+        return [
+            self._search_backend(embedding, top_k, {'embedding': embedding_time}, query)
+            for query, embedding in zip(queries, embeddings)
+        ]
+
+# Pooled LLM clients shared by all LeannChat instances
+_llm_client_lock = threading.Lock()
+_ollama_clients: Dict[Optional[str], Any] = {}
+# AsyncClient is bound to the event loop it first ran on, so async clients
+# are pooled per loop and dropped with it
+_ollama_async_clients: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_gemini_models: Dict[str, Any] = {}
+_gemini_configured = False
+
+def _get_ollama_client(host: Optional[str] = None, use_async: bool = False):
+    """Get pooled Ollama client (keeps the HTTP connection alive)
+    
+    Async clients must be requested from inside the loop that will use them.
+    """
+    with _llm_client_lock:
+        if use_async:
+            clients = _ollama_async_clients.setdefault(asyncio.get_running_loop(), {})
+        else:
+            clients = _ollama_clients
+        client = clients.get(host)
+        if client is None:
+            import ollama
+            client_cls = ollama.AsyncClient if use_async else ollama.Client
+            client = client_cls(host=host) if host else client_cls()
+            clients[host] = client
+        return client
+
+def _get_gemini_model(model_name: str):
+    """Get pooled Gemini model (configures the API key once)"""
+    global _gemini_configured
+    with _llm_client_lock:
+        model = _gemini_models.get(model_name)
+        if model is None:
+            import google.generativeai as genai
+            if not _gemini_configured:
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                _gemini_configured = True
+            model = genai.GenerativeModel(model_name)
+            _gemini_models[model_name] = model
+        return model
 
 class LeannChat:
     """LEANN Chat Interface"""
     
-    def __init__(self, index_path: str, llm_config: Dict[str, Any] = None):
+    GEMINI_MODEL = 'gemini-2.5-flash'
+    MAX_PREFETCH = 8
+    
+    def __init__(self, index_path: str, llm_config: Dict[str, Any] = None,
+                 cache: Optional[SemanticCache] = None,
+                 context_assembler: Optional[ContextAssembler] = None,
+                 metrics: Optional[MetricsRegistry] = None):
         self.index_path = index_path
         self.llm_config = llm_config or {"type": "ollama", "model": "llama3.2:latest"}
+        self.cache = cache
+        self.metrics = metrics or REGISTRY
+        self.context_assembler = context_assembler or ContextAssembler(
+            max_tokens=self.llm_config.get('context_tokens', 2048)
+        )
         self.searcher = None
+        self._searcher_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="leann-chat")
+        self._prefetched: Dict[Tuple[str, int], Future] = {}
+        self._prefetch_lock = threading.Lock()
+        
+    def close(self):
+        """Stop the prefetch worker threads"""
+        with self._prefetch_lock:
+            for future in self._prefetched.values():
+                future.cancel()
+            self._prefetched.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        
+    def __enter__(self) -> 'LeannChat':
+        return self
+        
+    def __exit__(self, *exc_info):
+        self.close()
         
     def load_searcher(self):
         """Load search interface"""
-        if self.searcher is None:
-            self.searcher = LeannSearcher(self.index_path)
+        with self._searcher_lock:
+            if self.searcher is None:
+                self.searcher = LeannSearcher(self.index_path, metrics=self.metrics)
+                self.searcher.load_index()
         return self.searcher
-    
-    def chat(self, query: str, context_limit: int = 5) -> str:
-        """Chat with RAG"""
+        
+    def prefetch(self, query: str, context_limit: int = 5) -> Future:
+        """Start retrieval for a query in the background"""
+        key = (query, context_limit)
+        with self._prefetch_lock:
+            future = self._prefetched.get(key)
+            if future is None:
+                # Drop the oldest unused prefetch
+                if len(self._prefetched) >= self.MAX_PREFETCH:
+                    self._prefetched.pop(next(iter(self._prefetched))).cancel()
+                future = self._executor.submit(self._search, query, context_limit)
+                self._prefetched[key] = future
+        return future
+        
+    def _search(self, query: str, context_limit: int) -> Tuple[SearchResults, np.ndarray]:
+        """Search for relevant context"""
         searcher = self.load_searcher()
+        query_embedding = searcher.embed_query(query)
+        results = searcher.search_embedding(query_embedding, top_k=context_limit, query=query)
+        return results, query_embedding
         
-        # Search for relevant context
-        results = searcher.search(query, top_k=context_limit)
+    def _retrieve(self, query: str, context_limit: int) -> Tuple[SearchResults, np.ndarray]:
+        """Get retrieval results, reusing a prefetch if one is pending"""
+        with self._prefetch_lock:
+            future = self._prefetched.pop((query, context_limit), None)
+        # A prefetch still queued behind busy workers is searched here instead:
+        # waiting on it from a worker could deadlock the pool
+        if future is not None and not future.cancel():
+            return future.result()
+        return self._search(query, context_limit)
         
-        # Prepare context
-        context = "\n".join([result['content'] for result in results])
+    def _build_prompt(self, query: str, context: str) -> str:
+        """Build RAG prompt"""
+        return f"""Context: {context}
+
+Question: {query}
+
+Answer:"""
+
+    def _prepare(self, query: str, context_limit: int) -> Dict[str, Any]:
+        """Retrieve context, check the answer cache and build prompt"""
+        results, query_embedding = self._retrieve(query, context_limit)
+        turn = {
+            'results': results,
+            'embedding': query_embedding,
+            'cache_key': None,
+            'cached': None,
+            'prompt': None
+        }
         
+        if self.cache is not None:
+            turn['cache_key'] = (
+                self.llm_config['type'],
+                self.llm_config.get('model'),
+                tuple(results.indices.tolist())
+            )
+            turn['version'] = self.searcher.index_version()
+            turn['cached'] = self.cache.get(query_embedding, turn['cache_key'], turn['version'])
+            self.metrics.inc('leann_cache_misses_total' if turn['cached'] is None else 'leann_cache_hits_total')
+            
+        if turn['cached'] is None:
+            with self.metrics.timer('leann_context_assembly_seconds'):
+                embeddings = self.searcher.get_embeddings(results.indices)
+                context = self.context_assembler.assemble(results, query, query_embedding, embeddings)
+            turn['prompt'] = self._build_prompt(query, context)
+        return turn
+        
+    def _store(self, turn: Dict[str, Any], tokens: List[str]):
+        """Store generated answer in the cache"""
+        if self.cache is not None:
+            self.cache.put(turn['embedding'], turn['cache_key'], "".join(tokens), turn['version'])
+            
+    def chat(self, query: str, context_limit: int = 5) -> str:
+        """Chat with RAG"""
+        return "".join(self.stream_chat(query, context_limit))
+        
+    def stream_chat(self, query: str, context_limit: int = 5) -> Iterator[str]:
+        """Chat with RAG, yielding response tokens as they arrive"""
+        turn = self._prepare(query, context_limit)
+        if turn['cached'] is not None:
+            yield turn['cached']
+            return
+            
         # Generate response
         if self.llm_config['type'] == 'ollama':
-            return self._ollama_chat(query, context)
+            stream, label = self._ollama_stream(turn['prompt']), "Ollama"
         elif self.llm_config['type'] == 'gemini':
-            return self._gemini_chat(query, context)
+            stream, label = self._gemini_stream(turn['prompt']), "Gemini"
         else:
-            return f"Found {len(results)} relevant documents for: {query}"
-    
-    def _ollama_chat(self, query: str, context: str) -> str:
-        """Ollama chat response"""
-        try:
-            import ollama
+            yield f"Found {len(turn['results'])} relevant documents for: {query}"
+            return
             
-            prompt = f"""Context: {context}
-
-Question: {query}
-
-Answer:"""
+        tokens = []
+        start = time.perf_counter()
+        try:
+            for token in stream:
+                if not tokens:
+                    self.metrics.observe('leann_llm_first_token_seconds', time.perf_counter() - start)
+                tokens.append(token)
+                yield token
+        except Exception as e:
+            yield f"{label} error: {e}"
+            return
+        self.metrics.observe('leann_llm_generation_seconds', time.perf_counter() - start)
+        self._store(turn, tokens)
+        
+    async def achat(self, query: str, context_limit: int = 5) -> str:
+        """Async chat with RAG"""
+        tokens = []
+        async for token in self.astream_chat(query, context_limit):
+            tokens.append(token)
+        return "".join(tokens)
+        
+    async def astream_chat(self, query: str, context_limit: int = 5) -> AsyncIterator[str]:
+        """Async chat with RAG, yielding response tokens as they arrive"""
+        loop = asyncio.get_running_loop()
+        turn = await loop.run_in_executor(self._executor, self._prepare, query, context_limit)
+        if turn['cached'] is not None:
+            yield turn['cached']
+            return
             
-            response = ollama.generate(
-                model=self.llm_config['model'],
-                prompt=prompt
-            )
+        if self.llm_config['type'] == 'ollama':
+            stream, label = self._ollama_astream(turn['prompt']), "Ollama"
+        elif self.llm_config['type'] == 'gemini':
+            stream, label = self._gemini_astream(turn['prompt']), "Gemini"
+        else:
+            yield f"Found {len(turn['results'])} relevant documents for: {query}"
+            return
             
-            return response['response']
+        tokens = []
+        start = time.perf_counter()
+        try:
+            async for token in stream:
+                if not tokens:
+                    self.metrics.observe('leann_llm_first_token_seconds', time.perf_counter() - start)
+                tokens.append(token)
+                yield token
+        except Exception as e:
+            yield f"{label} error: {e}"
+            return
+        self.metrics.observe('leann_llm_generation_seconds', time.perf_counter() - start)
+        self._store(turn, tokens)
+        
+    def _ollama_stream(self, prompt: str) -> Iterator[str]:
+        """Ollama streaming response"""
+        client = _get_ollama_client(self.llm_config.get('host'))
+        for chunk in client.generate(
+            model=self.llm_config['model'],
+            prompt=prompt,
+            stream=True
+        ):
+            if chunk['response']:
+                yield chunk['response']
+                
+    async def _ollama_astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async Ollama streaming response"""
+        client = _get_ollama_client(self.llm_config.get('host'), use_async=True)
+        stream = await client.generate(
+            model=self.llm_config['model'],
+            prompt=prompt,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk['response']:
+                yield chunk['response']
+                
+    def _gemini_stream(self, prompt: str) -> Iterator[str]:
+        """Gemini streaming response"""
+        model = _get_gemini_model(self.GEMINI_MODEL)
+        for chunk in model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+                
+    async def _gemini_astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async Gemini streaming response"""
+        model = _get_gemini_model(self.GEMINI_MODEL)
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+                
+    def _ollama_chat(self, query: str, context: str) -> str:
+        """Ollama chat response"""
+        try:
+            return "".join(self._ollama_stream(self._build_prompt(query, context)))
         except Exception as e:
             return f"Ollama error: {e}"
-    
+            
     def _gemini_chat(self, query: str, context: str) -> str:
         """Gemini chat response"""
         try:
-            import google.generativeai as genai
-            
-            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            prompt = f"""Context: {context}
-
-Question: {query}
-
-Answer:"""
-            
-            response = model.generate_content(prompt)
-            return response.text
+            return "".join(self._gemini_stream(self._build_prompt(query, context)))
         except Exception as e:
             return f"Gemini error: {e}"
 
-def compute_embeddings(texts: List[str], model: str = "all-MiniLM-L6-v2") -> np.ndarray:
+def compute_embeddings(texts: List[str], model: str = "all-MiniLM-L6-v2",
+                       embedding_mode: str = "sentence-transformers") -> np.ndarray:
     """Compute embeddings for texts"""
-    model = SentenceTransformer(model)
+    model = load_embedding_model(model, embedding_mode)
     return model.encode(texts)
\ No newline at end of file
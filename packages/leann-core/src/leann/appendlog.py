@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+LEANN Document Append Log
+
+Documents added to an existing multi-file index are appended to
+<index>.append.jsonl instead of rewriting the document store. Entries are
+written before the graph, so on load only as many entries as the graph has
+rows beyond the base store are used; a torn tail from a crash is ignored.
+Entries a crash left beyond the saved graph are cut off before the next
+append, so they never shift the rows that follow.
+"""
+
+import os
+import json
+from typing import List, Dict, Any, Optional, Tuple
+
+def append_log_path(path: str) -> str:
+    return path + '.append.jsonl'
+
+def append_documents(path: str, ids: List[str], documents: List[str],
+                     metadata: Optional[List[Dict[str, Any]]] = None):
+    """Append entries and fsync"""
+    metadata = metadata or [{}] * len(documents)
+    with open(append_log_path(path), 'a', encoding='utf-8') as f:
+        for doc_id, document, meta in zip(ids, documents, metadata):
+            f.write(json.dumps({'id': doc_id, 'content': document, 'metadata': meta},
+                               ensure_ascii=False, default=str) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_append_log(path: str, limit: int) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    """First `limit` complete entries as (ids, documents, metadata)"""
+    ids, documents, metadata = [], [], []
+    if limit <= 0:
+        return ids, documents, metadata
+    try:
+        with open(append_log_path(path), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                ids.append(entry['id'])
+                documents.append(entry['content'])
+                metadata.append(entry['metadata'])
+                if len(ids) >= limit:
+                    break
+    except FileNotFoundError:
+        pass
+    return ids, documents, metadata
+
+def truncate_append_log(path: str, entries: int):
+    """Drop everything after the first `entries` complete entries"""
+    try:
+        with open(append_log_path(path), 'r+b') as f:
+            offset = 0
+            for _ in range(entries):
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+    except FileNotFoundError:
+        pass
+
+def clear_append_log(path: str):
+    try:
+        os.remove(append_log_path(path))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+LEANN Semantic Answer Cache
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+
+class SemanticCache:
+    """Cache of LLM answers keyed by question embedding and retrieved context"""
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 256,
+                 ttl: Optional[float] = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        """L2-normalize embedding for cosine similarity"""
+        vector = np.asarray(embedding, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _check_version(self, index_version: Any):
+        """Drop all entries if the underlying index changed"""
+        if index_version != self.index_version:
+            self._clear()
+            self.index_version = index_version
+
+    def _clear(self):
+        self._entries.clear()
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def _evict(self, slot: int):
+        del self._entries[slot]
+        self._free_slots.append(slot)
+
+    def _expire(self, now: float):
+        """Drop entries older than the TTL"""
+        if self.ttl is None:
+            return
+        expired = [slot for slot, entry in self._entries.items()
+                   if now - entry['created'] > self.ttl]
+        for slot in expired:
+            self._evict(slot)
+
+    def get(self, embedding: np.ndarray, context_ids: Sequence[Any],
+            index_version: Any = None) -> Optional[str]:
+        """Return cached answer for a near-duplicate question, if any"""
+        context_key = tuple(context_ids)
+        with self._lock:
+            self._check_version(index_version)
+            self._expire(time.time())
+
+            vector = self._normalize(embedding)
+            # Entries embedded by another model (or projection) can never match
+            if not self._entries or self._vectors.shape[1] != len(vector):
+                self.misses += 1
+                return None
+
+            # Only compare against entries retrieved with the same context
+            slots = np.array([slot for slot, entry in self._entries.items()
+                              if entry['context_key'] == context_key])
+            if len(slots) == 0:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[slots] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            slot = int(slots[best])
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return self._entries[slot]['answer']
+
+    def put(self, embedding: np.ndarray, context_ids: Sequence[Any], answer: str,
+            index_version: Any = None):
+        """Store answer for a question"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._check_version(index_version)
+
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype='float32')
+                self._clear()
+
+            # Evict least recently used entry
+            if not self._free_slots:
+                self._evict(next(iter(self._entries)))
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._entries[slot] = {
+                'context_key': tuple(context_ids),
+                'answer': answer,
+                'created': time.time()
+            }
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
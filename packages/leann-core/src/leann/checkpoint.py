@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+LEANN Build Checkpoints
+
+Durable progress for long index builds, kept in a directory next to the
+index (<index>.checkpoint/):
+
+    state.json          fingerprint of the inputs and the embedded chunks
+    inputs.pkl          crawled documents, metadata and IDs (and how far an
+                        unfinished crawl got)
+    emb-<start>.npy     embeddings for rows [start, start + len)
+
+Embeddings are flushed every `interval` seconds, so a crash loses at most
+that much work. A checkpoint whose fingerprint no longer matches the inputs
+is discarded.
+"""
+
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'state.json'
+INPUTS_FILE = 'inputs.pkl'
+
+def checkpoint_path(index_path: str) -> str:
+    return index_path.rstrip(os.sep) + '.checkpoint'
+
+def fingerprint(documents: List[str], *parts: Any) -> str:
+    """Hash of the document texts and whatever else determines their embeddings"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(part) for part in parts]).encode())
+    digest.update(str(len(documents)).encode())
+    for doc in documents:
+        digest.update(doc.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _atomic_write(path: str, write):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class BuildCheckpoint:
+    """Embedding progress of one build, resumable after a crash"""
+    
+    def __init__(self, path: str, interval: float = 60.0):
+        self.path = path
+        self.interval = interval
+        self.fingerprint = None
+        self.chunks: List[Dict[str, Any]] = []
+        self.rows = 0
+        self._pending: List[np.ndarray] = []
+        self._last_flush = time.monotonic()
+        
+    def exists(self) -> bool:
+        return os.path.isfile(os.path.join(self.path, STATE_FILE))
+        
+    def open(self, fingerprint: str) -> int:
+        """Adopt a matching checkpoint (or start a new one); returns rows already embedded"""
+        state = None
+        if self.exists():
+            with open(os.path.join(self.path, STATE_FILE), 'r') as f:
+                state = json.load(f)
+            if state.get('fingerprint') != fingerprint:
+                logger.warning("Inputs changed since the checkpoint, starting over")
+                self._clear_embeddings()
+                state = None
+        os.makedirs(self.path, exist_ok=True)
+        self.fingerprint = fingerprint
+        self.chunks = state['chunks'] if state else []
+        self.rows = sum(chunk['rows'] for chunk in self.chunks)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        if not state:
+            self._write_state()
+        return self.rows
+        
+    def load(self) -> List[np.ndarray]:
+        """Embeddings saved so far, in row order"""
+        return [np.load(os.path.join(self.path, chunk['file'])) for chunk in self.chunks]
+        
+    def add(self, embeddings: np.ndarray):
+        """Record one embedded batch, flushing if the interval has passed"""
+        self._pending.append(np.asarray(embeddings, dtype='float32'))
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+            
+    def flush(self):
+        """Make pending embeddings durable"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        embeddings = np.concatenate(self._pending)
+        name = f"emb-{self.rows:010d}.npy"
+        _atomic_write(os.path.join(self.path, name), lambda f: np.save(f, embeddings))
+        self.chunks.append({'file': name, 'start': self.rows, 'rows': len(embeddings)})
+        self.rows += len(embeddings)
+        self._pending = []
+        self._write_state()
+        
+    def _write_state(self):
+        state = {'fingerprint': self.fingerprint, 'chunks': self.chunks, 'updated_at': time.time()}
+        _atomic_write(os.path.join(self.path, STATE_FILE), lambda f: f.write(json.dumps(state).encode()))
+        
+    def save_inputs(self, documents: List[str], metadata: List[Dict], ids: Optional[List[str]] = None,
+                    crawl: Optional[Dict[str, Any]] = None):
+        """Keep the crawl result so a resumed build doesn't walk the inputs again
+        
+        Saved part way through a crawl, `crawl` records (caller-defined) how
+        far it got.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        _atomic_write(os.path.join(self.path, INPUTS_FILE),
+                      lambda f: pickle.dump({'documents': documents, 'metadata': metadata, 'ids': ids,
+                                             'crawl': crawl}, f))
+                      
+    def _read_inputs(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path, INPUTS_FILE), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+            
+    def load_inputs(self) -> Optional[Tuple[List[str], List[Dict], Optional[List[str]]]]:
+        data = self._read_inputs()
+        if data is None:
+            return None
+        return data['documents'], data['metadata'], data['ids']
+        
+    def load_crawl(self) -> Optional[Tuple[List[str], List[Dict], Dict[str, Any]]]:
+        """(documents, metadata, crawl state) of a crawl saved with save_inputs(crawl=...)"""
+        data = self._read_inputs()
+        if data is None or data.get('crawl') is None:
+            return None
+        return data['documents'], data['metadata'], data['crawl']
+        
+    def _clear_embeddings(self):
+        for name in os.listdir(self.path):
+            if name.startswith('emb-') or name.startswith(STATE_FILE):
+                os.remove(os.path.join(self.path, name))
+                
+    def clear(self):
+        """Remove the checkpoint once the index is saved"""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.chunks = []
+        self.rows = 0
+        self._pending = []
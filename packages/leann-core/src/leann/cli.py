@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+LEANN Command Line Interface
+
+Usage:
+    python -m leann build my_index --input ~/Documents notes.jsonl
+    python -m leann build my_index --input ~/Documents notes.jsonl --resume
+    python -m leann update my_index
+    python -m leann search my_index "how do I configure hnsw" -k 5
+    python -m leann bench my_index --num-queries 200
+    python -m leann stats my_index
+    python -m leann serve my_index --port 8080
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+from .api import LeannBuilder, LeannSearcher, read_index_meta
+from .ingest import iter_files, load_directories, load_file, load_jsonl, file_manifest
+from .metrics import REGISTRY
+from .governor import ResourceGovernor
+from .versions import IndexStore
+from .segments import SegmentedIndex, is_segmented
+from .checkpoint import BuildCheckpoint, checkpoint_path
+
+# Segmented builds write (and can resume from) one segment per this many chunks
+SEGMENT_BUILD_ROWS = 10000
+
+class Progress:
+    """Throttled progress printer; the per-item cost is one clock read"""
+    
+    def __init__(self, label: str, interval: Optional[float] = None, stream=None):
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.is_tty = self.stream.isatty()
+        self.interval = interval if interval is not None else (0.2 if self.is_tty else 10.0)
+        self.start = time.monotonic()
+        self.next_update = self.start + self.interval
+        self.done = 0
+        self.total = None
+        
+    def __call__(self, done: int, total: Optional[int] = None):
+        self.done, self.total = done, total
+        now = time.monotonic()
+        if now >= self.next_update:
+            self.next_update = now + self.interval
+            self._print(now)
+            
+    def _print(self, now: float, end: str = ""):
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            line = f"{self.label}: {self.done}/{self.total} ({self.done / self.total:.0%}) {rate:.0f}/s"
+        else:
+            line = f"{self.label}: {self.done} {rate:.0f}/s"
+        if self.is_tty:
+            self.stream.write("\r" + line + end)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+        
+    def finish(self):
+        self._print(time.monotonic(), end="\n" if self.is_tty else "")
+
+def _parse_backend_args(pairs: List[str]) -> Dict[str, Any]:
+    """Parse key=value pairs, decoding values as JSON when possible"""
+    kwargs = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition('=')
+        try:
+            kwargs[key] = json.loads(value)
+        except json.JSONDecodeError:
+            kwargs[key] = value
+    return kwargs
+
+def _load_inputs(inputs: List[str], args) -> tuple:
+    """Read documents from directories and JSONL files, with per-chunk IDs"""
+    documents, metadata, ids = [], [], []
+    folders = [path for path in inputs if os.path.isdir(path)]
+    jsonl_files = [path for path in inputs if not os.path.isdir(path)]
+    
+    for path in jsonl_files:
+        file_documents, file_metadata = load_jsonl(path, args.text_field)
+        documents.extend(file_documents)
+        metadata.extend(file_metadata)
+        ids.extend(f"{path}#{i}" for i in range(len(file_documents)))
+        
+    if folders:
+        progress = Progress("📁 Reading files")
+        folder_documents, folder_metadata = load_directories(
+            folders, args.extensions, args.max_files, args.chunk_size, progress,
+            reference_only=getattr(args, 'reference_only', False)
+        )
+        progress.finish()
+        documents.extend(folder_documents)
+        metadata.extend(folder_metadata)
+        ids.extend(f"{meta['file_path']}#{meta['chunk_id']}" for meta in folder_metadata)
+    return documents, metadata, ids
+
+def _input_manifest(inputs: List[str], args) -> Dict[str, List[int]]:
+    folders = [path for path in inputs if os.path.isdir(path)]
+    paths = [path for path in inputs if not os.path.isdir(path)]
+    paths.extend(path for _, path in iter_files(folders, args.extensions, args.max_files))
+    return file_manifest(paths)
+
+def _embedding_options(args) -> Dict[str, Any]:
+    workers = getattr(args, 'workers', None)
+    return {} if workers is None else {'num_workers': workers}
+
+def _compression(args) -> Optional[str]:
+    compression = getattr(args, 'compression', "auto")
+    return None if compression == "none" else compression
+
+def _save(builder: LeannBuilder, index: str, args):
+    if getattr(args, 'versioned', False) or IndexStore.is_store(index):
+        version = builder.save_version(index)
+        print(f"📌 Published version {version}", file=sys.stderr)
+    else:
+        builder.save_index(index)
+
+def _write_manifest(index: str, inputs: List[str], args):
+    """Remember inputs and options so `update` can repeat the build"""
+    with open(index + '.manifest.json', 'w') as f:
+        json.dump({
+            'inputs': inputs,
+            'options': {
+                'text_field': args.text_field, 'extensions': args.extensions,
+                'max_files': args.max_files, 'chunk_size': args.chunk_size,
+                'model': args.model, 'embedding_mode': args.embedding_mode,
+                'backend': args.backend, 'backend_arg': args.backend_arg,
+                'batch_size': args.batch_size, 'workers': getattr(args, 'workers', None),
+                'reduce_dim': getattr(args, 'reduce_dim', None),
+                'reduction': getattr(args, 'reduction', "pca"),
+                'background': getattr(args, 'background', False),
+                'versioned': getattr(args, 'versioned', False),
+                'segmented': getattr(args, 'segmented', False),
+                'compression': getattr(args, 'compression', "auto"),
+                'reference_only': getattr(args, 'reference_only', False)
+            },
+            'id_scheme': 'path#chunk',
+            'files': _input_manifest(inputs, args),
+            'built_at': time.time()
+        }, f)
+
+def _build(index: str, args) -> int:
+    inputs = [os.path.abspath(path) for path in args.input]
+    if getattr(args, 'reference_only', False) and not all(os.path.isdir(path) for path in inputs):
+        print("❌ --reference-only indexes directories only (JSONL records have no source file)", file=sys.stderr)
+        return 1
+    resume = getattr(args, 'resume', False)
+    checkpoint = BuildCheckpoint(checkpoint_path(index))
+    crawled = checkpoint.load_inputs() if resume else None
+    if crawled:
+        print("♻️ Resuming from checkpoint, skipping the crawl", file=sys.stderr)
+        documents, metadata, ids = crawled
+    else:
+        if not resume:
+            checkpoint.clear()
+        documents, metadata, ids = _load_inputs(inputs, args)
+        if documents:
+            checkpoint.save_inputs(documents, metadata, ids)
+    if not documents:
+        print("❌ No documents found", file=sys.stderr)
+        return 1
+    print(f"📄 {len(documents)} chunks", file=sys.stderr)
+    
+    options = dict(
+        embedding_model=args.model,
+        embedding_mode=args.embedding_mode,
+        backend_name=args.backend,
+        backend_kwargs=_parse_backend_args(args.backend_arg),
+        embedding_options=_embedding_options(args),
+        reduce_dimensions=getattr(args, 'reduce_dim', None),
+        reduction_method=getattr(args, 'reduction', "pca"),
+        governor=ResourceGovernor() if getattr(args, 'background', False) else None,
+        compression=_compression(args),
+        reference_only=getattr(args, 'reference_only', False)
+    )
+    start = time.time()
+    if getattr(args, 'segmented', False):
+        # A full build replaces every segment; a resumed one keeps those already written
+        if is_segmented(index) and not resume:
+            shutil.rmtree(index)
+        segmented = SegmentedIndex(index, **options)
+        done = set(segmented.ids)
+        todo = [i for i, doc_id in enumerate(ids) if doc_id not in done]
+        progress = Progress("🤖 Embedding")
+        for offset in range(0, len(todo), SEGMENT_BUILD_ROWS):
+            rows = todo[offset:offset + SEGMENT_BUILD_ROWS]
+            segmented.add_documents([documents[i] for i in rows], [metadata[i] for i in rows],
+                                    [ids[i] for i in rows], batch_size=args.batch_size)
+            progress(len(documents) - len(todo) + offset + len(rows), len(documents))
+        progress.finish()
+        segmented.wait_for_merges()
+        checkpoint.clear()
+    else:
+        builder = LeannBuilder(**options)
+        progress = Progress("🤖 Embedding")
+        builder.build_index(documents, metadata, batch_size=args.batch_size, progress_callback=progress,
+                            ids=ids, checkpoint=checkpoint)
+        progress.finish()
+        _save(builder, index, args)
+    _write_manifest(index, inputs, args)
+    print(f"✅ Index built with {len(documents)} chunks in {time.time() - start:.1f}s: {index}", file=sys.stderr)
+    return 0
+
+def cmd_build(args) -> int:
+    return _build(args.index, args)
+
+def cmd_update(args) -> int:
+    try:
+        with open(args.index + '.manifest.json', 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ No manifest for {args.index}; run `build` first", file=sys.stderr)
+        return 1
+        
+    build_args = argparse.Namespace(**manifest['options'])
+    build_args.input = manifest['inputs']
+    current = _input_manifest(manifest['inputs'], build_args)
+    if current == manifest['files'] and not args.force:
+        print("✅ Index is up to date", file=sys.stderr)
+        return 0
+        
+    previous = manifest['files']
+    changed = {path for path in set(current) | set(previous) if current.get(path) != previous.get(path)}
+    if args.force or manifest.get('id_scheme') != 'path#chunk':
+        print(f"🔄 {len(changed)} input files changed, rebuilding", file=sys.stderr)
+        return _build(args.index, build_args)
+    
+    # Re-embed only changed files: drop their old chunks, insert the new ones
+    print(f"🔄 {len(changed)} input files changed, updating", file=sys.stderr)
+    start = time.time()
+    options = dict(
+        embedding_options=_embedding_options(build_args),
+        governor=ResourceGovernor() if getattr(build_args, 'background', False) else None,
+        compression=_compression(build_args)
+    )
+    if is_segmented(args.index):
+        builder = SegmentedIndex(args.index, **options)
+    else:
+        builder = LeannBuilder.open(args.index, **options)
+    stale = [doc_id for doc_id in builder.ids if doc_id.rpartition('#')[0] in changed]
+    builder.delete(stale)
+    
+    documents, metadata, ids = [], [], []
+    folders = [path for path in build_args.input if os.path.isdir(path)]
+    for folder, path in iter_files(folders, build_args.extensions, build_args.max_files):
+        if path in changed:
+            file_documents, file_metadata = load_file(folder, path, build_args.chunk_size,
+                                                       getattr(build_args, 'reference_only', False))
+            documents.extend(file_documents)
+            metadata.extend(file_metadata)
+            ids.extend(f"{path}#{meta['chunk_id']}" for meta in file_metadata)
+    for path in build_args.input:
+        if not os.path.isdir(path) and path in changed and os.path.exists(path):
+            file_documents, file_metadata = load_jsonl(path, build_args.text_field)
+            documents.extend(file_documents)
+            metadata.extend(file_metadata)
+            ids.extend(f"{path}#{i}" for i in range(len(file_documents)))
+    builder.upsert(documents, ids, metadata, batch_size=build_args.batch_size)
+    if isinstance(builder, SegmentedIndex):
+        # Segments are already on disk; just let merges finish
+        builder.wait_for_merges()
+    else:
+        builder.wait_for_compaction()
+        _save(builder, args.index, build_args)
+    _write_manifest(args.index, build_args.input, build_args)
+    print(f"✅ Removed {len(stale)} and added {len(documents)} chunks in {time.time() - start:.1f}s",
+          file=sys.stderr)
+    return 0
+
+def _searcher(index: str, args) -> LeannSearcher:
+    # Model and mode default to the ones recorded in the index
+    searcher = LeannSearcher(index, embedding_model=args.model)
+    searcher.load_index()
+    return searcher
+
+def _printable(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: (value.item() if isinstance(value, np.generic) else value) for key, value in result.items()}
+
+def cmd_search(args) -> int:
+    searcher = _searcher(args.index, args)
+    start = time.perf_counter()
+    results = searcher.search(args.query, top_k=args.k)
+    elapsed = time.perf_counter() - start
+    
+    if args.json:
+        print(json.dumps([_printable(r) for r in results], ensure_ascii=False))
+        return 0
+    for i, result in enumerate(results):
+        source = result.get('file_path') or result.get('source') or f"#{result['index']}"
+        snippet = ' '.join(result['content'].split())[:200]
+        stale = " ⚠️ changed since indexing" if result.get('stale') else ""
+        print(f"{i + 1}. {source} (Score: {result['score']:.3f}){stale}\n   {snippet}")
+    print(f"⏱️ {len(results)} results in {elapsed * 1000:.1f}ms", file=sys.stderr)
+    return 0
+
+def cmd_bench(args) -> int:
+    searcher = _searcher(args.index, args)
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        # Use the opening words of random stored chunks as queries
+        documents = searcher.backend_searcher.documents
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(documents), min(args.num_queries, len(documents)), replace=False)
+        queries = [' '.join(documents[i].split()[:12]) for i in picks]
+        
+    for query in queries[:args.warmup]:
+        searcher.search(query, top_k=args.k)
+        
+    REGISTRY.reset()
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        searcher.search(query, top_k=args.k)
+        latencies.append(time.perf_counter() - start)
+    ms = np.asarray(latencies) * 1000
+    
+    report = {
+        'queries': len(queries),
+        'k': args.k,
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'qps': float(len(queries) / (ms.sum() / 1000)),
+        'stages_mean_ms': {
+            name: h['sum'] / h['count'] * 1000
+            for name, h in REGISTRY.snapshot()['histograms'].items() if h['count']
+        }
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"📊 {report['queries']} queries, k={report['k']}: mean={report['mean_ms']:.2f}ms "
+          f"p50={report['p50_ms']:.2f}ms p99={report['p99_ms']:.2f}ms qps={report['qps']:.0f}")
+    for name, mean in report['stages_mean_ms'].items():
+        print(f"  {name:<34} {mean:.3f}ms")
+    return 0
+
+def cmd_stats(args) -> int:
+    meta = read_index_meta(args.index)
+    searcher = _searcher(args.index, args)
+    if searcher.segmented:
+        paths = glob.glob(os.path.join(glob.escape(args.index), '**', '*'), recursive=True)
+    else:
+        prefix = searcher.store.current()[1] if searcher.store else args.index
+        paths = glob.glob(glob.escape(prefix) + '*')
+    files = {path: os.path.getsize(path) for path in sorted(paths) if os.path.isfile(path)}
+    stats = {
+        'index': args.index,
+        'documents': len(searcher.backend_searcher.documents),
+        'meta': meta,
+        'files': files,
+        'disk_bytes': sum(files.values())
+    }
+    if searcher.segmented:
+        stats['segments'] = len(searcher.backend_searcher.segments)
+    if searcher.container is not None:
+        stats['format_version'] = searcher.container.format_version
+        stats['sections'] = {name: info['length'] for name, info in searcher.container.table.items()}
+        stats['corrupt_sections'] = searcher.container.verify()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    print(f"📦 {args.index}")
+    print(f"  Documents: {stats['documents']}")
+    if 'segments' in stats:
+        print(f"  Segments: {stats['segments']}")
+    for key, value in meta.items():
+        print(f"  {key}: {value}")
+    for path, size in files.items():
+        print(f"  {os.path.basename(path):<40} {size / 1e6:10.2f} MB")
+    print(f"  Total: {stats['disk_bytes'] / 1e6:.2f} MB")
+    if 'sections' in stats:
+        print(f"  Container format v{stats['format_version']}")
+        for name, size in stats['sections'].items():
+            print(f"    {name:<38} {size / 1e6:10.2f} MB")
+        if stats['corrupt_sections']:
+            print(f"  ❌ Checksum mismatch: {', '.join(stats['corrupt_sections'])}")
+            return 1
+        print("  ✅ Checksums OK")
+    return 0
+
+def cmd_serve(args) -> int:
+    searcher = _searcher(args.index, args)
+    
+    class SearchHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def _send_json(self, status: int, data: Any):
+            self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+            
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            elif url.path == '/metrics':
+                self._send(200, REGISTRY.render_prometheus().encode('utf-8'),
+                           'text/plain; version=0.0.4; charset=utf-8')
+            elif url.path == '/search':
+                params = parse_qs(url.query)
+                query = params.get('q', [''])[0]
+                if not query:
+                    self._send_json(400, {'error': "missing 'q' parameter"})
+                    return
+                try:
+                    top_k = int(params.get('k', ['10'])[0])
+                except ValueError:
+                    self._send_json(400, {'error': "'k' must be an integer"})
+                    return
+                results = searcher.search(query, top_k=top_k)
+                self._send_json(200, {'query': query, 'results': [_printable(r) for r in results]})
+            else:
+                self._send_json(404, {'error': 'not found'})
+                
+        def log_message(self, format, *args):
+            pass
+            
+    server = ThreadingHTTPServer((args.host, args.port), SearchHandler)
+    print(f"🚀 Serving {args.index} on http://{args.host}:{args.port} (/search, /metrics, /health)",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped", file=sys.stderr)
+    finally:
+        server.server_close()
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='leann', description="Build, update and query LEANN indexes")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    def add_build_options(p):
+        p.add_argument('--text-field', default='text', help="JSONL field holding document text")
+        p.add_argument('--extensions', nargs='+', help="File extensions to index")
+        p.add_argument('--max-files', type=int)
+        p.add_argument('--chunk-size', type=int, default=1000)
+        p.add_argument('--model', default="all-MiniLM-L6-v2")
+        p.add_argument('--embedding-mode', default="sentence-transformers")
+        p.add_argument('--backend', default="hnsw")
+        p.add_argument('--backend-arg', action='append', metavar='KEY=VALUE', help="Backend option (repeatable)")
+        p.add_argument('--batch-size', type=int, default=256)
+        p.add_argument('--workers', type=int, help="Embed in N pinned worker processes (0 = auto)")
+        p.add_argument('--reduce-dim', type=int, help="Reduce embeddings to this many dimensions")
+        p.add_argument('--reduction', choices=["pca", "truncate"], default="pca",
+                       help="PCA fit on a sample, or truncation for Matryoshka models")
+        p.add_argument('--background', action='store_true',
+                       help="Build at low priority on half the cores")
+        p.add_argument('--versioned', action='store_true',
+                       help="Treat the index path as a versioned store; searchers hot-reload new builds")
+        p.add_argument('--segmented', action='store_true',
+                       help="Store the index as immutable segments merged in the background")
+        p.add_argument('--compression', choices=["auto", "zstd", "zlib", "none"], default="auto",
+                       help="Block compression for document text in .leann indexes (auto = zstd if installed)")
+        p.add_argument('--reference-only', action='store_true',
+                       help="Store file offsets and hashes instead of chunk text; text is read from the files")
+        
+    p = subparsers.add_parser('build', help="Build an index from directories and/or JSONL files")
+    p.add_argument('index')
+    p.add_argument('--input', nargs='+', required=True)
+    p.add_argument('--resume', action='store_true',
+                   help="Continue an interrupted build from its checkpoint")
+    add_build_options(p)
+    p.set_defaults(func=cmd_build)
+    
+    p = subparsers.add_parser('update', help="Re-embed only the inputs that changed since the last build")
+    p.add_argument('index')
+    p.add_argument('--force', action='store_true', help="Rebuild from scratch")
+    p.set_defaults(func=cmd_update)
+    
+    p = subparsers.add_parser('search', help="Query an index")
+    p.add_argument('index')
+    p.add_argument('query')
+    p.add_argument('-k', type=int, default=10)
+    p.add_argument('--model', help="Override the embedding model recorded in the index")
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_search)
+    
+    p = subparsers.add_parser('bench', help="Measure query latency on an index")
+    p.add_argument('index')
+    p.add_argument('--queries', help="File with one query per line (default: sample stored chunks)")
+    p.add_argument('--num-queries', type=int, default=100)
+    p.add_argument('--warmup', type=int, default=5)
+    p.add_argument('-k', type=int, default=10)
+    p.add_argument('--model')
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_bench)
+    
+    p = subparsers.add_parser('stats', help="Show index metadata and size")
+    p.add_argument('index')
+    p.add_argument('--model')
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(func=cmd_stats)
+    
+    p = subparsers.add_parser('serve', help="Serve /search and /metrics over HTTP")
+    p.add_argument('index')
+    p.add_argument('--host', default="127.0.0.1")
+    p.add_argument('--port', type=int, default=8080)
+    p.add_argument('--model')
+    p.set_defaults(func=cmd_serve)
+    
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    # Show the library's notices (resumed builds, failed reloads) on stderr
+    logging.basicConfig(format='%(message)s')
+    logging.getLogger('leann').setLevel(logging.INFO)
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+LEANN Single-File Index Container
+
+Layout of a .leann file:
+
+    MAGIC (8 bytes) | format version (u32) | header length (u32) | header JSON
+    padding to ALIGNMENT
+    sections, each starting on an ALIGNMENT boundary
+
+The header records the index metadata (backend, embedding model, dimension,
+metric, build params) and, per section, its offset relative to the first
+section, dtype, shape and CRC32. Sections are read as numpy views of a
+read-only mmap, so opening an index does not deserialize documents,
+metadata or vectors.
+
+Since format version 2, documents and IDs are stored as dictionary-compressed
+blocks (see docstore) and repetitive metadata columns such as file paths as
+codes into their distinct values.
+"""
+
+import os
+import json
+import mmap
+import zlib
+import struct
+from collections.abc import Sequence
+from typing import List, Dict, Any, Optional, Tuple, Callable
+import numpy as np
+
+from .docstore import (CompressedStrings, DictColumn, compress_strings, dictionary_encode,
+                       default_codec, SUFFIXES)
+
+MAGIC = b'LEANNIDX'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+CONTAINER_SUFFIX = '.leann'
+_PREAMBLE = struct.Struct('<8sII')
+
+def is_container(path: str) -> bool:
+    """Whether path names a single-file index (existing or to be written)"""
+    if path.endswith(CONTAINER_SUFFIX):
+        return True
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def is_container_file(path: str) -> bool:
+    """Whether path is an existing single-file index
+    
+    Older indexes saved under a .leann name are a set of .faiss/.pkl/
+    .meta.json files next to it, with no file at the path itself.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _encode_strings(values: List[Optional[str]]):
+    """UTF-8 blob plus int64 offsets (n + 1); None is stored as empty"""
+    encoded = [value.encode('utf-8') if value else b'' for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype='uint8'), offsets
+
+def _metadata_columns(metadata: List[Dict[str, Any]]) -> Dict[str, List[Optional[str]]]:
+    """Metadata rows as per-key columns of JSON-encoded values"""
+    keys = []
+    for row in metadata:
+        keys.extend(key for key in row if key not in keys)
+    return {
+        key: [json.dumps(row[key], default=str) if key in row else None for row in metadata]
+        for key in keys
+    }
+
+def _metadata_sections(metadata: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str]]:
+    """(keys, sections, encodings) of metadata stored column by column"""
+    columns = _metadata_columns(metadata)
+    sections, encodings = {}, {}
+    # Paths, folders and other repeated values become codes into a distinct list
+    for key, values in columns.items():
+        encoded = dictionary_encode(values)
+        if encoded is None:
+            sections[f'metadata.{key}'], sections[f'metadata.{key}.offsets'] = _encode_strings(values)
+            continue
+        codes, distinct = encoded
+        sections[f'metadata.{key}.codes'] = codes
+        sections[f'metadata.{key}.values'], sections[f'metadata.{key}.values.offsets'] = _encode_strings(distinct)
+        encodings[key] = 'dict'
+    return list(columns), sections, encodings
+
+def write_container(path: str, meta: Dict[str, Any], sections: Dict[str, np.ndarray],
+                    documents: List[str], metadata: Optional[List[Dict[str, Any]]] = None,
+                    ids: Optional[List[str]] = None, compression: Optional[str] = 'auto'):
+    """Write an index as a single .leann file (atomically)
+    
+    compression is 'zstd', 'zlib', 'auto' (zstd if installed) or None for
+    plain strings.
+    """
+    sections = {name: np.ascontiguousarray(array) for name, array in sections.items()}
+    codec = default_codec() if compression == 'auto' else compression
+    codecs = {}
+    for name, values in (('documents', documents), ('ids', ids)):
+        if values is None:
+            continue
+        if codec:
+            for suffix, array in compress_strings(values, codec).items():
+                sections[f'{name}.{suffix}'] = array
+            codecs[name] = codec
+        else:
+            sections[name], sections[f'{name}.offsets'] = _encode_strings(values)
+            
+    keys, metadata_sections, encodings = _metadata_sections(metadata or [])
+    sections.update(metadata_sections)
+    
+    table = {}
+    offset = 0
+    for name, array in sections.items():
+        table[name] = {
+            'offset': offset,
+            'length': array.nbytes,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'crc32': zlib.crc32(memoryview(array).cast('B'))
+        }
+        offset = _align(offset + array.nbytes)
+        
+    header = json.dumps({
+        'meta': meta,
+        'num_documents': len(documents),
+        'metadata_columns': keys,
+        'metadata_encoding': encodings,
+        'codecs': codecs,
+        'sections': table
+    }).encode('utf-8')
+    
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        data_start = _align(f.tell())
+        for name, array in sections.items():
+            f.write(b'\0' * (data_start + table[name]['offset'] - f.tell()))
+            f.write(memoryview(array).cast('B'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_container_meta(path: str) -> Dict[str, Any]:
+    """Read only the header metadata of a .leann file"""
+    with open(path, 'rb') as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a LEANN index: {path}")
+        return json.loads(f.read(header_length))['meta']
+
+class StringColumn(Sequence):
+    """Lazily decoded strings backed by a blob and offsets"""
+    
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+        
+    def raw(self, index: int) -> bytes:
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes()
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.raw(index).decode('utf-8')
+
+class MetadataRows(Sequence):
+    """Metadata dicts assembled on access from per-key columns"""
+    
+    def __init__(self, columns: Dict[str, StringColumn], num_rows: int):
+        self.columns = columns
+        self.num_rows = num_rows if columns else 0
+        
+    def __len__(self) -> int:
+        return self.num_rows
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        row = {}
+        for key, column in self.columns.items():
+            value = column.raw(index)
+            if value:
+                row[key] = json.loads(value)
+        return row
+
+def _metadata_column(section: Callable[[str], np.ndarray], key: str, encoding: Optional[str]):
+    prefix = f'metadata.{key}'
+    if encoding == 'dict':
+        values = StringColumn(section(f'{prefix}.values'), section(f'{prefix}.values.offsets'))
+        return DictColumn(section(f'{prefix}.codes'), values)
+    return StringColumn(section(prefix), section(f'{prefix}.offsets'))
+
+def metadata_rows(metadata: List[Dict[str, Any]]) -> MetadataRows:
+    """In-memory columnar metadata, encoded as in a container"""
+    keys, sections, encodings = _metadata_sections(metadata)
+    return MetadataRows({key: _metadata_column(sections.__getitem__, key, encodings.get(key)) for key in keys},
+                        len(metadata))
+
+class LeannContainer:
+    """Read-only, memory-mapped view of a .leann file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = _PREAMBLE.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"Not a LEANN index: {path}")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {version}, newer than supported {FORMAT_VERSION}")
+        self.format_version = version
+        header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        self.meta = header['meta']
+        self.table = header['sections']
+        self.num_documents = header['num_documents']
+        self.codecs = header.get('codecs', {})
+        self._data_start = _align(_PREAMBLE.size + header_length)
+        self.documents = self._strings('documents')
+        encodings = header.get('metadata_encoding', {})
+        self.metadata = MetadataRows({
+            key: _metadata_column(self.section, key, encodings.get(key)) for key in header['metadata_columns']
+        }, self.num_documents)
+        self.ids = self._strings('ids') if 'ids' in self.table or 'ids.blocks' in self.table else None
+        
+    def _strings(self, name: str):
+        if name in self.codecs:
+            return CompressedStrings.from_sections(
+                self.codecs[name], {suffix: self.section(f'{name}.{suffix}') for suffix in SUFFIXES}
+            )
+        return StringColumn(self.section(name), self.section(f'{name}.offsets'))
+        
+    def section(self, name: str) -> np.ndarray:
+        """Zero-copy view of a section"""
+        info = self.table[name]
+        dtype = np.dtype(info['dtype'])
+        if not info['length']:
+            return np.empty(info['shape'], dtype=dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=info['length'] // dtype.itemsize,
+                             offset=self._data_start + info['offset']).reshape(info['shape'])
+                             
+    @property
+    def sections(self) -> Dict[str, np.ndarray]:
+        return {name: self.section(name) for name in self.table}
+        
+    def verify(self, names: Optional[List[str]] = None) -> List[str]:
+        """Check CRC32s, returning the names of corrupt sections"""
+        return [
+            name for name in (names or self.table)
+            if zlib.crc32(memoryview(self.section(name)).cast('B')) != self.table[name]['crc32']
+        ]
+        
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Sections still referenced; the map closes when they are freed
+            pass
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+LEANN Context Assembly
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Sequence
+import numpy as np
+
+# Shorter suffix/prefix matches between chunks are treated as coincidence
+MIN_OVERLAP = 16
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return (len(text) + 3) // 4
+
+def join_overlapping(first: str, second: str) -> str:
+    """Join two consecutive chunks, keeping the text they share only once"""
+    for size in range(min(len(first), len(second)), MIN_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + " " + second
+
+class ContextAssembler:
+    """Pack retrieved chunks into a prompt context under a token budget"""
+
+    def __init__(self, max_tokens: int = 2048, mmr_lambda: float = 0.7,
+                 redundancy_threshold: float = 0.95,
+                 count_tokens: Optional[Callable[[str], int]] = None,
+                 separator: str = "\n"):
+        self.max_tokens = max_tokens
+        self.mmr_lambda = mmr_lambda
+        self.redundancy_threshold = redundancy_threshold
+        self.count_tokens = count_tokens or estimate_tokens
+        self.separator = separator
+
+    def _mmr_order(self, query_embedding: np.ndarray, embeddings: np.ndarray) -> List[int]:
+        """Order results by maximal marginal relevance, dropping near-duplicates"""
+        vectors = np.asarray(embeddings, dtype='float32')
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = np.asarray(query_embedding, dtype='float32').reshape(-1)
+        query = query / max(np.linalg.norm(query), 1e-12)
+
+        relevance = vectors @ query
+        similarity = vectors @ vectors.T
+
+        n = len(vectors)
+        selected = []
+        max_similarity = np.full(n, -np.inf, dtype='float32')
+        available = np.ones(n, dtype=bool)
+        while available.any():
+            redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+            mmr = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+            mmr[~available] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            available[best] = False
+
+            max_similarity = np.maximum(max_similarity, similarity[best])
+            available &= max_similarity < self.redundancy_threshold
+        return selected
+
+    def _trim(self, text: str, budget: int) -> str:
+        """Trim text to fit a token budget, cutting at a word boundary"""
+        if budget <= 0:
+            return ""
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.count_tokens(text[:mid]) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        trimmed = text[:low]
+        if low < len(text) and ' ' in trimmed:
+            trimmed = trimmed[:trimmed.rindex(' ')]
+        return trimmed
+
+    def _source(self, result: Dict[str, Any]) -> Optional[str]:
+        return result.get('file_path') or result.get('source')
+
+    def _merge_adjacent(self, chunks: List[Dict[str, Any]]) -> List[str]:
+        """Join consecutive chunks of the same file into one passage, without their overlap"""
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        order = []
+        for rank, chunk in enumerate(chunks):
+            source = self._source(chunk['result'])
+            key = source if source is not None and 'chunk_id' in chunk['result'] else rank
+            if key not in groups:
+                groups[key] = []
+                order.append(key)
+            groups[key].append(chunk)
+
+        passages = []
+        for key in order:
+            group = sorted(groups[key], key=lambda c: c['result'].get('chunk_id', 0))
+            texts = [group[0]['text']]
+            for prev, chunk in zip(group, group[1:]):
+                if chunk['result']['chunk_id'] == prev['result']['chunk_id'] + 1:
+                    texts[-1] = join_overlapping(texts[-1], chunk['text'])
+                else:
+                    texts.append(chunk['text'])
+            passages.extend(texts)
+        return passages
+
+    def assemble(self, results: Sequence[Dict[str, Any]], query: str = "",
+                 query_embedding: Optional[np.ndarray] = None,
+                 embeddings: Optional[np.ndarray] = None) -> str:
+        """Build context text from search results"""
+        if not results:
+            return ""
+
+        if query_embedding is not None and embeddings is not None and len(embeddings) == len(results):
+            order = self._mmr_order(query_embedding, embeddings)
+        else:
+            order = list(range(len(results)))
+
+        budget = self.max_tokens - self.count_tokens(query)
+        separator_tokens = self.count_tokens(self.separator)
+        chunks = []
+        for i in order:
+            if budget <= 0:
+                break
+            # Only hits that make it into the context are hydrated
+            result = results[i]
+            text = result['content']
+            tokens = self.count_tokens(text)
+            if tokens > budget:
+                text = self._trim(text, budget)
+                if not text:
+                    break
+                tokens = self.count_tokens(text)
+            chunks.append({'result': result, 'text': text})
+            budget -= tokens + separator_tokens
+
+        return self.separator.join(self._merge_adjacent(chunks))
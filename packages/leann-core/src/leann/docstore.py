@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+LEANN Compressed Document Store
+
+Strings (chunk text, IDs) are packed into small blocks of roughly
+BLOCK_BYTES each and every block is compressed on its own with a shared
+dictionary trained on the corpus, so reading one row decompresses one
+small block. zstd is used when the `zstandard` package is installed,
+otherwise zlib with a preset dictionary.
+
+Arrays (all stored as container sections):
+
+    <name>.blocks          compressed blocks, back to back
+    <name>.block_offsets   byte offset of each block in .blocks (n_blocks + 1)
+    <name>.block_rows      first row of each block (n_blocks + 1)
+    <name>.offsets         uncompressed byte offset of each row (n + 1)
+    <name>.dict            compression dictionary
+"""
+
+import zlib
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import List, Dict, Optional, Iterable
+import numpy as np
+
+BLOCK_BYTES = 16 * 1024
+ZSTD_DICT_BYTES = 64 * 1024
+ZSTD_LEVEL = 9
+# zlib can only reference the last 32 KB of a preset dictionary
+ZLIB_DICT_BYTES = 32 * 1024
+ZLIB_LEVEL = 9
+SUFFIXES = ('blocks', 'block_offsets', 'block_rows', 'offsets', 'dict')
+
+def default_codec() -> str:
+    try:
+        import zstandard  # noqa: F401
+        return 'zstd'
+    except ImportError:
+        return 'zlib'
+
+def _sample(values: List[bytes], limit: int) -> List[bytes]:
+    """Evenly spaced values totalling about limit bytes"""
+    total = sum(len(value) for value in values)
+    step = max(1, int(total / limit)) if total > limit else 1
+    return [value for value in values[::step] if value]
+
+def train_dictionary(values: List[bytes], codec: str) -> bytes:
+    """Dictionary of the substrings most worth sharing between blocks"""
+    if codec == 'zstd':
+        import zstandard
+        samples = _sample(values, 100 * ZSTD_DICT_BYTES)
+        if len(samples) < 8:
+            return b''
+        try:
+            return zstandard.train_dictionary(ZSTD_DICT_BYTES, samples).as_bytes()
+        except zstandard.ZstdError:
+            # Too little (or too uniform) text to train on
+            return b''
+    # zlib: recent samples win, so put a spread of rows at the end of the window
+    return b''.join(_sample(values, ZLIB_DICT_BYTES))[-ZLIB_DICT_BYTES:]
+
+def _compressor(codec: str, dictionary: bytes):
+    if codec == 'zstd':
+        import zstandard
+        data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=data).compress
+    if dictionary:
+        def compress(block: bytes) -> bytes:
+            compressor = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary)
+            return compressor.compress(block) + compressor.flush()
+        return compress
+    return lambda block: zlib.compress(block, ZLIB_LEVEL)
+
+def compress_strings(values: Iterable[Optional[str]], codec: Optional[str] = None,
+                     block_bytes: int = BLOCK_BYTES) -> Dict[str, np.ndarray]:
+    """Encode strings as dictionary-compressed blocks (None is stored as empty)"""
+    codec = codec or default_codec()
+    encoded = [value.encode('utf-8') if value else b'' for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    
+    # Cut a new block whenever the current one reaches block_bytes
+    block_rows = [0]
+    for row in range(len(encoded)):
+        if offsets[row + 1] - offsets[block_rows[-1]] >= block_bytes:
+            block_rows.append(row + 1)
+    if block_rows[-1] != len(encoded):
+        block_rows.append(len(encoded))
+        
+    dictionary = train_dictionary(encoded, codec)
+    compress = _compressor(codec, dictionary)
+    blocks = [compress(b''.join(encoded[start:end])) for start, end in zip(block_rows[:-1], block_rows[1:])]
+    block_offsets = np.zeros(len(blocks) + 1, dtype='int64')
+    np.cumsum([len(block) for block in blocks], out=block_offsets[1:])
+    return {
+        'blocks': np.frombuffer(b''.join(blocks), dtype='uint8'),
+        'block_offsets': block_offsets,
+        'block_rows': np.asarray(block_rows, dtype='int64'),
+        'offsets': offsets,
+        'dict': np.frombuffer(dictionary, dtype='uint8')
+    }
+
+class CompressedStrings(Sequence):
+    """Lazily decompressed strings; recently used blocks are cached"""
+    
+    def __init__(self, codec: str, blocks: np.ndarray, block_offsets: np.ndarray,
+                 block_rows: np.ndarray, offsets: np.ndarray, dictionary: np.ndarray,
+                 cache_blocks: int = 64):
+        self.codec = codec
+        self.blocks = blocks
+        self.block_offsets = block_offsets
+        self.block_rows = block_rows
+        self.offsets = offsets
+        self.dictionary = dictionary.tobytes()
+        self.cache_blocks = cache_blocks
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+    @classmethod
+    def from_sections(cls, codec: str, sections: Dict[str, np.ndarray], **kwargs) -> 'CompressedStrings':
+        return cls(codec, sections['blocks'], sections['block_offsets'], sections['block_rows'],
+                   sections['offsets'], sections['dict'], **kwargs)
+                   
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+        
+    def _decompress(self, data: bytes) -> bytes:
+        if self.codec == 'zstd':
+            # Decompressors are not safe to share between threads
+            decompressor = getattr(self._local, 'decompressor', None)
+            if decompressor is None:
+                import zstandard
+                dictionary = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+                decompressor = self._local.decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            return decompressor.decompress(data)
+        if self.dictionary:
+            return zlib.decompressobj(zdict=self.dictionary).decompress(data)
+        return zlib.decompress(data)
+        
+    def block(self, index: int) -> bytes:
+        """Uncompressed bytes of one block"""
+        with self._lock:
+            data = self._cache.get(index)
+            if data is not None:
+                self._cache.move_to_end(index)
+                return data
+        data = self._decompress(self.blocks[self.block_offsets[index]:self.block_offsets[index + 1]].tobytes())
+        with self._lock:
+            self._cache[index] = data
+            if len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return data
+        
+    def raw(self, index: int) -> bytes:
+        block = int(np.searchsorted(self.block_rows, index, side='right')) - 1
+        base = self.offsets[self.block_rows[block]]
+        return self.block(block)[self.offsets[index] - base:self.offsets[index + 1] - base]
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.raw(index).decode('utf-8')
+        
+    def __iter__(self):
+        # Decode block by block without going through the cache
+        for block, (start, end) in enumerate(zip(self.block_rows[:-1], self.block_rows[1:])):
+            data = self._decompress(self.blocks[self.block_offsets[block]:self.block_offsets[block + 1]].tobytes())
+            base = self.offsets[start]
+            for row in range(start, end):
+                yield data[self.offsets[row] - base:self.offsets[row + 1] - base].decode('utf-8')
+
+class DictColumn(Sequence):
+    """Low-cardinality column stored as int32 codes into its distinct values"""
+    
+    def __init__(self, codes: np.ndarray, values: Sequence):
+        self.codes = codes
+        self.values = values
+        
+    def __len__(self) -> int:
+        return len(self.codes)
+        
+    def raw(self, index: int) -> bytes:
+        code = self.codes[index]
+        return self.values.raw(int(code)) if code >= 0 else b''
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.raw(index).decode('utf-8')
+
+def dictionary_encode(values: List[Optional[str]]) -> Optional[tuple]:
+    """(codes, distinct values) if the column repeats enough to be worth it"""
+    distinct = {}
+    codes = np.full(len(values), -1, dtype='int32')
+    for row, value in enumerate(values):
+        if value is not None:
+            codes[row] = distinct.setdefault(value, len(distinct))
+    if len(distinct) > len(values) // 2:
+        return None
+    return codes, list(distinct)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+LEANN Embedding Engines
+"""
+
+import os
+import json
+import inspect
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "leann", "onnx")
+
+# Modes that run the model in this process (and so can use worker processes)
+LOCAL_EMBEDDING_MODES = ("sentence-transformers", "onnx", "onnx-int8")
+
+def _default_threads() -> int:
+    """Physical cores if psutil knows them, otherwise logical cores"""
+    try:
+        import psutil
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    except ImportError:
+        return os.cpu_count() or 1
+
+class OnnxEmbedder:
+    """Sentence-transformers model exported to ONNX and run with ONNX Runtime"""
+    
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", quantize: bool = False,
+                 num_threads: Optional[int] = None, cache_dir: Optional[str] = None,
+                 batch_size: int = 64):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.num_threads = num_threads or _default_threads()
+        self.batch_size = batch_size
+        self.model_dir = Path(cache_dir or ONNX_CACHE_DIR) / model_name.replace('/', '__')
+        self.session = None
+        self.tokenizer = None
+        self.config = None
+        self._input_names = None
+        
+    @property
+    def model_path(self) -> Path:
+        return self.model_dir / ('model.int8.onnx' if self.quantize else 'model.onnx')
+        
+    def export(self):
+        """Export the transformer to ONNX (and int8) once, with its pooling config"""
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize
+        
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        st_model = SentenceTransformer(self.model_name, device='cpu')
+        transformer = st_model[0]
+        pooling_config = st_model[1].get_config_dict()
+        pooling_mode = pooling_config.get('pooling_mode')
+        if pooling_mode is None:
+            # Older sentence-transformers store one flag per mode
+            pooling_mode = 'cls' if pooling_config.get('pooling_mode_cls_token') else (
+                'max' if pooling_config.get('pooling_mode_max_tokens') else 'mean')
+        if pooling_mode not in ('cls', 'max', 'mean'):
+            raise ValueError(f"Unsupported pooling mode for ONNX export: {pooling_mode}")
+            
+        tokenizer = transformer.tokenizer
+        tokenizer.save_pretrained(str(self.model_dir))
+        sample = tokenizer(["export sample"], return_tensors='pt')
+        input_names = list(sample.keys())
+        
+        class Wrapper(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+                
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs)))[0]
+                
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+        
+        # Newer torch defaults to the dynamo exporter, which rejects dynamic_axes
+        export_kwargs = {}
+        if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+            export_kwargs['dynamo'] = False
+        with open(self.model_dir / 'config.json', 'w') as f:
+            json.dump({
+                'model_name': self.model_name,
+                'pooling': pooling_mode,
+                'normalize': any(isinstance(module, Normalize) for module in st_model),
+                'max_seq_length': st_model.max_seq_length,
+                'dimension': st_model.get_sentence_embedding_dimension()
+            }, f, indent=2)
+            
+        # The model file appears last and whole: its presence means the export is done
+        partial = self.model_dir / f'model.onnx.{os.getpid()}.tmp'
+        with torch.no_grad():
+            torch.onnx.export(
+                Wrapper(transformer.auto_model.eval()),
+                tuple(sample[name] for name in input_names),
+                str(partial),
+                input_names=input_names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+                **export_kwargs
+            )
+        os.replace(partial, self.model_dir / 'model.onnx')
+        
+    def quantize_model(self):
+        """Dynamically quantize weights to int8"""
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        partial = self.model_dir / f'model.int8.onnx.{os.getpid()}.tmp'
+        quantize_dynamic(str(self.model_dir / 'model.onnx'), str(partial),
+                         weight_type=QuantType.QInt8)
+        os.replace(partial, self.model_dir / 'model.int8.onnx')
+        
+    def prepare(self):
+        """Export (and quantize) if not already cached"""
+        if not (self.model_dir / 'model.onnx').exists():
+            self.export()
+        if self.quantize and not self.model_path.exists():
+            self.quantize_model()
+        return self
+                         
+    def load(self):
+        """Export if needed and open an ONNX Runtime session"""
+        if self.session is not None:
+            return self
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        
+        self.prepare()
+        with open(self.model_dir / 'config.json', 'r') as f:
+            self.config = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(self.model_path), options,
+                                            providers=['CPUExecutionProvider'])
+        self._input_names = [i.name for i in self.session.get_inputs()]
+        return self
+        
+    def get_sentence_embedding_dimension(self) -> int:
+        self.load()
+        return self.config['dimension']
+        
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.config['pooling'] == 'cls':
+            pooled = hidden[:, 0]
+        elif self.config['pooling'] == 'max':
+            pooled = np.where(mask[..., None] > 0, hidden, -1e9).max(axis=1)
+        else:
+            weights = mask[..., None].astype('float32')
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.config['normalize']:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype('float32')
+        
+    def encode(self, sentences: Union[str, List[str]], batch_size: Optional[int] = None,
+               **kwargs) -> np.ndarray:
+        """Embed texts; same call shape as SentenceTransformer.encode"""
+        self.load()
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, self.config['dimension']), dtype='float32')
+        batch_size = batch_size or self.batch_size
+        
+        # Sort by length so each batch pads to a similar length
+        order = np.argsort([-len(s) for s in sentences], kind='stable')
+        embeddings = np.empty((len(sentences), self.config['dimension']), dtype='float32')
+        for start in range(0, len(sentences), batch_size):
+            ids = order[start:start + batch_size]
+            encoded = self.tokenizer([sentences[i] for i in ids], padding=True, truncation=True,
+                                     max_length=self.config['max_seq_length'], return_tensors='np')
+            feeds = {name: encoded[name].astype('int64') for name in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            embeddings[ids] = self._pool(hidden, encoded['attention_mask'])
+        return embeddings
+
+def load_embedding_model(embedding_model: str, embedding_mode: str = "sentence-transformers",
+                         options: Optional[Dict[str, Any]] = None):
+    """Create the embedding engine for an embedding_mode"""
+    options = dict(options or {})
+    
+    # Local models can be sharded across pinned worker processes
+    num_workers = options.pop('num_workers', None)
+    if num_workers is not None and embedding_mode in LOCAL_EMBEDDING_MODES:
+        from .parallel_embeddings import ProcessPoolEmbedder
+        return ProcessPoolEmbedder(
+            embedding_model, embedding_mode,
+            num_workers=num_workers or None,
+            threads_per_worker=options.pop('threads_per_worker', None),
+            pin_cores=options.pop('pin_cores', True),
+            batch_size=options.pop('batch_size', 64),
+            nice=options.pop('nice', 0),
+            options=options
+        ).start()
+    
+    if embedding_mode == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(embedding_model, **options)
+    elif embedding_mode in ("onnx", "onnx-int8"):
+        return OnnxEmbedder(embedding_model, quantize=embedding_mode == "onnx-int8", **options).load()
+    elif embedding_mode == "ollama":
+        from .remote_embeddings import OllamaEmbedder
+        return OllamaEmbedder(embedding_model, **options)
+    elif embedding_mode == "gemini":
+        from .remote_embeddings import GeminiEmbedder
+        return GeminiEmbedder(embedding_model, **options)
+    elif embedding_mode == "openai":
+        from .remote_embeddings import OpenAIEmbedder
+        return OpenAIEmbedder(embedding_model, **options)
+    raise ValueError(f"Unknown embedding mode: {embedding_mode}")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+LEANN Resource Governor
+
+Keeps background index builds from starving interactive queries: per-phase
+thread budgets for torch and FAISS, lower scheduling priority for the
+build thread, CPU/memory throttling and pausing while queries are in flight.
+
+Renicing can't be undone without privileges, so run() executes each build
+phase on a short-lived thread of its own and lowers that thread only: the
+caller's thread (often a pooled server thread that goes on to serve
+queries) keeps its priority.
+
+Budgets never change the threads queries use. OpenMP (FAISS) thread counts
+are per calling thread, so the index budget is set on the build thread
+only. torch's count is process-wide, so local embedding models run in a
+worker process sized to the embedding budget instead (embedding_options).
+"""
+
+import os
+import sys
+import time
+import threading
+import warnings
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable
+
+# Windows priorities (winbase.h)
+THREAD_PRIORITY_BELOW_NORMAL = -1
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+
+def _usable_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _get_omp_threads() -> Optional[int]:
+    """OpenMP thread count of the calling thread (what FAISS will use)"""
+    try:
+        import faiss
+    except ImportError:
+        return None
+    return faiss.omp_get_max_threads()
+
+def _set_omp_threads(threads: Optional[int]):
+    if threads:
+        import faiss
+        faiss.omp_set_num_threads(threads)
+
+def lower_priority(nice: int, whole_process: bool = False) -> bool:
+    """Lower the scheduling priority of the calling thread (or whole process)
+    
+    Linux nice values are per thread, and OpenMP workers spawned from the
+    thread inherit it. Windows has no nice levels: the thread or process
+    drops to below-normal priority. Other platforms can only renice the
+    whole process. Returns False (with a warning) if that is not allowed.
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+            if whole_process:
+                ok = kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+            else:
+                ok = kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_BELOW_NORMAL)
+            if not ok:
+                raise ctypes.WinError(ctypes.get_last_error())
+        elif sys.platform.startswith('linux') and not whole_process and hasattr(threading, 'get_native_id'):
+            target = threading.get_native_id()
+            os.setpriority(os.PRIO_PROCESS, target, os.getpriority(os.PRIO_PROCESS, target) + nice)
+        else:
+            os.nice(nice)
+    except (AttributeError, OSError) as e:
+        warnings.warn(f"Could not lower build priority: {e}", RuntimeWarning)
+        return False
+    return True
+
+class ResourceGovernor:
+    """Throttle for builds sharing a machine with live queries"""
+    
+    def __init__(self, embedding_threads: Optional[int] = None, index_threads: Optional[int] = None,
+                 nice: int = 10, max_cpu_percent: Optional[float] = None,
+                 max_memory_percent: Optional[float] = None, pause_on_queries: bool = True,
+                 max_pause: float = 30.0, poll_interval: float = 0.05):
+        # Leave half the cores for queries unless told otherwise
+        default_threads = max(1, _usable_cpus() // 2)
+        self.thread_budgets = {
+            'embedding': embedding_threads or default_threads,
+            'index': index_threads or default_threads
+        }
+        self.nice = nice
+        self.max_cpu_percent = max_cpu_percent
+        self.max_memory_percent = max_memory_percent
+        self.pause_on_queries = pause_on_queries
+        self.max_pause = max_pause
+        self.poll_interval = poll_interval
+        self.paused_seconds = 0.0
+        self._queries_in_flight = 0
+        self._idle = threading.Condition()
+        
+    @contextmanager
+    def query(self):
+        """Mark a query in flight; builds pause at their next checkpoint"""
+        with self._idle:
+            self._queries_in_flight += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._queries_in_flight -= 1
+                self._idle.notify_all()
+                
+    @property
+    def queries_in_flight(self) -> int:
+        return self._queries_in_flight
+        
+    @contextmanager
+    def phase(self, name: str):
+        """Apply a build phase's FAISS budget to this thread (priority is left alone)"""
+        previous = _get_omp_threads()
+        budget = self.thread_budgets.get(name)
+        if budget and previous:
+            _set_omp_threads(budget)
+        try:
+            yield
+        finally:
+            _set_omp_threads(previous)
+            
+    def run(self, name: str, fn: Callable, *args, **kwargs):
+        """Run fn as a build phase on a dedicated, lowered-priority thread
+        
+        Blocks until fn returns and passes its result or exception through;
+        callbacks fn makes run on that thread too.
+        """
+        outcome = {}
+        
+        def target():
+            try:
+                if self.nice:
+                    lower_priority(self.nice)
+                with self.phase(name):
+                    outcome['value'] = fn(*args, **kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+                
+        thread = threading.Thread(target=target, name=f"leann-build-{name}")
+        thread.start()
+        thread.join()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['value']
+        
+    def embedding_options(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Options for load_embedding_model that embed in a budgeted worker process
+        
+        Only for local models (sentence-transformers, onnx); explicit
+        options win.
+        """
+        options = dict(options or {})
+        options.setdefault('num_workers', 1)
+        options.setdefault('threads_per_worker', self.thread_budgets['embedding'])
+        options.setdefault('pin_cores', False)
+        options.setdefault('nice', self.nice)
+        return options
+        
+    def _overloaded(self) -> bool:
+        if self.max_cpu_percent is None and self.max_memory_percent is None:
+            return False
+        try:
+            import psutil
+        except ImportError:
+            return False
+        if self.max_cpu_percent is not None and psutil.cpu_percent(interval=None) > self.max_cpu_percent:
+            return True
+        if self.max_memory_percent is not None and psutil.virtual_memory().percent > self.max_memory_percent:
+            return True
+        return False
+        
+    def throttle(self):
+        """Checkpoint between build batches: wait for queries and load to drop"""
+        start = time.perf_counter()
+        deadline = start + self.max_pause
+        with self._idle:
+            while self.pause_on_queries and self._queries_in_flight:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+        while self._overloaded() and time.perf_counter() < deadline:
+            time.sleep(self.poll_interval)
+        paused = time.perf_counter() - start
+        self.paused_seconds += paused
+        return paused
+        
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'thread_budgets': dict(self.thread_budgets),
+            'queries_in_flight': self._queries_in_flight,
+            'paused_seconds': self.paused_seconds
+        }
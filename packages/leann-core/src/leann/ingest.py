@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+LEANN Document Ingestion
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from .references import chunk_spans, content_hash
+
+SEARCH_EXTENSIONS = ['.py', '.txt', '.md', '.json', '.yaml', '.yml', '.csv', '.log', '.js', '.html', '.css', '.xml', '.sql', '.java', '.cpp', '.c', '.h']
+
+def chunk_text(text: str, max_chunk_size: int = 1000) -> List[str]:
+    """Split text into chunks of whole words"""
+    if len(text) <= max_chunk_size:
+        return [text]
+        
+    chunks = []
+    words = text.split()
+    current_chunk = []
+    current_size = 0
+    
+    for word in words:
+        if current_size + len(word) + 1 > max_chunk_size and current_chunk:
+            chunks.append(' '.join(current_chunk))
+            current_chunk = [word]
+            current_size = len(word)
+        else:
+            current_chunk.append(word)
+            current_size += len(word) + 1
+            
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+        
+    return chunks
+
+def iter_files(folders: List[str], extensions: Optional[List[str]] = None,
+               max_files: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    """Yield (folder, file path) for indexable files"""
+    extensions = tuple(extensions or SEARCH_EXTENSIONS)
+    count = 0
+    for folder in folders:
+        if not os.path.exists(folder):
+            continue
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith(extensions):
+                    yield folder, str(Path(root) / file)
+                    count += 1
+                    if max_files is not None and count >= max_files:
+                        return
+
+def load_file(folder: str, file_path: str, max_chunk_size: int = 1000,
+              reference_only: bool = False) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Read and chunk one file
+    
+    With reference_only, chunks are byte ranges of the file and their
+    metadata carries byte_start, byte_end and content_hash.
+    """
+    if reference_only:
+        return _load_file_spans(folder, file_path, max_chunk_size)
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+        
+    documents = []
+    metadata = []
+    for i, chunk in enumerate(chunk_text(content, max_chunk_size)):
+        if chunk.strip():
+            documents.append(chunk)
+            metadata.append({
+                'file_path': file_path,
+                'folder': folder,
+                'chunk_id': i,
+                'file_size': len(content)
+            })
+    return documents, metadata
+
+def _load_file_spans(folder: str, file_path: str, max_chunk_size: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+    with open(file_path, 'rb') as f:
+        data = f.read()
+        
+    documents = []
+    metadata = []
+    for i, (start, end) in enumerate(chunk_spans(data, max_chunk_size)):
+        chunk = data[start:end]
+        documents.append(chunk.decode('utf-8', errors='ignore'))
+        metadata.append({
+            'file_path': file_path,
+            'folder': folder,
+            'chunk_id': i,
+            'file_size': len(data),
+            'byte_start': start,
+            'byte_end': end,
+            'content_hash': content_hash(chunk)
+        })
+    return documents, metadata
+
+def load_directories(folders: List[str], extensions: Optional[List[str]] = None,
+                     max_files: Optional[int] = None, max_chunk_size: int = 1000,
+                     progress_callback: Optional[callable] = None,
+                     reference_only: bool = False) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Read and chunk all indexable files under folders"""
+    documents = []
+    metadata = []
+    for i, (folder, file_path) in enumerate(iter_files(folders, extensions, max_files)):
+        try:
+            file_documents, file_metadata = load_file(folder, file_path, max_chunk_size, reference_only)
+        except OSError:
+            continue
+        documents.extend(file_documents)
+        metadata.extend(file_metadata)
+        if progress_callback:
+            progress_callback(i + 1, None)
+    return documents, metadata
+
+def load_jsonl(path: str, text_field: str = 'text') -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Read documents from JSONL; every other field becomes metadata"""
+    documents = []
+    metadata = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if text_field not in record:
+                raise ValueError(f"{path}:{line_number}: missing '{text_field}' field")
+            documents.append(record.pop(text_field))
+            metadata.append(record)
+    return documents, metadata
+
+def file_manifest(paths: List[str]) -> Dict[str, List[int]]:
+    """Modification time and size of each input file"""
+    manifest = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            manifest[path] = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            continue
+    return manifest
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+LEANN Metrics
+
+Latency histograms, counters and gauges with hook callbacks and a
+Prometheus text exposition endpoint.
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Callable, Sequence
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Histogram/counter/gauge names used by the core API
+METRIC_HELP = {
+    'leann_query_embedding_seconds': "Time to embed a query",
+    'leann_ann_search_seconds': "Time spent in the ANN backend",
+    'leann_context_assembly_seconds': "Time to pack retrieved chunks into a prompt",
+    'leann_llm_first_token_seconds': "Time from prompt to first LLM token",
+    'leann_llm_generation_seconds': "Time to generate a full LLM answer",
+    'leann_build_embedding_seconds': "Time to embed documents during a build",
+    'leann_build_index_seconds': "Time to insert vectors into the backend",
+    'leann_cache_hits_total': "Semantic answer cache hits",
+    'leann_cache_misses_total': "Semantic answer cache misses",
+    'leann_queries_total': "Searches served",
+    'leann_build_documents_total': "Documents embedded by builds",
+    'leann_index_documents': "Documents in the loaded index",
+    'leann_build_progress': "Fraction of the current build completed",
+    'leann_build_paused_seconds_total': "Time builds spent paused by the resource governor",
+    'leann_index_reloads_total': "Index versions swapped in by hot reload",
+    'leann_compactions_total': "Index rebuilds that dropped tombstoned rows",
+    'leann_segment_merges_total': "Segment merges in segmented indexes"
+}
+
+class Histogram:
+    """Cumulative-bucket histogram"""
+    
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-th quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+class MetricsRegistry:
+    """Thread-safe store of histograms, counters and gauges"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self._hooks: List[Callable[[str, str, float], None]] = []
+        
+    def add_hook(self, hook: Callable[[str, str, float], None]):
+        """Register callback(kind, name, value) invoked on every update"""
+        self._hooks.append(hook)
+        
+    def remove_hook(self, hook: Callable[[str, str, float], None]):
+        self._hooks.remove(hook)
+        
+    def _notify(self, kind: str, name: str, value: float):
+        for hook in list(self._hooks):
+            try:
+                hook(kind, name, value)
+            except Exception:
+                # A broken exporter must never fail a query
+                pass
+                
+    def observe(self, name: str, value: float):
+        """Record a histogram observation"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+        self._notify('histogram', name, value)
+        
+    def inc(self, name: str, value: float = 1):
+        """Increment a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self._notify('counter', name, value)
+        
+    def set(self, name: str, value: float):
+        """Set a gauge"""
+        with self._lock:
+            self.gauges[name] = value
+        self._notify('gauge', name, value)
+        
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+            
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict view of all metrics"""
+        with self._lock:
+            return {
+                'histograms': {
+                    name: {
+                        'count': h.count,
+                        'sum': h.sum,
+                        'p50': h.quantile(0.5),
+                        'p99': h.quantile(0.99)
+                    }
+                    for name, h in self.histograms.items()
+                },
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges)
+            }
+            
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        
+        def header(name: str, kind: str):
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            
+        with self._lock:
+            for name in sorted(self.counters):
+                header(name, 'counter')
+                lines.append(f"{name} {self.counters[name]}")
+            for name in sorted(self.gauges):
+                header(name, 'gauge')
+                lines.append(f"{name} {self.gauges[name]}")
+            for name in sorted(self.histograms):
+                h = self.histograms[name]
+                header(name, 'histogram')
+                running = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    running += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {running}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {h.count}')
+                lines.append(f"{name}_sum {h.sum}")
+                lines.append(f"{name}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+# Default registry used by LeannBuilder, LeannSearcher and LeannChat
+REGISTRY = MetricsRegistry()
+
+def serve_metrics(port: int = 9464, host: str = "0.0.0.0",
+                  registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Serve /metrics in a background thread"""
+    registry = registry or REGISTRY
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            
+        def log_message(self, format, *args):
+            pass
+            
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="leann-metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+LEANN Multi-Process Embedding
+
+Shards batches across worker processes, each pinned to its own cores with
+a fixed thread count. Texts go to workers over a queue; vectors come back
+through shared memory instead of being pickled.
+"""
+
+import os
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def _worker(worker_id: int, embedding_model: str, embedding_mode: str, options: Dict[str, Any],
+            cores: Optional[List[int]], num_threads: int, nice: int, tasks, results):
+    """Worker process: load the model once, then embed batches into shared memory"""
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    if nice:
+        from .governor import lower_priority
+        lower_priority(nice, whole_process=True)
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+        
+    from .embeddings import load_embedding_model
+    if embedding_mode in ('onnx', 'onnx-int8'):
+        options = dict(options, num_threads=num_threads)
+    try:
+        model = load_embedding_model(embedding_model, embedding_mode, options)
+        dimension = model.encode(["dimension probe"]).shape[1]
+    except Exception as e:
+        results.put(('error', worker_id, None, None, repr(e)))
+        return
+    results.put(('ready', worker_id, None, None, dimension))
+    
+    attached = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        call_id, shard, shm_name, rows, dimension, start, texts, batch_size = task
+        try:
+            if shm_name not in attached:
+                # Only one output buffer is live at a time
+                for shm in attached.values():
+                    shm.close()
+                attached = {shm_name: shared_memory.SharedMemory(name=shm_name)}
+            out = np.ndarray((rows, dimension), dtype='float32', buffer=attached[shm_name].buf)
+            out[start:start + len(texts)] = model.encode(texts, batch_size=batch_size)
+            results.put(('done', worker_id, call_id, shard, len(texts)))
+        except Exception as e:
+            results.put(('error', worker_id, call_id, shard, repr(e)))
+    for shm in attached.values():
+        shm.close()
+
+class ProcessPoolEmbedder:
+    """Embedding engine running N pinned worker processes"""
+    
+    def __init__(self, embedding_model: str, embedding_mode: str = "sentence-transformers",
+                 num_workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                 pin_cores: bool = True, batch_size: int = 64, shard_size: Optional[int] = None,
+                 nice: int = 0, options: Optional[Dict[str, Any]] = None):
+        cores = available_cores()
+        if num_workers is None:
+            threads_per_worker = threads_per_worker or 4
+            num_workers = max(1, len(cores) // threads_per_worker)
+        self.embedding_model = embedding_model
+        self.embedding_mode = embedding_mode
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, len(cores) // num_workers)
+        self.pin_cores = pin_cores
+        self.nice = nice
+        self.batch_size = batch_size
+        self.shard_size = shard_size or batch_size * 4
+        self.options = options or {}
+        self.dimension = None
+        self._processes = []
+        self._tasks = None
+        self._results = None
+        # One encode at a time: every call shares the result queue
+        self._lock = threading.Lock()
+        self._call_ids = itertools.count()
+        
+    def _core_sets(self) -> List[Optional[List[int]]]:
+        """Disjoint core slices per worker, wrapping if oversubscribed"""
+        if not self.pin_cores:
+            return [None] * self.num_workers
+        cores = available_cores()
+        sets = []
+        for i in range(self.num_workers):
+            start = (i * self.threads_per_worker) % len(cores)
+            sets.append([cores[(start + j) % len(cores)] for j in range(self.threads_per_worker)])
+        return sets
+        
+    def start(self):
+        """Spawn workers and wait until every model is loaded"""
+        if self._processes:
+            return self
+        if self.embedding_mode in ('onnx', 'onnx-int8'):
+            # Export once here; workers exporting together would race on the same files
+            from .embeddings import OnnxEmbedder
+            OnnxEmbedder(self.embedding_model, quantize=self.embedding_mode == 'onnx-int8',
+                         **self.options).prepare()
+        ctx = mp.get_context('spawn')
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        
+        # Thread env vars must be set before the child imports torch/faiss
+        saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+        try:
+            for name in THREAD_ENV_VARS:
+                os.environ[name] = str(self.threads_per_worker)
+            for worker_id, cores in enumerate(self._core_sets()):
+                process = ctx.Process(
+                    target=_worker, name=f"leann-embed-{worker_id}", daemon=True,
+                    args=(worker_id, self.embedding_model, self.embedding_mode, self.options,
+                          cores, self.threads_per_worker, self.nice, self._tasks, self._results)
+                )
+                process.start()
+                self._processes.append(process)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+                    
+        for _ in self._processes:
+            status, worker_id, _, _, value = self._get_result()
+            if status == 'error':
+                self.close()
+                raise RuntimeError(f"Embedding worker {worker_id} failed to start: {value}")
+            self.dimension = value
+        return self
+        
+    def _get_result(self):
+        while True:
+            try:
+                return self._results.get(timeout=5)
+            except queue.Empty:
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Embedding workers died: {', '.join(dead)}")
+                    
+    def get_sentence_embedding_dimension(self) -> int:
+        self.start()
+        return self.dimension
+        
+    def encode(self, sentences: Union[str, List[str]], batch_size: Optional[int] = None,
+               **kwargs) -> np.ndarray:
+        """Embed texts; same call shape as SentenceTransformer.encode"""
+        self.start()
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        rows = len(sentences)
+        if rows == 0:
+            return np.zeros((0, self.dimension), dtype='float32')
+        batch_size = batch_size or self.batch_size
+        
+        with self._lock:
+            shm = shared_memory.SharedMemory(create=True, size=rows * self.dimension * 4)
+            try:
+                call_id = next(self._call_ids)
+                pending = set()
+                for shard, start in enumerate(range(0, rows, self.shard_size)):
+                    self._tasks.put((call_id, shard, shm.name, rows, self.dimension, start,
+                                     list(sentences[start:start + self.shard_size]), batch_size))
+                    pending.add(shard)
+                error = None
+                while pending:
+                    status, worker_id, result_call, shard, value = self._get_result()
+                    if result_call != call_id:
+                        # Left over from an earlier failed call
+                        continue
+                    pending.discard(shard)
+                    if status == 'error' and error is None:
+                        error = f"Embedding worker {worker_id} failed on shard {shard}: {value}"
+                        pending -= self._discard_queued(call_id)
+                if error is not None:
+                    raise RuntimeError(error)
+                return np.ndarray((rows, self.dimension), dtype='float32', buffer=shm.buf).copy()
+            finally:
+                shm.close()
+                shm.unlink()
+                
+    def _discard_queued(self, call_id: int) -> set:
+        """Take this call's unstarted shards off the task queue; returns their ids"""
+        dropped, kept = set(), []
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None and task[0] == call_id:
+                dropped.add(task[1])
+            else:
+                kept.append(task)
+        for task in kept:
+            self._tasks.put(task)
+        return dropped
+            
+    def close(self):
+        """Stop worker processes"""
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
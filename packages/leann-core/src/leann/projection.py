@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+LEANN Dimensionality Reduction
+
+Projects embeddings to fewer dimensions before indexing. The projection is
+saved next to the index and applied to every query embedding.
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional
+
+PROJECTION_METHODS = ("pca", "truncate")
+
+class Projection:
+    """Linear projection from input_dimension to dimension"""
+    
+    def __init__(self, method: str, input_dimension: int, dimension: int,
+                 mean: Optional[np.ndarray] = None, components: Optional[np.ndarray] = None,
+                 normalize: bool = False):
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+        if not 0 < dimension <= input_dimension:
+            raise ValueError(f"Cannot reduce {input_dimension} dimensions to {dimension}")
+        self.method = method
+        self.input_dimension = input_dimension
+        self.dimension = dimension
+        self.mean = mean
+        self.components = components
+        self.normalize = normalize
+        
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, dimension: int, method: str = "pca",
+            sample_size: int = 50000, seed: int = 0) -> 'Projection':
+        """Fit PCA on a sample, or set up Matryoshka-style truncation"""
+        embeddings = np.asarray(embeddings, dtype='float32')
+        input_dimension = embeddings.shape[1]
+        if method == "truncate":
+            # Matryoshka models keep most information in the leading dims
+            return cls(method, input_dimension, dimension, normalize=True)
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+            
+        if len(embeddings) > sample_size:
+            rng = np.random.default_rng(seed)
+            sample = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+        else:
+            sample = embeddings
+        if dimension > min(sample.shape):
+            raise ValueError(f"PCA to {dimension} dims needs at least {dimension} embeddings")
+        mean = sample.mean(axis=0)
+        
+        # Principal axes from the covariance eigenvectors, largest first
+        centered = (sample - mean).astype('float64')
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dimension]].T
+        return cls(method, input_dimension, dimension, mean=mean,
+                   components=np.ascontiguousarray(components, dtype='float32'))
+                   
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """Project one vector or a batch"""
+        embeddings = np.asarray(embeddings, dtype='float32')
+        if self.method == "truncate":
+            projected = embeddings[..., :self.dimension]
+        else:
+            projected = (embeddings - self.mean) @ self.components.T
+        if self.normalize:
+            norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+            projected = projected / np.maximum(norms, 1e-12)
+        return np.ascontiguousarray(projected, dtype='float32')
+        
+    def applies_to(self, embedding: np.ndarray) -> bool:
+        """Whether an embedding is still in the unprojected space"""
+        return np.shape(embedding)[-1] == self.input_dimension != self.dimension
+        
+    def describe(self) -> Dict[str, Any]:
+        return {'method': self.method, 'input_dimension': self.input_dimension,
+                'dimension': self.dimension, 'normalize': self.normalize}
+    
+    def get_sections(self) -> Dict[str, np.ndarray]:
+        """Projection arrays for a single-file container"""
+        arrays = {'projection.mean': self.mean, 'projection.components': self.components}
+        return {name: value for name, value in arrays.items() if value is not None}
+    
+    @classmethod
+    def from_sections(cls, info: Dict[str, Any], sections: Dict[str, np.ndarray]) -> 'Projection':
+        """Rebuild from container metadata and sections"""
+        return cls(info['method'], info['input_dimension'], info['dimension'],
+                   mean=sections.get('projection.mean'),
+                   components=sections.get('projection.components'),
+                   normalize=info.get('normalize', info['method'] == "truncate"))
+                
+    def save(self, path: str):
+        """Save projection to path + '.projection.npz'"""
+        arrays = {'mean': self.mean, 'components': self.components}
+        np.savez(path + '.projection.npz',
+                 method=np.array(self.method), input_dimension=self.input_dimension,
+                 dimension=self.dimension, normalize=self.normalize,
+                 **{name: value for name, value in arrays.items() if value is not None})
+                 
+    @classmethod
+    def load(cls, path: str) -> Optional['Projection']:
+        """Load projection saved with an index, if any"""
+        try:
+            data = np.load(path + '.projection.npz')
+        except FileNotFoundError:
+            return None
+        return cls(str(data['method']), int(data['input_dimension']), int(data['dimension']),
+                   mean=data['mean'] if 'mean' in data else None,
+                   components=data['components'] if 'components' in data else None,
+                   normalize=bool(data['normalize']))
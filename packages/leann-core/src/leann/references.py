@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+LEANN Reference-Only Documents
+
+Instead of chunk text, a reference-only index stores where each chunk came
+from in its metadata:
+
+    file_path       source file
+    byte_start      offset of the chunk's first byte
+    byte_end        offset just past its last byte
+    content_hash    blake2b-64 of those bytes, hex
+
+Text is read back from the source file (memory-mapped) when a result is
+shown, and the hash tells whether the file changed since indexing.
+"""
+
+import os
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import List, Dict, Any, Optional, Tuple
+
+REFERENCE_FIELDS = ('file_path', 'byte_start', 'byte_end', 'content_hash')
+WHITESPACE = b' \t\r\n\f\v'
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+def chunk_spans(data: bytes, max_chunk_size: int = 1000) -> List[Tuple[int, int]]:
+    """Byte ranges of at most max_chunk_size, cut at whitespace where possible
+    
+    Leading and trailing whitespace is left out of each range, and ranges
+    holding only whitespace are dropped.
+    """
+    spans = []
+    start, n = 0, len(data)
+    while start < n:
+        while start < n and data[start] in WHITESPACE:
+            start += 1
+        if start >= n:
+            break
+        end = min(start + max_chunk_size, n)
+        if end < n:
+            # Back off to the last whitespace; a single overlong word is cut hard
+            cut = max(data.rfind(byte, start, end + 1) for byte in (b' ', b'\n', b'\t'))
+            if cut > start:
+                end = cut
+            else:
+                # Don't split a UTF-8 sequence
+                while end > start + 1 and data[end] & 0xC0 == 0x80:
+                    end -= 1
+        stop = end
+        while stop > start and data[stop - 1] in WHITESPACE:
+            stop -= 1
+        spans.append((start, stop))
+        start = end
+    return spans
+
+class _MappedFiles:
+    """Small LRU of memory-mapped source files"""
+    
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def read(self, path: str, start: int, end: int) -> Optional[bytes]:
+        """Bytes [start, end) of path, or None if the file is gone or too short"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        # Remap when the file changed: touching a truncated mapping raises SIGBUS
+        version = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == version:
+                self._maps.move_to_end(path)
+                mapped = cached[1]
+            else:
+                mapped = None
+        if mapped is None:
+            if end > stat.st_size:
+                return None
+            try:
+                with open(path, 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # ValueError: empty files cannot be mapped
+                return None
+            with self._lock:
+                self._maps[path] = (version, mapped)
+                if len(self._maps) > self.capacity:
+                    # Dropped maps are closed once no reader holds them
+                    self._maps.popitem(last=False)
+        if end > len(mapped):
+            return None
+        return mapped[start:end]
+
+_files = _MappedFiles()
+
+def read_reference(metadata: Dict[str, Any]) -> Tuple[Optional[bytes], bool]:
+    """(bytes, stale) for one chunk's metadata; bytes is None if unreadable"""
+    path = metadata.get('file_path')
+    if path is None or 'byte_start' not in metadata:
+        return None, True
+    data = _files.read(path, int(metadata['byte_start']), int(metadata['byte_end']))
+    return data, data is None or content_hash(data) != metadata.get('content_hash')
+
+def is_stale(metadata: Dict[str, Any]) -> bool:
+    return read_reference(metadata)[1]
+
+class ReferencedDocuments(Sequence):
+    """Chunk text read on demand from the files the metadata points at
+    
+    A stale chunk reads whatever the file now holds in its byte range (or
+    '' if the file is gone); check is_stale before trusting it.
+    """
+    
+    def __init__(self, metadata: Sequence):
+        self.metadata = metadata
+        
+    def __len__(self) -> int:
+        return len(self.metadata)
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        data, _ = read_reference(self.metadata[index])
+        return data.decode('utf-8', errors='replace') if data is not None else ''
+        
+    def is_stale(self, index: int) -> bool:
+        return is_stale(self.metadata[index])
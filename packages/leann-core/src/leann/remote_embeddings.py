@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+LEANN Remote Embedding Providers
+
+Ollama, Gemini and OpenAI embedding APIs behind the same encode() call as
+SentenceTransformer, using a pooled HTTP session, several batches in
+flight at once, rate-limit aware backoff and retry of failed batches only.
+"""
+
+import os
+import time
+import random
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union, Tuple
+import numpy as np
+
+class EmbeddingError(RuntimeError):
+    """Remote embedding request failed permanently"""
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None,
+                 rate_limited: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.rate_limited = rate_limited
+
+class _SplittableError(Exception):
+    """Batch rejected as a whole (too large or one bad input)"""
+
+def normalize_base_url(url: str, default_port: Optional[int] = None) -> str:
+    """Add the scheme (and default port) missing from values like 0.0.0.0:11434"""
+    url = url.strip().rstrip('/')
+    if '://' not in url:
+        url = f"http://{url}"
+        if default_port and urlsplit(url).port is None:
+            parts = urlsplit(url)
+            url = parts._replace(netloc=f"{parts.netloc}:{default_port}").geturl()
+    return url
+
+class RemoteEmbedder(ABC):
+    """Base class for HTTP embedding providers"""
+    
+    default_base_url = ""
+    default_port = None
+    base_url_env = None
+    max_batch_size = 256
+    
+    def __init__(self, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 batch_size: int = 64, max_concurrency: int = 4, max_retries: int = 6,
+                 timeout: float = 60.0, backoff_base: float = 0.5, max_backoff: float = 30.0):
+        self.model = model
+        # Environment read per instance, so setting it after import still counts
+        if base_url is None and self.base_url_env:
+            base_url = os.getenv(self.base_url_env)
+        self.base_url = normalize_base_url(base_url or self.default_base_url, self.default_port)
+        self.api_key = api_key
+        self.batch_size = min(batch_size, self.max_batch_size)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._session = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pause_until = 0.0
+        # Learned from the first response; sizes empty results
+        self.dimension = None
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'splits': 0}
+        
+    @property
+    def session(self):
+        """Shared keep-alive session sized for max_concurrency connections"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self._headers())
+            self._session = session
+        return self._session
+        
+    def _headers(self) -> Dict[str, str]:
+        return {'Content-Type': 'application/json'}
+        
+    @abstractmethod
+    def _request(self, texts: List[str]) -> Tuple[str, Dict[str, Any]]:
+        """Return (url, JSON body) for one batch"""
+        pass
+        
+    @abstractmethod
+    def _parse(self, data: Dict[str, Any], count: int) -> List[List[float]]:
+        """Extract vectors in input order from a response body"""
+        pass
+        
+    def _wait_for_rate_limit(self):
+        """Block while a provider-wide backoff is in effect"""
+        while True:
+            with self._lock:
+                delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+            
+    def _post(self, texts: List[str]) -> np.ndarray:
+        import requests
+        self._wait_for_rate_limit()
+        url, body = self._request(texts)
+        with self._lock:
+            self.stats['requests'] += 1
+        try:
+            response = self.session.post(url, json=body, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise _RetryableError(str(e))
+            
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise _RetryableError("rate limited (429)", retry_after, rate_limited=True)
+        if response.status_code >= 500:
+            raise _RetryableError(f"server error ({response.status_code})")
+        if response.status_code in (400, 413, 422) and len(texts) > 1:
+            raise _SplittableError(f"batch rejected ({response.status_code})")
+        if response.status_code >= 400:
+            raise EmbeddingError(f"{type(self).__name__} request failed "
+                                 f"({response.status_code}): {response.text[:500]}")
+                                 
+        vectors = self._parse(response.json(), len(texts))
+        if len(vectors) != len(texts):
+            raise EmbeddingError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+        vectors = np.asarray(vectors, dtype='float32')
+        self.dimension = vectors.shape[1]
+        return vectors
+        
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        delay = min(self.backoff_base * (2 ** attempt), self.max_backoff)
+        return delay * (0.5 + random.random() / 2)
+        
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed one batch, retrying only this batch (or its halves)"""
+        attempt = 0
+        while True:
+            try:
+                return self._post(texts)
+            except _SplittableError:
+                with self._lock:
+                    self.stats['splits'] += 1
+                middle = len(texts) // 2
+                return np.concatenate([self._embed_batch(texts[:middle]),
+                                       self._embed_batch(texts[middle:])])
+            except _RetryableError as e:
+                if attempt >= self.max_retries:
+                    raise EmbeddingError(f"{type(self).__name__}: giving up after "
+                                         f"{attempt + 1} attempts: {e}")
+                delay = self._backoff(attempt, e.retry_after)
+                with self._lock:
+                    self.stats['retries'] += 1
+                    if e.rate_limited:
+                        # Rate limits apply to the whole key, so pause every worker
+                        self.stats['rate_limited'] += 1
+                        self._pause_until = max(self._pause_until, time.monotonic() + delay)
+                if not e.rate_limited:
+                    time.sleep(delay)
+                attempt += 1
+                
+    def encode(self, sentences: Union[str, List[str]], batch_size: Optional[int] = None,
+               **kwargs) -> np.ndarray:
+        """Embed texts; same call shape as SentenceTransformer.encode"""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, self.dimension or 0), dtype='float32')
+        batch_size = min(batch_size or self.batch_size, self.max_batch_size)
+        batches = [sentences[i:i + batch_size] for i in range(0, len(sentences), batch_size)]
+        
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix="leann-embed")
+        return np.concatenate(list(self._executor.map(self._embed_batch, batches)))
+        
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+class OllamaEmbedder(RemoteEmbedder):
+    """Ollama /api/embed"""
+    
+    default_base_url = 'http://localhost:11434'
+    default_port = 11434
+    base_url_env = 'OLLAMA_HOST'
+    
+    def _request(self, texts: List[str]) -> Tuple[str, Dict[str, Any]]:
+        return f"{self.base_url}/api/embed", {'model': self.model, 'input': texts}
+        
+    def _parse(self, data: Dict[str, Any], count: int) -> List[List[float]]:
+        return data['embeddings']
+
+class OpenAIEmbedder(RemoteEmbedder):
+    """OpenAI-compatible /v1/embeddings"""
+    
+    default_base_url = 'https://api.openai.com/v1'
+    base_url_env = 'OPENAI_BASE_URL'
+    max_batch_size = 2048
+    
+    def _headers(self) -> Dict[str, str]:
+        headers = super()._headers()
+        api_key = self.api_key or os.getenv('OPENAI_API_KEY')
+        if api_key:
+            headers['Authorization'] = f"Bearer {api_key}"
+        return headers
+        
+    def _request(self, texts: List[str]) -> Tuple[str, Dict[str, Any]]:
+        return f"{self.base_url}/embeddings", {'model': self.model, 'input': texts}
+        
+    def _parse(self, data: Dict[str, Any], count: int) -> List[List[float]]:
+        return [item['embedding'] for item in sorted(data['data'], key=lambda item: item['index'])]
+
+class GeminiEmbedder(RemoteEmbedder):
+    """Gemini batchEmbedContents"""
+    
+    default_base_url = 'https://generativelanguage.googleapis.com/v1beta'
+    max_batch_size = 100
+    
+    def _headers(self) -> Dict[str, str]:
+        headers = super()._headers()
+        api_key = self.api_key or os.getenv('GEMINI_API_KEY')
+        if api_key:
+            headers['x-goog-api-key'] = api_key
+        return headers
+        
+    def _model_name(self) -> str:
+        return self.model if self.model.startswith('models/') else f"models/{self.model}"
+        
+    def _request(self, texts: List[str]) -> Tuple[str, Dict[str, Any]]:
+        model = self._model_name()
+        return f"{self.base_url}/{model}:batchEmbedContents", {
+            'requests': [{'model': model, 'content': {'parts': [{'text': text}]}} for text in texts]
+        }
+        
+    def _parse(self, data: Dict[str, Any], count: int) -> List[List[float]]:
+        return [item['values'] for item in data['embeddings']]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+LEANN Search Results
+
+A search returns ids and scores as numpy arrays. Chunk text and metadata
+stay in the index's (possibly lazy, on-disk) document store until a caller
+asks for them, so ranking, dedup and counting over large k never build a
+dict per hit.
+"""
+
+import json
+from collections.abc import Sequence
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from .references import read_reference
+
+class SearchResults(Sequence):
+    """Hits of one search, best first
+    
+    `scores` and `indices` are arrays over the hits. `content(i)` and
+    `field(name)` read only what they name. Indexing or iterating yields the
+    usual result dicts (content, score, index, metadata, id), built on
+    access. Reference-only hits read and hash their source bytes once.
+    """
+    
+    def __init__(self, scores: np.ndarray, indices: np.ndarray, documents: Sequence,
+                 metadata: Sequence = (), ids: Optional[Sequence] = None,
+                 reference_only: bool = False):
+        scores = np.asarray(scores, dtype='float32').reshape(-1)
+        indices = np.asarray(indices, dtype='int64').reshape(-1)
+        # FAISS pads missing hits with -1
+        valid = (indices >= 0) & (indices < len(documents))
+        self.scores = scores if valid.all() else scores[valid]
+        self.indices = indices if valid.all() else indices[valid]
+        self.documents = documents
+        self.metadata = metadata
+        self.external_ids = ids
+        self.reference_only = reference_only
+        self._references: Dict[int, Tuple[str, bool]] = {}
+        
+    def _with(self, rows) -> 'SearchResults':
+        subset = SearchResults.__new__(SearchResults)
+        subset.__dict__.update(self.__dict__)
+        subset.scores = self.scores[rows]
+        subset.indices = self.indices[rows]
+        return subset
+        
+    def take(self, rows) -> 'SearchResults':
+        """Hits at the given positions (or boolean mask), in that order"""
+        return self._with(np.asarray(rows))
+        
+    def __len__(self) -> int:
+        return len(self.indices)
+        
+    def _reference(self, idx: int) -> Tuple[str, bool]:
+        """(text, stale) of a reference-only row"""
+        cached = self._references.get(idx)
+        if cached is None:
+            data, stale = read_reference(self.metadata[idx] if idx < len(self.metadata) else {})
+            text = data.decode('utf-8', errors='replace') if data is not None else ''
+            cached = self._references[idx] = (text, stale)
+        return cached
+        
+    def _content(self, idx: int) -> str:
+        return self._reference(idx)[0] if self.reference_only else self.documents[idx]
+        
+    def content(self, i: int) -> str:
+        return self._content(int(self.indices[i]))
+        
+    def contents(self) -> List[str]:
+        return [self._content(int(idx)) for idx in self.indices]
+        
+    def metadata_row(self, i: int) -> Dict[str, Any]:
+        idx = int(self.indices[i])
+        return dict(self.metadata[idx]) if idx < len(self.metadata) else {}
+        
+    def field(self, name: str, default: Any = None) -> List[Any]:
+        """One metadata field (or 'id' / 'stale') for every hit"""
+        if name == 'id':
+            return self.ids()
+        if name == 'stale':
+            if not self.reference_only:
+                return [False] * len(self)
+            return [self._reference(int(idx))[1] for idx in self.indices]
+        # Container metadata is columnar: read just this column
+        columns = getattr(self.metadata, 'columns', None)
+        if columns is not None:
+            column = columns.get(name)
+            if column is None:
+                return [default] * len(self)
+            values = [column.raw(int(idx)) for idx in self.indices]
+            return [json.loads(value) if value else default for value in values]
+        return [self.metadata_row(i).get(name, default) for i in range(len(self))]
+        
+    def ids(self) -> Optional[List[str]]:
+        """External IDs of the hits, if the index has them"""
+        if self.external_ids is None:
+            return None
+        return [self.external_ids[int(idx)] for idx in self.indices]
+        
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._with(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        idx = int(self.indices[i])
+        result = {
+            'content': self._content(idx),
+            'score': float(self.scores[i]),
+            'index': idx
+        }
+        if idx < len(self.metadata):
+            result.update(self.metadata[idx])
+        if self.external_ids is not None:
+            result['id'] = self.external_ids[idx]
+        if self.reference_only:
+            # Flag hits whose source file changed since indexing
+            result['stale'] = self._reference(idx)[1]
+        return result
+        
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [self[i] for i in range(len(self))]
+        
+    def __repr__(self) -> str:
+        return f"SearchResults({len(self)} hits)"
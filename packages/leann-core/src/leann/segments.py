@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+LEANN Segmented Index
+
+An LSM-style layout for indexes that change often:
+
+    root/
+        SEGMENTS                manifest: index metadata and live segments
+        segments/<name>.leann   small immutable single-file indexes
+
+New documents become a new segment and deletes only touch a segment's
+tombstone bitmap, so no write rewrites existing data. Segments of similar
+size are merged in the background (tiered), and searches run across all
+segments in parallel and merge the top-k.
+"""
+
+import os
+import json
+import math
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+from .api import LeannBuilder, LoadedIndex
+from .metrics import REGISTRY
+from .container import LeannContainer
+from .projection import Projection
+from .tombstones import save_tombstones, load_tombstones, tombstones_path
+
+SEGMENTS_FILE = 'SEGMENTS'
+SEGMENTS_DIR = 'segments'
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+def is_segmented(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, SEGMENTS_FILE))
+
+def read_segments(root: str) -> Dict[str, Any]:
+    with open(os.path.join(root, SEGMENTS_FILE), 'r') as f:
+        return json.load(f)
+
+def segment_path(root: str, name: str) -> str:
+    return os.path.join(root, SEGMENTS_DIR, name + '.leann')
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    """Shared pool for per-segment searches (FAISS releases the GIL)"""
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4,
+                                              thread_name_prefix="leann-segment")
+        return _search_pool
+
+class SegmentedIndex:
+    """Writer for a segment-based index"""
+    
+    def __init__(self, root: str, embedding_model: str = "all-MiniLM-L6-v2",
+                 embedding_mode: str = "sentence-transformers",
+                 backend_name: str = "hnsw",
+                 embedding_function: Optional[callable] = None,
+                 backend_kwargs: Optional[Dict[str, Any]] = None,
+                 embedding_options: Optional[Dict[str, Any]] = None,
+                 reduce_dimensions: Optional[int] = None,
+                 reduction_method: str = "pca",
+                 governor=None, metrics=None, compression: Optional[str] = "auto",
+                 reference_only: bool = False,
+                 merge_factor: int = 4, min_segment_rows: int = 1000,
+                 expunge_threshold: float = 0.5, background_merge: bool = True):
+        self.root = root
+        self.builder_options = {
+            'embedding_model': embedding_model,
+            'embedding_mode': embedding_mode,
+            'backend_name': backend_name,
+            'embedding_function': embedding_function,
+            'backend_kwargs': backend_kwargs,
+            'embedding_options': embedding_options,
+            'reduction_method': reduction_method,
+            'governor': governor,
+            'metrics': metrics,
+            'compression': compression,
+            'reference_only': reference_only,
+            'compaction_threshold': 1.0
+        }
+        self.reduce_dimensions = reduce_dimensions
+        self.merge_factor = merge_factor
+        self.min_segment_rows = min_segment_rows
+        self.expunge_threshold = expunge_threshold
+        self.background_merge = background_merge
+        self.projection = None
+        self.metrics = metrics or REGISTRY
+        self._lock = threading.RLock()
+        self._merge_thread = None
+        self._model = None
+        self._merging = set()
+        self._pending_deletes = []
+        # Files of merged-away segments still to delete (Windows refuses while mapped)
+        self._obsolete: List[str] = []
+        
+        # External ID -> (segment, row) for live rows, and per-segment tombstones
+        self._rows: Dict[str, Tuple[str, int]] = {}
+        self._deleted: Dict[str, np.ndarray] = {}
+        
+        if is_segmented(root):
+            self.manifest = read_segments(root)
+            meta = self.manifest['meta']
+            # The index decides the model and backend, not the caller
+            self.builder_options.update({
+                'embedding_model': meta['embedding_model'],
+                'embedding_mode': meta['embedding_mode'],
+                'backend_name': meta['backend_name'],
+                'backend_kwargs': meta.get('backend_kwargs'),
+                'reference_only': meta.get('reference_only', False)
+            })
+            for entry in self.manifest['segments']:
+                self._load_segment(entry['name'])
+            # Leftovers of a crash or of a removal that failed last session
+            live = {entry['name'] for entry in self.manifest['segments']}
+            directory = os.path.join(root, SEGMENTS_DIR)
+            if os.path.isdir(directory):
+                self._obsolete = [os.path.join(directory, file) for file in sorted(os.listdir(directory))
+                                  if file.split('.', 1)[0] not in live]
+        else:
+            self.manifest = {'format': 1, 'generation': 0, 'next_segment': 0, 'meta': None, 'segments': []}
+            
+    def _load_segment(self, name: str):
+        container = LeannContainer(segment_path(self.root, name))
+        ids = list(container.ids) if container.ids is not None else [str(i) for i in range(container.num_documents)]
+        # Every segment shares the projection fitted for the first one
+        if self.projection is None and container.meta.get('projection'):
+            self.projection = Projection.from_sections(container.meta['projection'], container.sections)
+        deleted = load_tombstones(segment_path(self.root, name), len(ids))
+        container.close()
+        self._deleted[name] = deleted
+        for row, doc_id in enumerate(ids):
+            if not deleted[row]:
+                self._rows[doc_id] = (name, row)
+                
+    @property
+    def ids(self) -> List[str]:
+        """Live external IDs"""
+        return list(self._rows)
+        
+    @property
+    def segments(self) -> List[Dict[str, Any]]:
+        return list(self.manifest['segments'])
+        
+    def _new_builder(self) -> LeannBuilder:
+        builder = LeannBuilder(reduce_dimensions=None if self.projection else self.reduce_dimensions,
+                               **self.builder_options)
+        builder.projection = self.projection
+        builder.model = self._model
+        return builder
+        
+    def _publish(self):
+        """Atomically replace the manifest"""
+        self.manifest['generation'] += 1
+        tmp_path = os.path.join(self.root, SEGMENTS_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, SEGMENTS_FILE))
+        
+    def _remove_obsolete(self):
+        """Delete unused segment files, keeping any that can't go yet for a later merge"""
+        remaining = []
+        for path in self._obsolete:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                remaining.append(path)
+        self._obsolete = remaining
+        
+    def _next_name(self) -> str:
+        name = f"seg-{self.manifest['next_segment']:08d}"
+        self.manifest['next_segment'] += 1
+        return name
+        
+    def add_documents(self, documents: List[str], metadata: Optional[List[Dict]] = None,
+                      ids: Optional[List[str]] = None, batch_size: Optional[int] = None) -> int:
+        """Write documents as a new segment, replacing live documents with the same IDs"""
+        if not documents:
+            return 0
+        if ids is None:
+            with self._lock:
+                start = max((int(doc_id) + 1 for doc_id in self._rows if doc_id.isdigit()), default=0)
+            ids = [str(start + i) for i in range(len(documents))]
+        ids = [str(doc_id) for doc_id in ids]
+        
+        # Embedding, graph construction and the segment write happen outside the lock
+        builder = self._new_builder()
+        builder.build_index(documents, metadata, batch_size, ids=ids)
+        self._model = builder.model
+        
+        with self._lock:
+            name = self._next_name()
+        os.makedirs(os.path.join(self.root, SEGMENTS_DIR), exist_ok=True)
+        builder.save_index(segment_path(self.root, name))
+        
+        with self._lock:
+            self._delete_locked(ids)
+            if self.manifest['meta'] is None:
+                self.manifest['meta'] = builder.index_meta()
+            if self.projection is None:
+                self.projection = builder.projection
+            self.manifest['segments'].append({'name': name, 'rows': len(ids)})
+            self._deleted[name] = np.zeros(len(ids), dtype=bool)
+            self._rows.update((doc_id, (name, row)) for row, doc_id in enumerate(ids))
+            self._publish()
+        self.maybe_merge()
+        return len(documents)
+        
+    def upsert(self, documents: List[str], ids: List[str], metadata: Optional[List[Dict]] = None,
+               batch_size: Optional[int] = None) -> int:
+        """Insert documents, replacing any existing ones with the same IDs"""
+        return self.add_documents(documents, metadata, ids, batch_size)
+        
+    def delete(self, ids: List[str]) -> int:
+        """Tombstone documents by external ID, returning how many were live"""
+        with self._lock:
+            count = self._delete_locked([str(doc_id) for doc_id in ids])
+        self.maybe_merge()
+        return count
+        
+    def _delete_locked(self, ids: List[str]) -> int:
+        touched = {}
+        for doc_id in ids:
+            location = self._rows.pop(doc_id, None)
+            if location is None:
+                continue
+            name, row = location
+            self._deleted[name][row] = True
+            touched[name] = touched.get(name, 0) + 1
+            if name in self._merging:
+                self._pending_deletes.append(doc_id)
+        for name in touched:
+            save_tombstones(segment_path(self.root, name), self._deleted[name])
+        return sum(touched.values())
+        
+    def _tier(self, rows: int) -> int:
+        return max(0, int(math.log(max(rows, 1) / self.min_segment_rows, self.merge_factor))) if rows > self.min_segment_rows else 0
+        
+    def merge_candidates(self) -> List[str]:
+        """Next group of segments to merge, if any"""
+        with self._lock:
+            tiers: Dict[int, List[str]] = {}
+            for entry in self.manifest['segments']:
+                name = entry['name']
+                if name in self._merging:
+                    continue
+                deleted = self._deleted[name]
+                live = int((~deleted).sum())
+                # Mostly-deleted segments are rewritten on their own
+                if len(deleted) and deleted.mean() > self.expunge_threshold:
+                    return [name]
+                tiers.setdefault(self._tier(live), []).append(name)
+            for tier in sorted(tiers):
+                if len(tiers[tier]) >= self.merge_factor:
+                    return tiers[tier][:self.merge_factor]
+            return []
+            
+    def maybe_merge(self):
+        """Merge eligible segments, in the background unless configured otherwise"""
+        if not self.background_merge:
+            while self._merge_once():
+                pass
+            return
+        with self._lock:
+            if self._merge_thread is not None and self._merge_thread.is_alive():
+                return
+            if not self.merge_candidates():
+                return
+            self._merge_thread = threading.Thread(target=self._merge_loop, name="leann-segment-merge", daemon=True)
+            self._merge_thread.start()
+            
+    def _merge_loop(self):
+        while self._merge_once():
+            pass
+            
+    def wait_for_merges(self):
+        thread = self._merge_thread
+        if thread is not None:
+            thread.join()
+            
+    def _merge_once(self) -> bool:
+        with self._lock:
+            self._remove_obsolete()
+            names = self.merge_candidates()
+            if not names:
+                return False
+            self._merging.update(names)
+            self._pending_deletes = []
+            snapshot = {name: self._deleted[name].copy() for name in names}
+        try:
+            # Gather live rows without re-embedding
+            vectors, documents, metadata, ids = [], [], [], []
+            for name in names:
+                segment = LeannBuilder.open(segment_path(self.root, name), **self.builder_options)
+                rows = np.flatnonzero(~snapshot[name])
+                backend = segment.backend_builder
+                vectors.append(backend.get_embeddings(rows) if len(rows) else np.zeros((0, segment.dimension), dtype='float32'))
+                documents.extend(backend.documents[i] for i in rows)
+                metadata.extend(backend.metadata[i] if i < len(backend.metadata) else {} for i in rows)
+                ids.extend(segment.ids[i] for i in rows)
+                
+            name = None
+            if documents:
+                builder = self._new_builder()
+                builder.build_from_embeddings(np.concatenate(vectors), documents,
+                                              metadata if any(metadata) else None, ids)
+                # Written outside the lock; unpublished until the manifest names it
+                with self._lock:
+                    name = self._next_name()
+                builder.save_index(segment_path(self.root, name))
+                
+            with self._lock:
+                position = min(i for i, entry in enumerate(self.manifest['segments']) if entry['name'] in names)
+                remaining = [entry for entry in self.manifest['segments'] if entry['name'] not in names]
+                merged = []
+                if name is not None:
+                    # Deletes that arrived while merging
+                    pending = set(self._pending_deletes)
+                    deleted = np.array([doc_id in pending for doc_id in ids], dtype=bool)
+                    if deleted.any():
+                        save_tombstones(segment_path(self.root, name), deleted)
+                    merged = [{'name': name, 'rows': len(ids)}]
+                    self._deleted[name] = deleted
+                    for row, doc_id in enumerate(ids):
+                        if not deleted[row]:
+                            self._rows[doc_id] = (name, row)
+                self.manifest['segments'] = remaining[:position] + merged + remaining[position:]
+                self._publish()
+                self.metrics.inc('leann_segment_merges_total')
+                
+                for old in names:
+                    del self._deleted[old]
+                    # Open searchers keep their mmaps of removed files
+                    self._obsolete.extend((segment_path(self.root, old), tombstones_path(segment_path(self.root, old))))
+                self._remove_obsolete()
+            return True
+        finally:
+            with self._lock:
+                self._merging.difference_update(names)
+
+class _Concat(Sequence):
+    """Read-only concatenation of per-segment sequences"""
+    
+    def __init__(self, parts: List[Sequence], offsets: np.ndarray):
+        self.parts = parts
+        self.offsets = offsets
+        
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+        
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        part = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        return self.parts[part][index - self.offsets[part]]
+
+class SegmentSet:
+    """All live segments of a segmented index, searched as one backend
+    
+    Global row numbers are segment offset + local row, in manifest order.
+    """
+    
+    def __init__(self, root: str, backend_kwargs: Dict[str, Any], version: Any = None,
+                 previous: Optional['SegmentSet'] = None):
+        manifest = read_segments(root)
+        self.path = root
+        self.meta = manifest['meta'] or {}
+        self.version = version if version is not None else manifest['generation']
+        self.container = None
+        
+        # Segments are immutable, so reuse any the previous set already opened
+        reuse = dict(zip(previous.names, previous.segments)) if previous else {}
+        self.names = [entry['name'] for entry in manifest['segments']]
+        self._new = [name for name in self.names if name not in reuse]
+        self.segments: List[LoadedIndex] = [
+            reuse.get(name) or LoadedIndex(segment_path(root, name), backend_kwargs)
+            for name in self.names
+        ]
+        sizes = [len(segment.backend.documents) for segment in self.segments]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype('int64')
+        self.projection = self.segments[0].projection if self.segments else None
+        self.documents = _Concat([segment.backend.documents for segment in self.segments], self.offsets)
+        # Segments built without metadata have none; pad so rows line up
+        self.metadata = _Concat([
+            segment.backend.metadata if len(segment.backend.metadata) == size else [{}] * size
+            for segment, size in zip(self.segments, sizes)
+        ], self.offsets)
+        self.ids = _Concat([segment.ids for segment in self.segments], self.offsets)
+        # Segment stats of each thread's last search
+        self._local = threading.local()
+        self.backend = self
+        self.tombstones_version = tuple(segment.tombstones_version for segment in self.segments)
+        
+    def refresh_tombstones(self) -> bool:
+        changed = [segment.refresh_tombstones() for segment in self.segments]
+        self.tombstones_version = tuple(segment.tombstones_version for segment in self.segments)
+        return any(changed)
+        
+    def warm(self):
+        for name, segment in zip(self.names, self.segments):
+            if name in self._new:
+                segment.warm()
+                
+    def _locate(self, ids: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.offsets, ids, side='right') - 1
+        
+    def search_ids(self, query_embedding: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Search every segment in parallel and keep the overall top_k"""
+        def search(i):
+            segment = self.segments[i]
+            if not len(segment.backend.documents):
+                return np.zeros(0, dtype='float32'), np.zeros(0, dtype='int64'), None
+            scores, ids = segment.backend.search_ids(query_embedding, top_k)
+            valid = ids >= 0
+            # Backends keep stats per thread, so read them on the pool thread
+            stats = segment.backend.get_stats() if hasattr(segment.backend, 'get_stats') else None
+            return np.asarray(scores)[valid], np.asarray(ids)[valid] + self.offsets[i], stats
+            
+        if len(self.segments) == 1:
+            hits = [search(0)]
+        else:
+            hits = list(_get_search_pool().map(search, range(len(self.segments))))
+        self._local.stats = [h[2] for h in hits if h[2] is not None]
+        if not hits:
+            return np.zeros(0, dtype='float32'), np.zeros(0, dtype='int64')
+        scores = np.concatenate([h[0] for h in hits])
+        ids = np.concatenate([h[1] for h in hits])
+        order = np.argsort(scores, kind='stable')[:top_k]
+        return scores[order], ids[order]
+        
+    def hydrate(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict[str, Any]]:
+        results = []
+        for score, idx, part in zip(scores, indices, self._locate(np.asarray(indices))):
+            if not 0 <= idx < len(self.documents):
+                continue
+            hit = self.segments[part].backend.hydrate([score], [idx - self.offsets[part]])
+            for result in hit:
+                result['index'] = int(idx)
+                results.append(result)
+        return results
+        
+    def get_embeddings(self, ids: List[int]) -> np.ndarray:
+        ids = np.asarray(ids, dtype='int64')
+        parts = self._locate(ids)
+        out = None
+        for part in np.unique(parts):
+            mask = parts == part
+            vectors = self.segments[part].backend.get_embeddings(ids[mask] - self.offsets[part])
+            if out is None:
+                out = np.zeros((len(ids), vectors.shape[1]), dtype='float32')
+            out[mask] = vectors
+        return out if out is not None else np.zeros((0, self.meta.get('dimension', 0)), dtype='float32')
+        
+    def reset_stats(self):
+        self._local.stats = []
+                
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-segment stats of this thread's last search"""
+        return {
+            'segments': len(self.segments),
+            'segment_stats': list(getattr(self._local, 'stats', []))
+        }
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+LEANN Slow Query Log
+
+Usage:
+    python -m leann.slowlog slow_queries.jsonl --top 20
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from logging.handlers import RotatingFileHandler
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+class SlowQueryLog:
+    """Append searches slower than a threshold to a rotating JSONL file"""
+    
+    def __init__(self, path: str = "slow_queries.jsonl", threshold_ms: float = 100.0,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+        # Dedicated logger per file so rotation is handled by the stdlib
+        self._logger = logging.getLogger(f"leann.slowlog.{os.path.abspath(path)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+            
+    def is_slow(self, total_seconds: float) -> bool:
+        return total_seconds * 1000 >= self.threshold_ms
+        
+    def record(self, query: Optional[str], top_k: int, timings: Dict[str, float],
+               stats: Optional[Dict[str, Any]] = None, index_path: Optional[str] = None):
+        """Write one slow query entry"""
+        entry = {
+            'timestamp': time.time(),
+            'query': query,
+            'top_k': top_k,
+            'index_path': index_path,
+            'total_ms': sum(timings.values()) * 1000,
+            'stages_ms': {stage: seconds * 1000 for stage, seconds in timings.items()}
+        }
+        entry.update(stats or {})
+        self._logger.info(json.dumps(entry, ensure_ascii=False))
+        
+    def close(self):
+        for handler in list(self._logger.handlers):
+            handler.close()
+            self._logger.removeHandler(handler)
+
+def read_slow_log(path: str) -> List[Dict[str, Any]]:
+    """Read a slow query log including its rotated backups"""
+    files = [path]
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+        
+    entries = []
+    for file in reversed(files):
+        if not os.path.exists(file):
+            continue
+        with open(file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    return entries
+
+def analyze_slow_log(path: str, top: int = 10) -> Dict[str, Any]:
+    """Aggregate the worst offenders in a slow query log"""
+    entries = read_slow_log(path)
+    if not entries:
+        return {'entries': 0}
+        
+    totals = np.array([e['total_ms'] for e in entries])
+    
+    # Group repeated queries
+    by_query: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        key = ' '.join(str(entry.get('query') or '<embedding>').lower().split())
+        by_query.setdefault(key, []).append(entry)
+    queries = sorted((
+        {
+            'query': key,
+            'count': len(group),
+            'max_ms': max(e['total_ms'] for e in group),
+            'mean_ms': float(np.mean([e['total_ms'] for e in group])),
+            'mean_distance_computations': float(np.mean([e.get('distance_computations', 0) for e in group]))
+        }
+        for key, group in by_query.items()
+    ), key=lambda q: (q['count'] * q['mean_ms']), reverse=True)
+    
+    # Which stage dominates slow queries
+    stage_totals: Dict[str, float] = {}
+    for entry in entries:
+        for stage, ms in entry.get('stages_ms', {}).items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+    stage_share = {stage: ms / totals.sum() for stage, ms in stage_totals.items()}
+    
+    # Latency by search parameters
+    by_params: Dict[str, List[float]] = {}
+    for entry in entries:
+        key = f"top_k={entry.get('top_k')} ef_search={entry.get('ef_search')}"
+        by_params.setdefault(key, []).append(entry['total_ms'])
+        
+    return {
+        'entries': len(entries),
+        'p50_ms': float(np.percentile(totals, 50)),
+        'p99_ms': float(np.percentile(totals, 99)),
+        'max_ms': float(totals.max()),
+        'stage_share': stage_share,
+        'worst': sorted(entries, key=lambda e: e['total_ms'], reverse=True)[:top],
+        'top_queries': queries[:top],
+        'by_params': {
+            key: {'count': len(ms), 'mean_ms': float(np.mean(ms))}
+            for key, ms in sorted(by_params.items(), key=lambda kv: -np.mean(kv[1]))
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a LEANN slow query log")
+    parser.add_argument('path')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args()
+    
+    report = analyze_slow_log(args.path, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    if not report['entries']:
+        print("No slow queries recorded")
+        return
+        
+    print(f"🐢 {report['entries']} slow queries  p50={report['p50_ms']:.1f}ms  "
+          f"p99={report['p99_ms']:.1f}ms  max={report['max_ms']:.1f}ms")
+    print("\nTime share by stage:")
+    for stage, share in sorted(report['stage_share'].items(), key=lambda kv: -kv[1]):
+        print(f"  {stage:<12} {share * 100:5.1f}%")
+    print("\nWorst queries:")
+    for entry in report['worst']:
+        print(f"  {entry['total_ms']:8.1f}ms  top_k={entry.get('top_k')} ef={entry.get('ef_search')} "
+              f"ndis={entry.get('distance_computations')}  {entry.get('query')!r}")
+    print("\nMost costly repeated queries:")
+    for q in report['top_queries']:
+        print(f"  x{q['count']:<4} mean={q['mean_ms']:.1f}ms max={q['max_ms']:.1f}ms  {q['query']!r}")
+    print("\nBy search parameters:")
+    for key, summary in report['by_params'].items():
+        print(f"  {key:<28} x{summary['count']:<5} mean={summary['mean_ms']:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+LEANN Document IDs and Tombstones
+
+Every indexed row carries a stable external ID. Deleted rows are marked in
+a tombstone bitmap kept next to the index (<index>.tombstones.npy) so a
+delete never rewrites the index itself; searchers filter tombstoned rows
+and pick up new bitmaps without reopening the index.
+"""
+
+import os
+import json
+from typing import List, Optional, Tuple
+import numpy as np
+
+def tombstones_path(path: str) -> str:
+    return path + '.tombstones.npy'
+
+def save_tombstones(path: str, deleted: np.ndarray):
+    """Atomically write the tombstone bitmap (one bit per row)"""
+    tmp_path = tombstones_path(path) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.packbits(np.asarray(deleted, dtype=bool), bitorder='little'))
+    os.replace(tmp_path, tombstones_path(path))
+
+def load_tombstones(path: str, num_rows: int) -> np.ndarray:
+    """Deleted-row mask for an index (all False if never written)"""
+    try:
+        bits = np.load(tombstones_path(path))
+    except FileNotFoundError:
+        return np.zeros(num_rows, dtype=bool)
+    deleted = np.unpackbits(bits, count=min(num_rows, len(bits) * 8), bitorder='little').astype(bool)
+    if len(deleted) < num_rows:
+        deleted = np.concatenate([deleted, np.zeros(num_rows - len(deleted), dtype=bool)])
+    return deleted
+
+def tombstones_version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(tombstones_path(path))
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def save_ids(path: str, ids: List[str]):
+    """Write external IDs for a multi-file index"""
+    with open(path + '.ids.json', 'w') as f:
+        json.dump(ids, f)
+
+def load_ids(path: str, num_rows: int) -> List[str]:
+    """External IDs for a multi-file index (row numbers for older indexes)"""
+    try:
+        with open(path + '.ids.json', 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return [str(i) for i in range(num_rows)]
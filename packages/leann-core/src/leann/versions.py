@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+LEANN Versioned Index Store
+
+    root/
+        CURRENT                 name of the live version
+        versions/<version>/     one immutable index per build
+
+Builders write a new version directory and then atomically replace CURRENT;
+searchers notice the change and swap to the new version between queries.
+"""
+
+import os
+import shutil
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+INDEX_NAME = 'index.leann'
+
+class IndexStore:
+    """Directory of index versions with an atomic current pointer"""
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.versions_dir = os.path.join(root, VERSIONS_DIR)
+        
+    @staticmethod
+    def is_store(path: str) -> bool:
+        return os.path.isdir(os.path.join(path, VERSIONS_DIR))
+        
+    def versions(self) -> List[str]:
+        """Version names, oldest first"""
+        try:
+            return sorted(name for name in os.listdir(self.versions_dir)
+                          if os.path.isdir(os.path.join(self.versions_dir, name)))
+        except FileNotFoundError:
+            return []
+            
+    def index_path(self, version: str, index_name: str = INDEX_NAME) -> str:
+        return os.path.join(self.versions_dir, version, index_name)
+        
+    def create_version(self, index_name: str = INDEX_NAME) -> Tuple[str, str]:
+        """Make an empty version directory, returning (version, index path)"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        while True:
+            # Timestamps sort in build order
+            version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+            try:
+                os.mkdir(os.path.join(self.versions_dir, version))
+                return version, self.index_path(version, index_name)
+            except FileExistsError:
+                continue
+                
+    def publish(self, version: str, index_name: str = INDEX_NAME):
+        """Atomically make a version current"""
+        tmp_path = os.path.join(self.root, CURRENT_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(f"{version}\n{index_name}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+        
+    def current(self) -> Optional[Tuple[str, str]]:
+        """(version, index path) of the live version, if any"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), 'r') as f:
+                lines = f.read().split()
+        except FileNotFoundError:
+            return None
+        if not lines:
+            return None
+        version = lines[0]
+        index_name = lines[1] if len(lines) > 1 else INDEX_NAME
+        return version, self.index_path(version, index_name)
+        
+    def prune(self, keep: int = 3) -> List[str]:
+        """Delete all but the newest `keep` versions (never the current one)"""
+        current = self.current()
+        versions = self.versions()
+        removed = []
+        for version in versions[:max(0, len(versions) - keep)]:
+            if current and version == current[0]:
+                continue
+            # Searchers still on an old version keep their mmaps valid on
+            # POSIX; Windows refuses to delete mapped files, so a version in
+            # use stays until a later prune
+            try:
+                shutil.rmtree(os.path.join(self.versions_dir, version))
+            except OSError as e:
+                logger.warning("Could not remove index version %s: %s", version, e)
+                continue
+            removed.append(version)
+        return removed
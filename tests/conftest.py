@@ -0,0 +1,25 @@
+import os
+import sys
+import hashlib
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'packages', 'leann-core', 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'packages', 'leann-backend-hnsw', 'src'))
+
+DIMENSION = 32
+
+def embed(text: str) -> np.ndarray:
+    """Deterministic bag-of-words embedding, so tests need no model download"""
+    vector = np.zeros(DIMENSION, dtype='float32')
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % DIMENSION] += 1.0
+    return vector
+
+def make_documents(n: int, prefix: str = "doc"):
+    return [f"{prefix} {i} word{i % 7} topic{i % 3} item{i}" for i in range(n)]
+
+@pytest.fixture
+def documents():
+    return make_documents(60)
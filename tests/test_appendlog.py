@@ -0,0 +1,85 @@
+import pytest
+from leann import LeannBuilder, LeannSearcher
+from leann.appendlog import append_log_path, read_append_log
+from leann_backend_hnsw.hnsw_backend import HNSWBuilder
+from conftest import embed, make_documents
+
+def _saved(tmp_path, n=40):
+    path = str(tmp_path / "index")
+    builder = LeannBuilder(embedding_function=embed)
+    builder.build_index(make_documents(n), ids=[f"id-{i}" for i in range(n)])
+    builder.save_index(path)
+    return path
+
+def _check(searcher, documents, ids):
+    for document, doc_id in zip(documents, ids):
+        hit = searcher.search(document, top_k=1)[0]
+        assert (hit['id'], hit['content']) == (doc_id, document)
+
+def _fail_graph_save(monkeypatch):
+    def crash(self, path):
+        raise OSError("simulated crash")
+    monkeypatch.setattr(HNSWBuilder, 'save_graph', crash)
+
+def test_appended_rows_round_trip(tmp_path):
+    path = _saved(tmp_path)
+    builder = LeannBuilder.open(path, embedding_function=embed)
+    added = make_documents(5, "added")
+    builder.upsert(added, ids=[f"new-{i}" for i in range(5)], metadata=[{'n': i} for i in range(5)])
+    builder.save_index(path)
+    
+    assert len(read_append_log(path, 100)[0]) == 5
+    searcher = LeannSearcher(path, embedding_function=embed)
+    _check(searcher, added, [f"new-{i}" for i in range(5)])
+    _check(searcher, make_documents(3), ["id-0", "id-1", "id-2"])
+    assert searcher.search(added[3], top_k=1)[0]['n'] == 3
+
+def test_orphan_entries_after_crash_are_dropped(tmp_path, monkeypatch):
+    path = _saved(tmp_path)
+    builder = LeannBuilder.open(path, embedding_function=embed)
+    builder.upsert(make_documents(4, "lost"), ids=[f"lost-{i}" for i in range(4)])
+    with monkeypatch.context() as patch:
+        _fail_graph_save(patch)
+        with pytest.raises(OSError):
+            builder.save_index(path)
+    # The entries reached the log but the graph never did
+    assert len(read_append_log(path, 100)[0]) == 4
+    
+    reopened = LeannBuilder.open(path, embedding_function=embed)
+    assert len(reopened.ids) == 40
+    added = make_documents(3, "kept")
+    reopened.upsert(added, ids=[f"kept-{i}" for i in range(3)])
+    reopened.save_index(path)
+    
+    assert read_append_log(path, 100)[0] == [f"kept-{i}" for i in range(3)]
+    _check(LeannSearcher(path, embedding_function=embed), added, [f"kept-{i}" for i in range(3)])
+
+def test_retry_after_failed_save_does_not_duplicate(tmp_path, monkeypatch):
+    path = _saved(tmp_path)
+    builder = LeannBuilder.open(path, embedding_function=embed)
+    added = make_documents(4, "retry")
+    builder.upsert(added, ids=[f"retry-{i}" for i in range(4)])
+    with monkeypatch.context() as patch:
+        _fail_graph_save(patch)
+        with pytest.raises(OSError):
+            builder.save_index(path)
+    builder.save_index(path)
+    
+    assert read_append_log(path, 100)[0] == [f"retry-{i}" for i in range(4)]
+    _check(LeannSearcher(path, embedding_function=embed), added, [f"retry-{i}" for i in range(4)])
+
+def test_torn_tail_is_ignored(tmp_path):
+    path = _saved(tmp_path)
+    builder = LeannBuilder.open(path, embedding_function=embed)
+    added = make_documents(2, "whole")
+    builder.upsert(added, ids=["whole-0", "whole-1"])
+    builder.save_index(path)
+    with open(append_log_path(path), 'a', encoding='utf-8') as f:
+        f.write('{"id": "torn", "cont')
+    
+    reopened = LeannBuilder.open(path, embedding_function=embed)
+    assert reopened.ids[-2:] == ["whole-0", "whole-1"]
+    more = make_documents(2, "after")
+    reopened.upsert(more, ids=["after-0", "after-1"])
+    reopened.save_index(path)
+    _check(LeannSearcher(path, embedding_function=embed), added + more, ["whole-0", "whole-1", "after-0", "after-1"])
@@ -0,0 +1,51 @@
+import numpy as np
+from leann.cache import SemanticCache
+
+def _vector(*values):
+    return np.asarray(values, dtype='float32')
+
+def test_near_duplicate_hits_with_same_context():
+    cache = SemanticCache(threshold=0.9)
+    cache.put(_vector(1, 0, 0), [1, 2], "answer")
+    assert cache.get(_vector(1, 0.1, 0), [1, 2]) == "answer"
+    # Different retrieved context, or a question below the threshold
+    assert cache.get(_vector(1, 0.1, 0), [1, 3]) is None
+    assert cache.get(_vector(1, 1, 0), [1, 2]) is None
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 2}
+    
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('leann.cache.time.time', lambda: now[0])
+    cache = SemanticCache(ttl=60)
+    cache.put(_vector(1, 0), [1], "answer")
+    now[0] += 30
+    assert cache.get(_vector(1, 0), [1]) == "answer"
+    now[0] += 31
+    assert cache.get(_vector(1, 0), [1]) is None
+    assert len(cache) == 0
+    
+def test_least_recently_used_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.put(_vector(1, 0, 0), [1], "a")
+    cache.put(_vector(0, 1, 0), [1], "b")
+    assert cache.get(_vector(1, 0, 0), [1]) == "a"
+    cache.put(_vector(0, 0, 1), [1], "c")
+    assert len(cache) == 2
+    assert cache.get(_vector(0, 1, 0), [1]) is None
+    assert cache.get(_vector(1, 0, 0), [1]) == "a"
+    assert cache.get(_vector(0, 0, 1), [1]) == "c"
+    
+def test_new_index_version_invalidates():
+    cache = SemanticCache()
+    cache.put(_vector(1, 0), [1], "old", index_version=1)
+    assert cache.get(_vector(1, 0), [1], index_version=1) == "old"
+    assert cache.get(_vector(1, 0), [1], index_version=2) is None
+    assert len(cache) == 0
+    
+def test_other_dimension_misses():
+    cache = SemanticCache()
+    cache.put(_vector(1, 0, 0), [1], "answer")
+    # A different embedding model or a reduced index
+    assert cache.get(_vector(1, 0), [1]) is None
+    cache.put(_vector(1, 0), [1], "smaller")
+    assert cache.get(_vector(1, 0), [1]) == "smaller"
@@ -0,0 +1,74 @@
+import numpy as np
+from leann_backend_hnsw.cascade_backend import CascadeBuilder, CascadeSearcher
+
+def _searcher(n=2000, dimension=16, rerank_candidates=50):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dimension)).astype('float32')
+    builder = CascadeBuilder(dimension=dimension, rerank_candidates=rerank_candidates)
+    builder.build_index(vectors, [str(i) for i in range(n)])
+    searcher = CascadeSearcher()
+    searcher.load_sections(builder.get_sections(), builder.documents, builder.metadata, builder.build_params)
+    return searcher, vectors
+
+def test_candidates_scale_with_deleted_fraction():
+    searcher, vectors = _searcher()
+    deleted = np.zeros(len(vectors), dtype=bool)
+    deleted[::2] = True
+    searcher.set_deleted(deleted)
+    scores, ids = searcher.search_ids(vectors[1], top_k=5)
+    assert ids[0] == 1
+    assert not deleted[ids].any()
+    # Half deleted: twice the candidates, not rerank_candidates + 1000
+    assert searcher.get_stats()['hamming_candidates'] == 100
+    assert not searcher.get_stats()['exhaustive']
+
+def test_candidate_widening_is_capped():
+    searcher, vectors = _searcher()
+    deleted = np.zeros(len(vectors), dtype=bool)
+    deleted[:1900] = True
+    searcher.set_deleted(deleted)
+    _, ids = searcher.search_ids(vectors[1950], top_k=5)
+    assert ids[0] == 1950
+    stats = searcher.get_stats()
+    assert stats['hamming_candidates'] == CascadeSearcher.MAX_CANDIDATE_WIDENING * 50
+    # Only ~20 of the 400 candidates are live, so every live row is ranked instead
+    assert stats['exhaustive'] and stats['rerank_candidates'] == 50
+
+def test_exhaustive_pass_past_the_cap():
+    searcher, vectors = _searcher()
+    deleted = np.ones(len(vectors), dtype=bool)
+    deleted[::100] = False
+    searcher.set_deleted(deleted)
+    live = np.flatnonzero(~deleted)
+    for query in vectors[:10]:
+        _, ids = searcher.search_ids(query, top_k=5)
+        # Every live row is a candidate, so results are the exact top 5
+        exact = live[np.argsort(((vectors[live] - query) ** 2).sum(axis=1))[:5]]
+        assert ids.tolist() == exact.tolist()
+    stats = searcher.get_stats()
+    assert stats['exhaustive'] and stats['rerank_candidates'] == len(live)
+    assert stats['hamming_computations'] == len(vectors) + len(live)
+
+def test_builder_and_searcher_round_trip(tmp_path):
+    from leann import LeannBuilder, LeannSearcher
+    from conftest import embed, make_documents
+    documents = make_documents(200)
+    path = str(tmp_path / "index.leann")
+    builder = LeannBuilder(embedding_function=embed, backend_name="cascade",
+                           backend_kwargs={'rerank_candidates': 40})
+    builder.build_index(documents, ids=[f"doc-{i}" for i in range(200)])
+    builder.save_index(path)
+    
+    searcher = LeannSearcher(path, embedding_function=embed)
+    searcher.load_index()
+    assert isinstance(searcher.backend_searcher, CascadeSearcher)
+    assert searcher.backend_searcher.rerank_candidates == 40
+    hits = sum(searcher.search(documents[i], top_k=3)[0]['content'] == documents[i] for i in range(0, 200, 10))
+    assert hits >= 18
+    
+    builder.delete([f"doc-{i}" for i in range(0, 200, 2)])
+    builder.save_index(path)
+    searcher = LeannSearcher(path, embedding_function=embed)
+    searcher.load_index()
+    results = searcher.search(documents[4], top_k=5)
+    assert all(int(r['id'].split('-')[1]) % 2 == 1 for r in results)
@@ -0,0 +1,90 @@
+import sys
+import types
+import asyncio
+import threading
+import numpy as np
+import pytest
+from leann import api
+from leann.api import LeannChat
+from leann.results import SearchResults
+
+class _AsyncClient:
+    def __init__(self, host=None):
+        self.loop = asyncio.get_running_loop()
+        
+    async def generate(self, model, prompt, stream):
+        # A client used from a loop other than its own fails like httpx does
+        if asyncio.get_running_loop() is not self.loop:
+            raise RuntimeError("Event loop is closed")
+            
+        async def chunks():
+            for token in ("hello", " world"):
+                yield {'response': token}
+        return chunks()
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    module = types.SimpleNamespace(AsyncClient=_AsyncClient, Client=lambda host=None: object())
+    monkeypatch.setitem(sys.modules, 'ollama', module)
+    return module
+
+def test_async_ollama_client_per_event_loop(fake_ollama):
+    async def get():
+        return api._get_ollama_client("http://ollama:11434", use_async=True)
+        
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+    assert first is not second
+    
+    async def twice():
+        return (api._get_ollama_client(None, use_async=True), api._get_ollama_client(None, use_async=True))
+    a, b = asyncio.run(twice())
+    assert a is b
+
+def test_astream_works_across_asyncio_runs(fake_ollama):
+    chat = LeannChat("unused", llm_config={"type": "ollama", "model": "m"})
+    
+    async def collect():
+        return [token async for token in chat._ollama_astream("prompt")]
+        
+    assert asyncio.run(collect()) == ["hello", " world"]
+    assert asyncio.run(collect()) == ["hello", " world"]
+    chat.close()
+
+def test_close_shuts_down_executor():
+    with LeannChat("unused") as chat:
+        executor = chat._executor
+    assert executor._shutdown
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+
+def test_concurrent_achat_after_prefetch(monkeypatch):
+    chat = LeannChat("unused", llm_config={"type": "none"})
+    chat.searcher = types.SimpleNamespace(get_embeddings=lambda ids: None, index_version=lambda: None)
+    searched, running, prefetched = [], [], threading.Event()
+    
+    def search(query, context_limit):
+        searched.append(query)
+        return SearchResults([0.5], [0], ["doc"]), np.ones(4, dtype='float32')
+    prepare = chat._prepare
+    def held_prepare(query, context_limit):
+        running.append(query)
+        assert prefetched.wait(10)
+        return prepare(query, context_limit)
+    monkeypatch.setattr(chat, '_search', search)
+    monkeypatch.setattr(chat, '_prepare', held_prepare)
+    
+    async def run():
+        chats = [asyncio.ensure_future(chat.achat(query)) for query in ("first", "second")]
+        while len(running) < 2:
+            await asyncio.sleep(0.01)
+        # Both pool workers are busy, so these prefetches stay queued
+        for query in ("first", "second"):
+            chat.prefetch(query)
+        prefetched.set()
+        return await asyncio.wait_for(asyncio.gather(*chats), 10)
+        
+    assert asyncio.run(run()) == ["Found 1 relevant documents for: first",
+                                  "Found 1 relevant documents for: second"]
+    assert sorted(searched) == ["first", "second"]
+    chat.close()
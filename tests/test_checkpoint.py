@@ -0,0 +1,61 @@
+import numpy as np
+from leann import LeannBuilder
+from leann.checkpoint import BuildCheckpoint, checkpoint_path, fingerprint
+from conftest import embed, make_documents
+
+def test_checkpoint_next_to_index(tmp_path):
+    assert checkpoint_path(str(tmp_path / "index.leann")) == str(tmp_path / "index.leann.checkpoint")
+    
+def test_fingerprint_covers_model():
+    documents = make_documents(5)
+    assert fingerprint(documents, "model-a") == fingerprint(documents, "model-a")
+    assert fingerprint(documents, "model-a") != fingerprint(documents, "model-b")
+    assert fingerprint(documents, "model-a") != fingerprint(documents[:4], "model-a")
+    
+def test_embeddings_resume_and_reset(tmp_path):
+    path = str(tmp_path / "index.checkpoint")
+    checkpoint = BuildCheckpoint(path, interval=0)
+    assert checkpoint.open("inputs-1") == 0
+    checkpoint.add(np.ones((3, 4)))
+    checkpoint.add(np.zeros((2, 4)))
+    
+    resumed = BuildCheckpoint(path)
+    assert resumed.open("inputs-1") == 5
+    assert np.concatenate(resumed.load()).tolist() == [[1.0] * 4] * 3 + [[0.0] * 4] * 2
+    # Other inputs (or another model) start over
+    assert BuildCheckpoint(path).open("inputs-2") == 0
+    
+def test_crawl_state_round_trip(tmp_path):
+    checkpoint = BuildCheckpoint(str(tmp_path / "index.checkpoint"))
+    assert checkpoint.load_crawl() is None
+    checkpoint.save_inputs(["a", "b"], [{'n': 1}, {'n': 2}], crawl={'key': "k", 'files': [["dir", "dir/a"]]})
+    assert checkpoint.load_crawl() == (["a", "b"], [{'n': 1}, {'n': 2}], {'key': "k", 'files': [["dir", "dir/a"]]})
+    assert checkpoint.load_inputs() == (["a", "b"], [{'n': 1}, {'n': 2}], None)
+    # A finished crawl saved by the CLI has no crawl state
+    checkpoint.save_inputs(["a"], [{}], ["id-a"])
+    assert checkpoint.load_crawl() is None
+    checkpoint.clear()
+    assert checkpoint.load_inputs() is None
+    
+def test_build_resumes_from_checkpoint(tmp_path):
+    documents = make_documents(40)
+    path = str(tmp_path / "index.leann")
+    calls = []
+    def counting(text):
+        calls.append(text)
+        if len(calls) == 25:
+            raise RuntimeError("crash")
+        return embed(text)
+        
+    checkpoint = BuildCheckpoint(checkpoint_path(path), interval=0)
+    builder = LeannBuilder(embedding_function=counting)
+    try:
+        builder.build_index(documents, batch_size=10, checkpoint=checkpoint)
+    except RuntimeError:
+        pass
+    calls.clear()
+    builder = LeannBuilder(embedding_function=counting)
+    builder.build_index(documents, batch_size=10, checkpoint=BuildCheckpoint(checkpoint_path(path)))
+    assert calls == documents[20:]
+    builder.save_index(path)
+    assert not BuildCheckpoint(checkpoint_path(path)).exists()
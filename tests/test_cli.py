@@ -0,0 +1,50 @@
+import os
+import json
+import types
+import numpy as np
+import pytest
+import leann.api
+from leann.cli import main
+from conftest import embed, DIMENSION
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    model = types.SimpleNamespace(
+        encode=lambda texts, **kwargs: np.asarray([embed(text) for text in texts], dtype='float32'),
+        get_sentence_embedding_dimension=lambda: DIMENSION
+    )
+    monkeypatch.setattr(leann.api, 'load_embedding_model', lambda *args, **kwargs: model)
+
+def _search(index, query, capsys, k=3):
+    capsys.readouterr()
+    assert main(['search', index, query, '-k', str(k), '--json']) == 0
+    return json.loads(capsys.readouterr().out)
+
+def test_build_update_search(tmp_path, capsys):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(6):
+        (docs / f"note{i}.md").write_text(f"note {i} about topic{i} and shared words")
+    (docs / "skip.bin").write_text("not indexed")
+    index = str(tmp_path / "index.leann")
+    
+    assert main(['build', index, '--input', str(docs), '--model', 'fake']) == 0
+    results = _search(index, "topic3", capsys)
+    assert results[0]['file_path'].endswith("note3.md")
+    assert not any(r['file_path'].endswith("skip.bin") for r in results)
+    
+    # Nothing changed: update is a no-op
+    assert main(['update', index]) == 0
+    assert "up to date" in capsys.readouterr().err
+    
+    (docs / "note3.md").write_text("note three now covers gardening and tomatoes instead")
+    assert main(['update', index]) == 0
+    assert "1 input files changed" in capsys.readouterr().err
+    
+    results = _search(index, "gardening tomatoes", capsys)
+    assert results[0]['file_path'].endswith("note3.md")
+    assert "gardening" in results[0]['content']
+    # The old chunk of the changed file is gone; the others are untouched
+    assert not any("topic3" in r['content'] for r in _search(index, "topic3", capsys))
+    paths = sorted(os.path.basename(r['file_path']) for r in _search(index, "note", capsys, k=10))
+    assert paths == [f"note{i}.md" for i in range(6)]
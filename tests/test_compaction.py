@@ -0,0 +1,64 @@
+import threading
+import numpy as np
+from leann import LeannBuilder, LeannSearcher
+from leann_backend_hnsw.hnsw_backend import HNSWBuilder
+from conftest import embed, make_documents
+
+def _builder(n=60):
+    builder = LeannBuilder(embedding_function=embed, compaction_threshold=1.0)
+    documents = make_documents(n)
+    builder.build_index(documents, metadata=[{'n': i} for i in range(n)],
+                        ids=[f"id-{i}" for i in range(n)])
+    return builder, documents
+
+def _live(builder):
+    return {doc_id for doc_id, deleted in zip(builder.ids, builder.deleted) if not deleted}
+
+def test_compact_drops_tombstones(tmp_path):
+    builder, documents = _builder()
+    builder.delete([f"id-{i}" for i in range(0, 60, 2)])
+    builder.compact()
+    assert builder.ids == [f"id-{i}" for i in range(1, 60, 2)]
+    assert builder.tombstone_ratio == 0
+    assert builder.backend_builder.metadata[0] == {'n': 1}
+    
+    path = str(tmp_path / "index.leann")
+    builder.save_index(path)
+    hit = LeannSearcher(path, embedding_function=embed).search(documents[9], top_k=1)[0]
+    assert (hit['id'], hit['n'], hit['content']) == ("id-9", 9, documents[9])
+
+def test_writes_proceed_during_compaction(tmp_path, monkeypatch):
+    builder, documents = _builder()
+    builder.delete([f"id-{i}" for i in range(10)])
+    
+    started, release = threading.Event(), threading.Event()
+    rebuilt = HNSWBuilder.rebuilt
+    def slow_rebuilt(self, *args, **kwargs):
+        started.set()
+        assert release.wait(10)
+        return rebuilt(self, *args, **kwargs)
+    monkeypatch.setattr(HNSWBuilder, 'rebuilt', slow_rebuilt)
+    
+    compaction = threading.Thread(target=builder.compact)
+    compaction.start()
+    assert started.wait(10)
+    # The builder lock is free while the graph is rebuilt
+    builder.upsert(["a document added mid compaction"], ids=["new"], metadata=[{'n': -1}])
+    builder.upsert(["replacement for twenty"], ids=["id-20"], metadata=[{'n': 20}])
+    assert builder.delete(["id-30"]) == 1
+    release.set()
+    compaction.join()
+    
+    live = _live(builder)
+    assert "new" in live and "id-20" in live and "id-30" not in live
+    assert not live & {f"id-{i}" for i in range(10)}
+    assert len(builder.ids) == len(builder.backend_builder.documents) == 50 + 2
+    
+    path = str(tmp_path / "index.leann")
+    builder.save_index(path)
+    searcher = LeannSearcher(path, embedding_function=embed)
+    hit = searcher.search("a document added mid compaction", top_k=1)[0]
+    assert (hit['id'], hit['n']) == ("new", -1)
+    hit = searcher.search("replacement for twenty", top_k=1)[0]
+    assert (hit['id'], hit['content']) == ("id-20", "replacement for twenty")
+    assert "id-30" not in [hit['id'] for hit in searcher.search(documents[30], top_k=5)]
@@ -0,0 +1,70 @@
+import os
+import glob
+import numpy as np
+from leann import LeannBuilder, LeannSearcher
+from leann.container import LeannContainer, is_container_file
+from conftest import embed
+
+def _build(documents, path):
+    builder = LeannBuilder(embedding_function=embed)
+    metadata = [{'file_path': f"/docs/{i % 5}.txt", 'chunk': i} for i in range(len(documents))]
+    builder.build_index(documents, metadata=metadata, ids=[f"id-{i}" for i in range(len(documents))])
+    builder.save_index(path)
+    return builder
+
+def test_round_trip(tmp_path, documents):
+    path = str(tmp_path / "index.leann")
+    _build(documents, path)
+    assert is_container_file(path)
+    assert sorted(os.listdir(tmp_path)) == ["index.leann", "index.leann.tombstones.npy"]
+    
+    container = LeannContainer(path)
+    assert container.verify() == []
+    assert list(container.documents) == documents
+    assert container.metadata[7] == {'file_path': "/docs/2.txt", 'chunk': 7}
+    assert list(container.ids)[:2] == ["id-0", "id-1"]
+    
+    results = LeannSearcher(path, embedding_function=embed).search(documents[7], top_k=3)
+    assert results[0]['content'] == documents[7]
+    assert results[0]['id'] == "id-7" and results[0]['chunk'] == 7
+
+def test_graph_vectors_are_mapped_not_copied(tmp_path, documents):
+    import faiss
+    path = str(tmp_path / "index.leann")
+    _build(documents, path)
+    searcher = LeannSearcher(path, embedding_function=embed)
+    searcher.load_index()
+    backend = searcher.backend_searcher
+    storage = faiss.downcast_index(backend.index.storage)
+    assert not storage.codes.is_owned
+    np.testing.assert_allclose(backend.get_embeddings([4])[0], embed(documents[4]))
+
+def test_corrupt_section_is_reported(tmp_path, documents):
+    path = str(tmp_path / "index.leann")
+    _build(documents, path)
+    container = LeannContainer(path)
+    info = container.table['graph']
+    offset = container._data_start + info['offset'] + info['length'] // 2
+    container.close()
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    assert LeannContainer(path).verify() == ['graph']
+
+def test_legacy_layout_under_leann_name(tmp_path, documents):
+    # Older releases saved "x.leann" as x.leann.faiss / .pkl / .meta.json
+    _build(documents, str(tmp_path / "legacy"))
+    for name in glob.glob(str(tmp_path / "legacy.*")):
+        os.rename(name, name.replace("legacy.", "legacy.leann.", 1))
+    path = str(tmp_path / "legacy.leann")
+    assert not is_container_file(path)
+    
+    assert LeannSearcher(path, embedding_function=embed).search(documents[5], top_k=1)[0]['content'] == documents[5]
+    builder = LeannBuilder.open(path, embedding_function=embed)
+    builder.add_documents(["a brand new document"], ids=["new"])
+    builder.save_index(path)
+    # Still the legacy layout, with the new row readable
+    assert not os.path.exists(path)
+    assert LeannSearcher(path, embedding_function=embed).search("a brand new document", top_k=1)[0]['id'] == "new"
@@ -0,0 +1,41 @@
+import numpy as np
+from leann.context import ContextAssembler, join_overlapping, estimate_tokens
+
+def _result(content, chunk_id=None, path="a.txt"):
+    result = {'content': content, 'file_path': path}
+    if chunk_id is not None:
+        result['chunk_id'] = chunk_id
+    return result
+
+def test_adjacent_chunks_merge_without_overlap():
+    text = "the quick brown fox jumps over the lazy dog and runs far away into the woods"
+    first, second = text[:50], text[30:]
+    assembler = ContextAssembler(max_tokens=1000)
+    context = assembler.assemble([_result(second, 1), _result(first, 0), _result("elsewhere", 5)])
+    assert context.split("\n") == [text, "elsewhere"]
+    
+def test_join_without_overlap_uses_a_space():
+    assert join_overlapping("first part", "second part") == "first part second part"
+    # A short accidental match is not an overlap
+    assert join_overlapping("ends with the", "the start") == "ends with the the start"
+    
+def test_chunks_of_other_files_stay_apart():
+    assembler = ContextAssembler(max_tokens=1000)
+    results = [_result("one", 0, "a.txt"), _result("two", 1, "b.txt")]
+    assert assembler.assemble(results) == "one\ntwo"
+    
+def test_mmr_drops_near_duplicates():
+    assembler = ContextAssembler(max_tokens=1000)
+    results = [_result("best"), _result("copy of best"), _result("different")]
+    embeddings = np.asarray([[1, 0], [1, 0.01], [0.6, 0.8]], dtype='float32')
+    context = assembler.assemble(results, "", np.asarray([1, 0], dtype='float32'), embeddings)
+    assert context.split("\n") == ["best", "different"]
+    
+def test_context_is_trimmed_to_budget():
+    assembler = ContextAssembler(max_tokens=20)
+    long_text = " ".join(f"word{i}" for i in range(100))
+    context = assembler.assemble([_result("short first"), _result(long_text)], query="q")
+    assert estimate_tokens(context) <= 20
+    first, trimmed = context.split("\n")
+    assert first == "short first"
+    assert long_text.startswith(trimmed) and long_text[len(trimmed)] == " "
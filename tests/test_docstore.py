@@ -0,0 +1,44 @@
+import pytest
+from leann.docstore import CompressedStrings, compress_strings, dictionary_encode
+from leann.container import metadata_rows, write_container, LeannContainer
+from conftest import make_documents
+
+CODECS = ['zlib']
+try:
+    import zstandard  # noqa: F401
+    CODECS.append('zstd')
+except ImportError:
+    pass
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_compressed_strings_round_trip(codec):
+    values = make_documents(500) + ["", "ünïcödé ✓ " * 50, None, "tail"]
+    strings = CompressedStrings.from_sections(codec, compress_strings(values, codec, block_bytes=1024))
+    expected = [value or "" for value in values]
+    assert len(strings) == len(values)
+    assert len(strings.block_rows) > 2
+    assert [strings[i] for i in (0, 501, 503, -1)] == [expected[i] for i in (0, 501, 503, -1)]
+    assert list(strings) == expected
+    assert strings[10:13] == expected[10:13]
+    with pytest.raises(IndexError):
+        strings[len(values)]
+        
+def test_dictionary_encode_only_repetitive_columns():
+    codes, distinct = dictionary_encode(["a", "b", "a", None, "a", "b"])
+    assert distinct == ["a", "b"]
+    assert codes.tolist() == [0, 1, 0, -1, 0, 1]
+    assert dictionary_encode(["a", "b", "c"]) is None
+    
+def test_metadata_rows_match_container(tmp_path):
+    metadata = [{'file_path': f"/docs/{i % 3}.txt", 'chunk_id': i, 'note': "x" if i % 2 else None}
+                for i in range(12)]
+    rows = metadata_rows(metadata)
+    path = str(tmp_path / "index.leann")
+    write_container(path, {}, {}, make_documents(12), metadata)
+    container = LeannContainer(path)
+    
+    assert list(rows) == list(container.metadata) == metadata
+    assert rows.columns['file_path'].raw(4) == b'"/docs/1.txt"'
+    assert type(rows.columns['file_path']) is type(container.metadata.columns['file_path'])
+    assert container.documents[5] == make_documents(12)[5]
+    container.close()
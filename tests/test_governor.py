@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import faiss
+import pytest
+import leann.api
+from leann.governor import ResourceGovernor, lower_priority
+
+def _in_thread(fn):
+    out = {}
+    thread = threading.Thread(target=lambda: out.update(value=fn()))
+    thread.start()
+    thread.join()
+    return out['value']
+
+def test_phase_budget_stays_on_build_thread():
+    faiss.omp_set_num_threads(3)
+    governor = ResourceGovernor(index_threads=1, nice=0)
+    entered, release = threading.Event(), threading.Event()
+    seen = {}
+    
+    def build():
+        with governor.phase('index'):
+            seen['build'] = faiss.omp_get_max_threads()
+            entered.set()
+            release.wait()
+            
+    thread = threading.Thread(target=build)
+    thread.start()
+    entered.wait()
+    try:
+        # Queries on other threads keep their thread counts during the phase
+        assert seen['build'] == 1
+        assert faiss.omp_get_max_threads() == 3
+    finally:
+        release.set()
+        thread.join()
+
+def test_embedding_options():
+    governor = ResourceGovernor(embedding_threads=2, nice=5)
+    assert governor.embedding_options() == {'num_workers': 1, 'threads_per_worker': 2,
+                                            'pin_cores': False, 'nice': 5}
+    assert governor.embedding_options({'num_workers': 3})['num_workers'] == 3
+
+def test_governed_builder_embeds_in_worker_process(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(leann.api, 'load_embedding_model',
+                        lambda model, mode, options=None: loaded.append((mode, options)))
+    governor = ResourceGovernor(embedding_threads=2)
+    leann.api.LeannBuilder(governor=governor).load_model()
+    leann.api.LeannBuilder(embedding_mode="ollama", governor=governor).load_model()
+    assert loaded[0][1]['num_workers'] == 1 and loaded[0][1]['threads_per_worker'] == 2
+    # Remote models have no local threads to budget
+    assert loaded[1] == ("ollama", {})
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="per-thread nice is Linux only")
+def test_lower_priority_is_per_thread():
+    main = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+    
+    def lowered():
+        before = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+        assert lower_priority(1)
+        return os.getpriority(os.PRIO_PROCESS, threading.get_native_id()) - before
+        
+    assert _in_thread(lowered) == 1
+    assert os.getpriority(os.PRIO_PROCESS, threading.get_native_id()) == main
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="per-thread nice is Linux only")
+def test_run_lowers_only_the_build_thread():
+    governor = ResourceGovernor(index_threads=1, nice=1)
+    caller = threading.get_native_id()
+    before = os.getpriority(os.PRIO_PROCESS, caller)
+    
+    def build():
+        native = threading.get_native_id()
+        return native, os.getpriority(os.PRIO_PROCESS, native), faiss.omp_get_max_threads()
+        
+    native, priority, threads = governor.run('index', build)
+    assert native != caller
+    assert priority == before + 1 and threads == 1
+    # The calling thread may go on to serve queries at full priority
+    assert os.getpriority(os.PRIO_PROCESS, caller) == before
+
+def test_run_passes_exceptions_through():
+    governor = ResourceGovernor(nice=0)
+    with pytest.raises(ValueError, match="boom"):
+        governor.run('index', lambda: (_ for _ in ()).throw(ValueError("boom")))
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="per-thread nice is Linux only")
+def test_governed_build_keeps_caller_priority():
+    from conftest import embed, make_documents
+    caller = threading.get_native_id()
+    before = os.getpriority(os.PRIO_PROCESS, caller)
+    builder = leann.api.LeannBuilder(embedding_function=embed, governor=ResourceGovernor(nice=1))
+    builder.build_index(make_documents(20))
+    builder.add_documents(["one more document"], ids=["extra"])
+    assert len(builder.ids) == 21
+    assert os.getpriority(os.PRIO_PROCESS, caller) == before
@@ -0,0 +1,88 @@
+import urllib.request
+import urllib.error
+import pytest
+from leann.metrics import MetricsRegistry, Histogram, serve_metrics
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == float('inf')
+
+def test_registry_records_and_notifies_hooks():
+    registry = MetricsRegistry()
+    seen = []
+    registry.add_hook(lambda kind, name, value: seen.append((kind, name, value)))
+    # A failing exporter must not break recording
+    registry.add_hook(lambda kind, name, value: 1 / 0)
+    registry.inc('leann_queries_total')
+    registry.inc('leann_queries_total', 2)
+    registry.set('leann_build_progress', 0.5)
+    with registry.timer('leann_ann_search_seconds'):
+        pass
+        
+    snapshot = registry.snapshot()
+    assert snapshot['counters'] == {'leann_queries_total': 3}
+    assert snapshot['gauges'] == {'leann_build_progress': 0.5}
+    assert snapshot['histograms']['leann_ann_search_seconds']['count'] == 1
+    assert [kind for kind, _, _ in seen] == ['counter', 'counter', 'gauge', 'histogram']
+    
+    registry.reset()
+    assert registry.snapshot() == {'histograms': {}, 'counters': {}, 'gauges': {}}
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.inc('leann_queries_total', 2)
+    registry.set('custom_gauge', 7)
+    registry.observe('leann_ann_search_seconds', 0.003)
+    registry.observe('leann_ann_search_seconds', 0.2)
+    lines = registry.render_prometheus().splitlines()
+    
+    assert "# HELP leann_queries_total Searches served" in lines
+    assert "# TYPE leann_queries_total counter" in lines
+    assert "leann_queries_total 2" in lines
+    # Unknown names get a type but no help line
+    assert "# TYPE custom_gauge gauge" in lines and not any(l.startswith("# HELP custom_gauge") for l in lines)
+    assert "custom_gauge 7" in lines
+    # Buckets are cumulative and end with +Inf
+    assert 'leann_ann_search_seconds_bucket{le="0.0025"} 0' in lines
+    assert 'leann_ann_search_seconds_bucket{le="0.005"} 1' in lines
+    assert 'leann_ann_search_seconds_bucket{le="0.25"} 2' in lines
+    assert 'leann_ann_search_seconds_bucket{le="+Inf"} 2' in lines
+    assert "leann_ann_search_seconds_count 2" in lines
+
+def test_serve_metrics():
+    registry = MetricsRegistry()
+    registry.inc('leann_queries_total')
+    server = serve_metrics(port=0, host='127.0.0.1', registry=registry)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert "leann_queries_total 1" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base}/other")
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_searcher_records_query_metrics(tmp_path):
+    from conftest import embed, make_documents
+    from leann import LeannBuilder, LeannSearcher
+    registry = MetricsRegistry()
+    builder = LeannBuilder(embedding_function=embed, metrics=registry)
+    builder.build_index(make_documents(30))
+    builder.save_index(str(tmp_path / "index.leann"))
+    assert registry.snapshot()['counters']['leann_build_documents_total'] == 30
+    
+    searcher = LeannSearcher(str(tmp_path / "index.leann"), embedding_function=embed, metrics=registry)
+    searcher.search("doc 3", top_k=3)
+    snapshot = registry.snapshot()
+    assert snapshot['counters']['leann_queries_total'] == 1
+    assert snapshot['histograms']['leann_query_embedding_seconds']['count'] == 1
+    assert snapshot['histograms']['leann_ann_search_seconds']['count'] == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('onnxruntime')
+pytest.importorskip('sentence_transformers')
+
+from leann.embeddings import OnnxEmbedder
+
+WORDS = "the a search index file files document documents query fast slow local vector graph".split()
+SENTENCES = ["the search index", "a fast local vector graph", "query the documents",
+             "slow files", "index the graph of local files fast"]
+
+def _tiny_model(path, pooling: str) -> str:
+    """Random two-layer BERT with a word-level tokenizer, saved as a sentence-transformers model"""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import BertConfig, BertModel, PreTrainedTokenizerFast
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Transformer, Pooling, Normalize
+    
+    vocab = {token: i for i, token in enumerate(["[PAD]", "[UNK]", "[CLS]", "[SEP]"] + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token="[PAD]", unk_token="[UNK]",
+                            cls_token="[CLS]", sep_token="[SEP]").save_pretrained(str(path / "hf"))
+    torch.manual_seed(0)
+    BertModel(BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                         num_attention_heads=2, intermediate_size=64)).save_pretrained(str(path / "hf"))
+                         
+    transformer = Transformer(str(path / "hf"), max_seq_length=32)
+    pooled = Pooling(transformer.get_word_embedding_dimension(), pooling_mode=pooling)
+    model_dir = str(path / f"st-{pooling}")
+    SentenceTransformer(modules=[transformer, pooled, Normalize()], device='cpu').save(model_dir)
+    return model_dir
+
+@pytest.mark.parametrize('pooling', ['mean', 'cls', 'max'])
+def test_matches_sentence_transformers(tmp_path, pooling):
+    from sentence_transformers import SentenceTransformer
+    model_dir = _tiny_model(tmp_path, pooling)
+    expected = SentenceTransformer(model_dir, device='cpu').encode(SENTENCES, convert_to_numpy=True)
+    
+    embedder = OnnxEmbedder(model_dir, num_threads=1, cache_dir=str(tmp_path / "onnx"), batch_size=2)
+    vectors = embedder.encode(SENTENCES)
+    assert embedder.config['pooling'] == pooling and embedder.config['normalize']
+    assert vectors.shape == expected.shape == (len(SENTENCES), 32)
+    np.testing.assert_allclose(vectors, expected, atol=1e-4)
+    assert embedder.encode([]).shape == (0, 32)
+
+def test_int8_stays_close(tmp_path):
+    model_dir = _tiny_model(tmp_path, 'mean')
+    full = OnnxEmbedder(model_dir, num_threads=1, cache_dir=str(tmp_path / "onnx")).encode(SENTENCES)
+    quantized = OnnxEmbedder(model_dir, quantize=True, num_threads=1, cache_dir=str(tmp_path / "onnx"))
+    vectors = quantized.encode(SENTENCES)
+    assert quantized.model_path.name == 'model.int8.onnx' and quantized.model_path.exists()
+    # Cosine similarity to the float model stays high
+    assert (np.sum(vectors * full, axis=1) > 0.95).all()
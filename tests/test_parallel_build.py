@@ -0,0 +1,62 @@
+import numpy as np
+import faiss
+import leann_backend_hnsw.hnsw_backend
+from leann_backend_hnsw.hnsw_backend import HNSWBuilder
+from leann_backend_hnsw.parallel_build import build_parallel, partition
+
+def _clustered(n: int, clusters: int = 8, dimension: int = 16, seed: int = 0) -> np.ndarray:
+    """Overlapping Gaussian clusters, so many vectors lie near a shard boundary"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    points = centers[rng.integers(clusters, size=n)] + rng.normal(size=(n, dimension))
+    return points.astype('float32')
+
+def _recall(index, vectors: np.ndarray, queries: np.ndarray, k: int = 10) -> float:
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    index.hnsw.efSearch = 64
+    _, found = index.search(queries, k)
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)]))
+
+def test_partition_marks_boundary_vectors():
+    vectors = _clustered(2000)
+    assignment, boundary = partition(vectors, 4)
+    assert assignment.shape == boundary.shape == (2000,)
+    assert set(np.unique(assignment)) <= set(range(4))
+    assert 0 < boundary.sum() < len(vectors)
+
+def test_recall_matches_serial_build():
+    data = _clustered(4200)
+    vectors, queries = data[:4000], data[4000:]
+    serial = faiss.IndexHNSWFlat(vectors.shape[1], 16)
+    serial.hnsw.efConstruction = 64
+    serial.add(vectors)
+    
+    parallel = build_parallel(vectors, m=16, ef_construction=64, num_workers=2, num_shards=4)
+    assert parallel.ntotal == len(vectors)
+    # Every vector is reachable as its own nearest neighbour
+    _, own = parallel.search(vectors[::40], 1)
+    assert (own[:, 0] == np.arange(0, len(vectors), 40)).mean() >= 0.99
+    assert _recall(parallel, vectors, queries) >= _recall(serial, vectors, queries) - 0.02
+
+def test_builder_uses_parallel_build_above_threshold(monkeypatch):
+    calls = []
+    
+    def counted(*args):
+        calls.append(args[1:])
+        return build_parallel(*args)
+        
+    monkeypatch.setattr(leann_backend_hnsw.hnsw_backend, 'build_parallel', counted)
+    data = _clustered(1600)
+    vectors, queries = data[:1500], data[1500:]
+    builder = HNSWBuilder(dimension=16, m=16, ef_construction=64, build_workers=2,
+                          min_parallel_rows=1000)
+    builder.build_index(vectors, [str(i) for i in range(len(vectors))])
+    assert calls == [(16, 64, 2, 2, 0.1)]
+    assert builder.index.ntotal == len(vectors)
+    assert _recall(builder.index, vectors, queries) >= 0.95
+    
+    # Smaller builds stay serial
+    HNSWBuilder(dimension=16, build_workers=2, min_parallel_rows=1000).build_index(vectors[:500], ["x"] * 500)
+    assert len(calls) == 1
@@ -0,0 +1,56 @@
+import queue
+import threading
+import types
+import numpy as np
+import pytest
+import leann.embeddings
+import leann.parallel_embeddings as parallel
+from leann.parallel_embeddings import ProcessPoolEmbedder
+
+class FakeModel:
+    def encode(self, texts, batch_size=None):
+        if any('bad' in text for text in texts):
+            raise ValueError("cannot embed")
+        # "text <n>" embeds to [n, 1]
+        return np.array([[float(text.rsplit(' ', 1)[-1]) if text[-1].isdigit() else 0.0, 1.0]
+                         for text in texts], dtype='float32')
+
+class ThreadContext:
+    """Stands in for the spawn context: workers run as threads in this process"""
+    Queue = queue.Queue
+    
+    @staticmethod
+    def Process(target, name, daemon, args):
+        return threading.Thread(target=target, name=name, daemon=daemon, args=args)
+
+@pytest.fixture
+def thread_workers(monkeypatch):
+    monkeypatch.setattr(parallel, 'mp', types.SimpleNamespace(get_context=lambda method: ThreadContext))
+    monkeypatch.setattr(leann.embeddings, 'load_embedding_model',
+                        lambda model, mode, options=None: FakeModel())
+
+def test_failed_call_does_not_leak_into_next(thread_workers):
+    embedder = ProcessPoolEmbedder("m", num_workers=2, threads_per_worker=1, pin_cores=False,
+                                   shard_size=3).start()
+    try:
+        texts = [f"t {i}" for i in range(30)]
+        with pytest.raises(RuntimeError, match="shard 0"):
+            embedder.encode(["bad 0"] + texts[1:])
+        # Every message of the failed call was consumed or dropped
+        assert embedder._results.empty() and embedder._tasks.empty()
+        vectors = embedder.encode(texts)
+        np.testing.assert_array_equal(vectors[:, 0], np.arange(30))
+    finally:
+        embedder.close()
+
+def test_onnx_exported_once_before_workers(thread_workers, monkeypatch):
+    prepared = []
+    monkeypatch.setattr(leann.embeddings.OnnxEmbedder, 'prepare',
+                        lambda self: prepared.append(self.model_name) or self)
+    embedder = ProcessPoolEmbedder("m", "onnx", num_workers=3, threads_per_worker=1,
+                                   pin_cores=False).start()
+    try:
+        assert prepared == ["m"]
+        assert embedder.encode(["x 5"])[0, 0] == 5
+    finally:
+        embedder.close()
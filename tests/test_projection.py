@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from leann import LeannBuilder, LeannSearcher
+from leann.projection import Projection
+from conftest import make_documents
+
+def _low_rank(n: int, rank: int = 8, dimension: int = 64, seed: int = 0) -> np.ndarray:
+    """Vectors near a rank-dimensional subspace, offset from the origin"""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(rank, dimension))
+    points = rng.normal(size=(n, rank)) @ basis + 3.0
+    return (points + rng.normal(scale=0.01, size=points.shape)).astype('float32')
+
+def _neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=-1)
+    return np.argsort(distances, axis=1)[:, :k]
+
+def test_pca_keeps_the_subspace():
+    vectors = _low_rank(500)
+    projection = Projection.fit(vectors, 8)
+    projected = projection.transform(vectors)
+    assert projected.shape == (500, 8) and projected.dtype == np.float32
+    np.testing.assert_allclose(projection.mean, vectors.mean(axis=0), rtol=1e-5)
+    # Orthonormal components, and the centred data is reconstructed from them
+    np.testing.assert_allclose(projection.components @ projection.components.T, np.eye(8), atol=1e-5)
+    reconstructed = projected @ projection.components + projection.mean
+    assert np.abs(reconstructed - vectors).max() < 0.1
+    # A single vector projects like a row of the batch
+    np.testing.assert_allclose(projection.transform(vectors[3]), projected[3], atol=1e-5)
+
+def test_pca_preserves_neighbours():
+    vectors = _low_rank(1000)
+    queries = vectors[:20] + np.random.default_rng(1).normal(scale=0.05, size=(20, 64)).astype('float32')
+    projection = Projection.fit(vectors, 8)
+    exact = _neighbours(vectors, queries, 10)
+    reduced = _neighbours(projection.transform(vectors), projection.transform(queries), 10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(exact, reduced)])
+    assert recall >= 0.9
+
+def test_truncate_normalizes():
+    vectors = np.arange(12, dtype='float32').reshape(2, 6) + 1
+    projection = Projection.fit(vectors, 3, method="truncate")
+    projected = projection.transform(vectors)
+    np.testing.assert_allclose(np.linalg.norm(projected, axis=1), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(projected[0], vectors[0, :3] / np.linalg.norm(vectors[0, :3]), rtol=1e-6)
+    assert projection.mean is None and projection.get_sections() == {}
+
+def test_rejects_bad_dimensions():
+    vectors = _low_rank(5)
+    with pytest.raises(ValueError):
+        Projection.fit(vectors, 8)
+    with pytest.raises(ValueError):
+        Projection.fit(vectors, 65, method="truncate")
+    with pytest.raises(ValueError):
+        Projection.fit(vectors, 2, method="random")
+
+def test_applies_only_to_full_size_embeddings():
+    projection = Projection.fit(_low_rank(100), 8)
+    assert projection.applies_to(np.zeros(64))
+    assert projection.applies_to(np.zeros((3, 64)))
+    assert not projection.applies_to(np.zeros(8))
+
+@pytest.mark.parametrize('method', ['pca', 'truncate'])
+def test_save_and_load_npz(tmp_path, method):
+    vectors = _low_rank(100)
+    projection = Projection.fit(vectors, 8, method=method)
+    path = str(tmp_path / "index")
+    projection.save(path)
+    loaded = Projection.load(path)
+    assert loaded.describe() == projection.describe()
+    np.testing.assert_array_equal(loaded.transform(vectors), projection.transform(vectors))
+    assert Projection.load(str(tmp_path / "missing")) is None
+
+def test_sections_round_trip():
+    vectors = _low_rank(100)
+    projection = Projection.fit(vectors, 8)
+    loaded = Projection.from_sections(projection.describe(), projection.get_sections())
+    np.testing.assert_array_equal(loaded.transform(vectors), projection.transform(vectors))
+
+@pytest.mark.parametrize('name', ["index.leann", "index"])
+def test_reduced_index_round_trip(tmp_path, name):
+    documents = make_documents(200)
+    vectors = dict(zip(documents, _low_rank(len(documents))))
+    embed = lambda text: vectors.get(text, vectors[documents[0]])
+    path = str(tmp_path / name)
+    builder = LeannBuilder(embedding_function=embed, reduce_dimensions=8)
+    builder.build_index(documents)
+    builder.save_index(path)
+    
+    searcher = LeannSearcher(path, embedding_function=embed)
+    searcher.load_index()
+    assert searcher.projection.describe() == builder.projection.describe()
+    hits = sum(searcher.search(documents[i], top_k=1)[0]['content'] == documents[i] for i in range(0, 200, 10))
+    assert hits >= 18
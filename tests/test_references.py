@@ -0,0 +1,82 @@
+import os
+import pytest
+from leann import LeannBuilder, LeannSearcher
+from leann.ingest import load_directories
+from leann.references import (chunk_spans, content_hash, read_reference, is_stale,
+                              ReferencedDocuments)
+from conftest import embed
+
+def test_chunk_spans_cut_at_whitespace():
+    data = b"  alpha beta\tgamma\n\ndelta epsilon   " + b" " * 20
+    spans = chunk_spans(data, max_chunk_size=12)
+    chunks = [data[start:end] for start, end in spans]
+    assert all(0 < len(chunk) <= 12 for chunk in chunks)
+    assert all(chunk == chunk.strip() for chunk in chunks)
+    # Only whitespace is dropped between chunks
+    assert b" ".join(chunks).split() == data.split()
+    assert chunk_spans(b" \n\t ") == []
+
+def test_chunk_spans_keep_utf8_sequences_whole():
+    data = "é" * 10
+    spans = chunk_spans(data.encode('utf-8'), max_chunk_size=5)
+    text = [data.encode('utf-8')[start:end].decode('utf-8') for start, end in spans]
+    assert "".join(text) == data
+    assert all(len(chunk.encode('utf-8')) <= 5 for chunk in text)
+
+def test_read_reference_and_staleness(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"first chunk second chunk")
+    meta = {'file_path': str(path), 'byte_start': 6, 'byte_end': 11, 'content_hash': content_hash(b"chunk")}
+    assert read_reference(meta) == (b"chunk", False)
+    
+    path.write_bytes(b"first CHUNK second chunk")
+    assert read_reference(meta) == (b"CHUNK", True)
+    # Past the end of a truncated file, or the file is gone
+    path.write_bytes(b"first")
+    assert read_reference(meta) == (None, True)
+    os.remove(path)
+    assert is_stale(meta)
+    assert read_reference({'file_path': str(path)}) == (None, True)
+
+def test_referenced_documents(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"one two three")
+    metadata = [{'file_path': str(path), 'byte_start': s, 'byte_end': e, 'content_hash': content_hash(b"x")}
+                for s, e in chunk_spans(b"one two three", max_chunk_size=5)]
+    documents = ReferencedDocuments(metadata)
+    assert len(documents) == 3
+    assert list(documents) == ["one", "two", "three"]
+    assert documents[1:] == ["two", "three"]
+    assert documents.is_stale(0)
+    
+    metadata[0]['file_path'] = str(tmp_path / "missing.txt")
+    assert documents[0] == ''
+
+def test_reference_only_index(tmp_path):
+    source = tmp_path / "docs"
+    source.mkdir()
+    text = " ".join(f"word{i}" for i in range(300))
+    (source / "long.txt").write_text(text)
+    documents, metadata = load_directories([str(source)], max_chunk_size=200, reference_only=True)
+    assert len(documents) > 1
+    assert all(set(meta) >= {'file_path', 'byte_start', 'byte_end', 'content_hash'} for meta in metadata)
+    
+    path = str(tmp_path / "index.leann")
+    builder = LeannBuilder(embedding_function=embed, reference_only=True)
+    builder.build_index(documents, metadata)
+    builder.save_index(path)
+    # No chunk text in the index itself
+    assert text[:200].encode() not in open(path, 'rb').read()
+    
+    searcher = LeannSearcher(path, embedding_function=embed)
+    hit = searcher.search(documents[2], top_k=1)[0]
+    assert hit['content'] == documents[2] and not hit['stale']
+    
+    (source / "long.txt").write_text(text.upper())
+    hit = searcher.search(documents[2], top_k=1)[0]
+    assert hit['stale'] and hit['content'] == documents[2].upper()
+
+def test_reference_only_needs_offsets():
+    builder = LeannBuilder(embedding_function=embed, reference_only=True)
+    with pytest.raises(ValueError):
+        builder.build_index(["text"], [{'file_path': "a.txt"}])
@@ -0,0 +1,105 @@
+import os
+import shutil
+import leann.api
+import leann.versions
+from leann import LeannBuilder, LeannSearcher
+from leann.versions import IndexStore
+from conftest import embed, make_documents
+
+SUFFIXES = ('.faiss', '.pkl', '.ids.json', '.meta.json', '.tombstones.npy')
+
+def _save(path, n, prefix="doc"):
+    builder = LeannBuilder(embedding_function=embed)
+    builder.build_index(make_documents(n, prefix))
+    builder.save_index(path)
+
+def _copy(src, dst, suffixes):
+    for suffix in suffixes:
+        if os.path.exists(src + suffix):
+            shutil.copy(src + suffix, dst + suffix)
+
+def test_half_replaced_files_are_not_loaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(leann.api.time, 'sleep', lambda seconds: None)
+    path, staged = str(tmp_path / "idx"), str(tmp_path / "staged")
+    _save(path, 60)
+    _save(staged, 80, "new")
+    searcher = LeannSearcher(path, embedding_function=embed, reload_interval=0)
+    searcher.load_index()
+    
+    # A writer has replaced the graph but not yet the documents
+    _copy(staged, path, ('.faiss', '.ids.json', '.meta.json'))
+    searcher.refresh(wait=True)
+    assert len(searcher.backend_searcher.documents) == 60
+    
+    _copy(staged, path, ('.pkl', '.tombstones.npy'))
+    searcher.refresh(wait=True)
+    assert len(searcher.backend_searcher.documents) == 80
+    assert searcher.search("new 7 word0", top_k=1)[0]['content'].startswith("new 7 ")
+
+def test_load_retried_when_files_change_underneath(tmp_path, monkeypatch):
+    path, staged = str(tmp_path / "idx"), str(tmp_path / "staged")
+    _save(path, 60)
+    _save(staged, 80, "new")
+    searcher = LeannSearcher(path, embedding_function=embed, reload_interval=0)
+    searcher.load_index()
+    _save(path, 70, "mid")
+    
+    opened = []
+    
+    class RacingIndex(leann.api.LoadedIndex):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            opened.append(len(self.backend.documents))
+            if len(opened) == 1:
+                # A full rewrite lands while the first load is finishing
+                _copy(staged, path, SUFFIXES)
+                
+    monkeypatch.setattr(leann.api, 'LoadedIndex', RacingIndex)
+    searcher.refresh(wait=True)
+    assert opened == [70, 80]
+    assert len(searcher.backend_searcher.documents) == 80
+
+def _save_version(root, n, prefix="doc"):
+    builder = LeannBuilder(embedding_function=embed)
+    builder.build_index(make_documents(n, prefix))
+    return builder.save_version(root)
+
+def test_searcher_swaps_to_published_version(tmp_path):
+    root = str(tmp_path / "store")
+    first = _save_version(root, 60)
+    searcher = LeannSearcher(root, embedding_function=embed, reload_interval=0)
+    searcher.load_index()
+    assert searcher.index_version()[0] == first
+    
+    second = _save_version(root, 80, "new")
+    assert searcher.refresh(wait=True)
+    assert searcher.index_version()[0] == second
+    assert len(searcher.backend_searcher.documents) == 80
+    assert searcher.search("new 7 word0", top_k=1)[0]['content'].startswith("new 7 ")
+    # Already current: nothing to load
+    assert not searcher.refresh(wait=True)
+
+def test_prune_reports_and_retries_undeletable_versions(tmp_path, monkeypatch, caplog):
+    root = str(tmp_path / "store")
+    for _ in range(3):
+        builder = LeannBuilder(embedding_function=embed)
+        builder.build_index(make_documents(20))
+        store = IndexStore(root)
+        version, path = store.create_version()
+        builder.save_index(path)
+        store.publish(version)
+    versions = store.versions()
+    
+    rmtree = shutil.rmtree
+    def locked(path, *args, **kwargs):
+        if path.endswith(versions[0]):
+            raise PermissionError("file in use")
+        rmtree(path, *args, **kwargs)
+    monkeypatch.setattr(leann.versions.shutil, 'rmtree', locked)
+    assert store.prune(keep=1) == [versions[1]]
+    assert "Could not remove index version" in caplog.text
+    assert store.versions() == [versions[0], versions[2]]
+    
+    monkeypatch.setattr(leann.versions.shutil, 'rmtree', rmtree)
+    assert store.prune(keep=1) == [versions[0]]
+    assert store.versions() == [versions[2]]
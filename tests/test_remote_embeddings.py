@@ -0,0 +1,104 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+from leann.remote_embeddings import RemoteEmbedder, OllamaEmbedder, EmbeddingError, normalize_base_url
+
+class StubOllama(BaseHTTPRequestHandler):
+    """/api/embed that rejects large batches and fails the first few requests"""
+    
+    max_inputs = 4
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.batches.append(len(body['input']))
+        if self.server.failures:
+            status, headers = self.server.failures.pop(0)
+            return self._reply(status, {'error': 'try again'}, headers)
+        if len(body['input']) > self.max_inputs:
+            return self._reply(413, {'error': 'batch too large'})
+        # Vector encodes the input so order can be checked
+        embeddings = [[float(text.split()[-1]), 1.0] for text in body['input']]
+        self._reply(200, {'embeddings': embeddings})
+        
+    def _reply(self, status, data, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllama)
+    server.batches = []
+    server.failures = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _embedder(server, **kwargs):
+    kwargs.setdefault('backoff_base', 0.01)
+    return OllamaEmbedder("stub", base_url=f"127.0.0.1:{server.server_address[1]}", **kwargs)
+
+def test_batches_are_split_and_ordered(server):
+    embedder = _embedder(server, batch_size=6, max_concurrency=2)
+    texts = [f"text {i}" for i in range(14)]
+    vectors = embedder.encode(texts)
+    embedder.close()
+    assert vectors.shape == (14, 2)
+    np.testing.assert_array_equal(vectors[:, 0], np.arange(14))
+    # 6, 6, 2 sent; each 6 rejected and halved to 3 + 3
+    assert sorted(server.batches) == [2, 3, 3, 3, 3, 6, 6]
+    assert embedder.stats['splits'] == 2
+
+def test_retries_with_backoff(server):
+    server.failures = [(503, {}), (429, {'Retry-After': '0.05'})]
+    embedder = _embedder(server)
+    vectors = embedder.encode(["a 1", "b 2"])
+    embedder.close()
+    np.testing.assert_array_equal(vectors[:, 0], [1, 2])
+    assert embedder.stats['retries'] == 2
+    assert embedder.stats['rate_limited'] == 1
+    assert server.batches == [2, 2, 2]
+
+def test_gives_up_after_max_retries(server):
+    server.failures = [(500, {})] * 3
+    embedder = _embedder(server, max_retries=2)
+    with pytest.raises(EmbeddingError):
+        embedder.encode(["a 1"])
+    embedder.close()
+    assert len(server.batches) == 3
+
+def test_empty_input_keeps_dimension(server):
+    embedder = _embedder(server)
+    assert embedder.encode([]).shape == (0, 0)
+    embedder.encode(["a 1"])
+    assert embedder.encode([]).shape == (0, 2)
+    embedder.close()
+
+def test_providers_must_implement_request_and_parse():
+    class Incomplete(RemoteEmbedder):
+        def _request(self, texts):
+            return "http://localhost", {}
+            
+    with pytest.raises(TypeError):
+        Incomplete("m")
+
+def test_ollama_host_read_at_construction(monkeypatch):
+    monkeypatch.setenv('OLLAMA_HOST', '0.0.0.0:11500')
+    assert OllamaEmbedder("m").base_url == 'http://0.0.0.0:11500'
+    monkeypatch.setenv('OLLAMA_HOST', 'gpu-box')
+    assert OllamaEmbedder("m").base_url == 'http://gpu-box:11434'
+    monkeypatch.delenv('OLLAMA_HOST')
+    assert OllamaEmbedder("m").base_url == 'http://localhost:11434'
+    assert normalize_base_url('https://example.com/v1/') == 'https://example.com/v1'
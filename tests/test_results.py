@@ -0,0 +1,42 @@
+import leann.results
+from leann import LeannBuilder, LeannSearcher
+from leann.references import chunk_spans, content_hash
+from conftest import embed
+
+def _reference_index(tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_bytes(b"alpha beta gamma\n\ndelta epsilon zeta\n\neta theta iota\n")
+    data = source.read_bytes()
+    spans = chunk_spans(data, max_chunk_size=20)
+    metadata = [{'file_path': str(source), 'byte_start': start, 'byte_end': end,
+                 'content_hash': content_hash(data[start:end])} for start, end in spans]
+    chunks = [data[start:end].decode() for start, end in spans]
+    builder = LeannBuilder(embedding_function=embed, reference_only=True)
+    builder.build_index(chunks, metadata)
+    path = str(tmp_path / "index.leann")
+    builder.save_index(path)
+    return source, chunks, LeannSearcher(path, embedding_function=embed)
+
+def test_reference_hits_read_once(tmp_path, monkeypatch):
+    source, chunks, searcher = _reference_index(tmp_path)
+    reads = []
+    read_reference = leann.results.read_reference
+    def counting(metadata):
+        reads.append(metadata['byte_start'])
+        return read_reference(metadata)
+    monkeypatch.setattr(leann.results, 'read_reference', counting)
+    
+    results = searcher.search(chunks[1], top_k=2)
+    hit = results[0]
+    assert (hit['content'], hit['stale']) == (chunks[1], False)
+    assert results.content(0) == chunks[1]
+    assert results.field('stale') == [False, False]
+    assert len(reads) == len(set(reads)) == 2
+
+def test_reference_hits_flag_changed_files(tmp_path):
+    source, chunks, searcher = _reference_index(tmp_path)
+    source.write_bytes(source.read_bytes().replace(b"delta", b"DELTA"))
+    results = searcher.search(chunks[1], top_k=len(chunks))
+    stale = dict(zip(results.contents(), results.field('stale')))
+    assert stale[chunks[0]] is False
+    assert stale[chunks[1].replace("delta", "DELTA")] is True
@@ -0,0 +1,26 @@
+import numpy as np
+from leann import LeannBuilder, LeannSearcher
+from conftest import embed
+
+class RecordingModel:
+    def encode(self, texts):
+        return np.stack([embed(text) for text in texts])
+
+def test_model_defaults_to_index_meta(tmp_path, documents, monkeypatch):
+    import leann.api
+    path = str(tmp_path / "index.leann")
+    builder = LeannBuilder(embedding_function=embed, embedding_model="nomic-embed-text", embedding_mode="ollama")
+    builder.build_index(documents)
+    builder.save_index(path)
+    
+    loaded = []
+    monkeypatch.setattr(leann.api, 'load_embedding_model',
+                        lambda model, mode, options=None: loaded.append((model, mode)) or RecordingModel())
+    searcher = LeannSearcher(path, reload_interval=0)
+    assert len(searcher.search(documents[3], top_k=3)) == 3
+    assert loaded == [("nomic-embed-text", "ollama")]
+    
+    # An explicit model still wins
+    searcher = LeannSearcher(path, embedding_model="other-model", reload_interval=0)
+    searcher.search(documents[3], top_k=3)
+    assert loaded[-1] == ("other-model", "ollama")
@@ -0,0 +1,150 @@
+import os
+import pytest
+from leann import LeannSearcher, SegmentedIndex
+from leann.segments import SEGMENTS_DIR, read_segments, segment_path
+from conftest import embed, make_documents
+
+def _index(root, **kwargs):
+    kwargs.setdefault('embedding_function', embed)
+    kwargs.setdefault('background_merge', False)
+    kwargs.setdefault('min_segment_rows', 10)
+    return SegmentedIndex(root, **kwargs)
+
+def _files(root):
+    return sorted(os.listdir(os.path.join(root, SEGMENTS_DIR)))
+
+def test_segments_round_trip(tmp_path):
+    root = str(tmp_path / "segmented")
+    index = _index(root, merge_factor=10)
+    first, second = make_documents(20, "first"), make_documents(20, "second")
+    index.add_documents(first, ids=[f"a-{i}" for i in range(20)])
+    index.add_documents(second, ids=[f"b-{i}" for i in range(20)])
+    assert index.delete(["a-3", "b-4"]) == 2
+    
+    reopened = _index(root, merge_factor=10)
+    assert len(reopened.segments) == 2
+    expected = {f"a-{i}" for i in range(20)} | {f"b-{i}" for i in range(20)}
+    assert set(reopened.ids) == expected - {"a-3", "b-4"}
+    searcher = LeannSearcher(root, embedding_function=embed)
+    hit = searcher.search(second[7], top_k=1)[0]
+    assert (hit['id'], hit['content']) == ("b-7", second[7])
+    assert all(hit['id'] != "a-3" for hit in searcher.search(first[3], top_k=5))
+
+def test_merge_keeps_live_rows(tmp_path):
+    root = str(tmp_path / "segmented")
+    index = _index(root, merge_factor=2)
+    batches = [make_documents(10, f"batch{b}") for b in range(2)]
+    index.add_documents(batches[0], ids=[f"0-{i}" for i in range(10)])
+    index.delete(["0-1"])
+    index.add_documents(batches[1], ids=[f"1-{i}" for i in range(10)])
+    
+    assert len(read_segments(root)['segments']) == 1
+    live = read_segments(root)['segments'][0]['name']
+    assert all(file.startswith(live) for file in _files(root))
+    hit = LeannSearcher(root, embedding_function=embed).search(batches[0][5], top_k=1)[0]
+    assert (hit['id'], hit['content']) == ("0-5", batches[0][5])
+    assert "0-1" not in index.ids
+
+def test_failed_removal_is_retried(tmp_path, monkeypatch):
+    root = str(tmp_path / "segmented")
+    index = _index(root, merge_factor=2)
+    index.add_documents(make_documents(10, "one"), ids=[f"one-{i}" for i in range(10)])
+    old = segment_path(root, index.segments[0]['name'])
+    
+    remove = os.remove
+    def locked(path):
+        # As on Windows while a searcher maps the file
+        if path == old:
+            raise PermissionError(path)
+        remove(path)
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'remove', locked)
+        index.add_documents(make_documents(10, "two"), ids=[f"two-{i}" for i in range(10)])
+    assert len(index.segments) == 1
+    assert os.path.exists(old)
+    
+    index.delete(["one-0"])
+    assert not os.path.exists(old)
+
+def test_leftover_files_removed_on_reopen(tmp_path):
+    root = str(tmp_path / "segmented")
+    index = _index(root, merge_factor=10)
+    index.add_documents(make_documents(10), ids=[f"id-{i}" for i in range(10)])
+    live = _files(root)
+    # A segment written but never published before a crash
+    orphan = segment_path(root, "seg-99999999")
+    with open(orphan, 'wb') as f:
+        f.write(b"partial")
+        
+    reopened = _index(root, merge_factor=10)
+    reopened.delete(["id-0"])
+    assert _files(root) == live
+
+def test_open_retried_when_a_merge_retires_a_segment(tmp_path, monkeypatch):
+    import leann.api
+    import leann.segments
+    from leann import LeannSearcher
+    monkeypatch.setattr(leann.api.time, 'sleep', lambda seconds: None)
+    root = str(tmp_path / "segmented")
+    index = _index(root, merge_factor=10)
+    index.add_documents(make_documents(10, "one"), ids=[f"one-{i}" for i in range(10)])
+    index.add_documents(make_documents(10, "two"), ids=[f"two-{i}" for i in range(10)])
+    
+    opened = []
+    
+    class RacingSegment(leann.segments.LoadedIndex):
+        def __init__(self, *args, **kwargs):
+            opened.append(args[0])
+            if len(opened) == 2:
+                # The segment was merged away after the manifest was read
+                raise FileNotFoundError(args[0])
+            super().__init__(*args, **kwargs)
+            
+    monkeypatch.setattr(leann.segments, 'LoadedIndex', RacingSegment)
+    searcher = LeannSearcher(root, embedding_function=embed, reload_interval=0)
+    assert searcher.search("one 3 word3", top_k=1)[0]['id'] == "one-3"
+    assert len(opened) == 4
+
+def test_conversion_to_segments_in_place_is_picked_up(tmp_path):
+    from leann import LeannBuilder, LeannSearcher
+    path = str(tmp_path / "idx")
+    builder = LeannBuilder(embedding_function=embed)
+    builder.build_index(make_documents(20, "plain"))
+    builder.save_index(path)
+    searcher = LeannSearcher(path, embedding_function=embed, reload_interval=0)
+    searcher.load_index()
+    assert not searcher.segmented
+    
+    _index(path).add_documents(make_documents(20, "seg"), ids=[f"seg-{i}" for i in range(20)])
+    searcher.refresh(wait=True)
+    assert searcher.segmented
+    assert searcher.search("seg 4 word4", top_k=1)[0]['id'] == "seg-4"
+
+def test_merged_segment_saved_outside_the_lock(tmp_path, monkeypatch):
+    import threading
+    from leann import LeannBuilder, LeannSearcher
+    root = str(tmp_path / "segmented")
+    index = _index(root, merge_factor=2)
+    index.add_documents(make_documents(10, "one"), ids=[f"one-{i}" for i in range(10)])
+    
+    save_index = LeannBuilder.save_index
+    deleted_meanwhile = []
+    
+    def save_and_delete(builder, path):
+        if len(builder.ids) == 20:
+            # The merged segment: writers on other threads must not block
+            writer = threading.Thread(target=lambda: deleted_meanwhile.append(index.delete(["one-2"])))
+            writer.start()
+            writer.join(timeout=10)
+            assert not writer.is_alive()
+        save_index(builder, path)
+        
+    monkeypatch.setattr(LeannBuilder, 'save_index', save_and_delete)
+    index.add_documents(make_documents(10, "two"), ids=[f"two-{i}" for i in range(10)])
+    assert deleted_meanwhile == [1]
+    assert len(index.segments) == 1
+    
+    # The delete made during the merge is carried over to the merged segment
+    assert "one-2" not in index.ids and len(index.ids) == 19
+    searcher = LeannSearcher(root, embedding_function=embed, reload_interval=0)
+    assert all(hit['id'] != "one-2" for hit in searcher.search("one 2 word2 topic2 item2", top_k=5))
@@ -0,0 +1,64 @@
+import threading
+import numpy as np
+from leann_backend_hnsw.hnsw_backend import HNSWBuilder, HNSWSearcher
+from conftest import embed, make_documents
+
+def _searcher(n=500, dimension=16):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dimension)).astype('float32')
+    builder = HNSWBuilder(dimension=dimension, m=8, ef_construction=40)
+    builder.build_index(vectors, [str(i) for i in range(n)])
+    searcher = HNSWSearcher()
+    searcher.load_sections(builder.get_sections(), builder.documents, builder.metadata, builder.build_params)
+    return searcher, vectors
+
+def test_stats_are_per_call():
+    searcher, vectors = _searcher()
+    searcher.search_ids(vectors[0], top_k=5)
+    first = searcher.get_stats()
+    searcher.search_ids(vectors[0], top_k=5)
+    # Not accumulated across calls
+    assert searcher.get_stats() == first
+    assert first['distance_computations'] > 0
+    searcher.reset_stats()
+    assert searcher.get_stats() == {}
+
+def test_stats_are_per_thread():
+    searcher, vectors = _searcher()
+    seen = {}
+    barrier = threading.Barrier(2)
+    
+    def run(top_k):
+        barrier.wait()
+        for i in range(20):
+            searcher.search_ids(vectors[i], top_k=top_k)
+            seen.setdefault(top_k, []).append(searcher.get_stats()['ef_search'])
+            
+    threads = [threading.Thread(target=run, args=(k,)) for k in (1, 200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Each thread sees the efSearch of its own queries
+    assert len(set(seen[1])) == 1 and len(set(seen[200])) == 1
+    assert seen[1][0] < seen[200][0]
+    # Nothing leaks to a thread that did not search
+    assert searcher.get_stats() == {}
+
+def test_segment_stats_come_from_pool_threads(tmp_path):
+    from leann.segments import SegmentedIndex
+    from leann import LeannSearcher
+    
+    path = str(tmp_path / "segmented")
+    index = SegmentedIndex(path, embedding_function=embed, background_merge=False,
+                           merge_factor=100, min_segment_rows=1)
+    index.add_documents(make_documents(40, "a"))
+    index.add_documents(make_documents(40, "b"))
+    searcher = LeannSearcher(path, embedding_function=embed, reload_interval=0)
+    searcher.load_index()
+    backend = searcher._current_index().backend
+    backend.search_ids(embed("a 3 word3"), top_k=5)
+    stats = backend.get_stats()
+    assert stats['segments'] == 2
+    assert len(stats['segment_stats']) == 2
+    assert all(s['distance_computations'] > 0 for s in stats['segment_stats'])
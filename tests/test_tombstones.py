@@ -0,0 +1,34 @@
+import numpy as np
+from leann import LeannBuilder, LeannSearcher
+from leann.tombstones import save_tombstones, load_tombstones, save_ids, load_ids
+from conftest import embed, make_documents
+
+def test_tombstones_round_trip(tmp_path):
+    path = str(tmp_path / "index")
+    deleted = np.zeros(21, dtype=bool)
+    deleted[[0, 7, 8, 20]] = True
+    save_tombstones(path, deleted)
+    assert np.array_equal(load_tombstones(path, 21), deleted)
+    # Rows added after the bitmap was written are live
+    grown = load_tombstones(path, 30)
+    assert np.array_equal(grown[:21], deleted) and not grown[21:].any()
+    assert not load_tombstones(str(tmp_path / "missing"), 5).any()
+
+def test_ids_round_trip(tmp_path):
+    path = str(tmp_path / "index")
+    save_ids(path, ["a", "b", "c"])
+    assert load_ids(path, 3) == ["a", "b", "c"]
+
+def test_deletes_survive_reopen(tmp_path):
+    path = str(tmp_path / "index")
+    documents = make_documents(30)
+    builder = LeannBuilder(embedding_function=embed, compaction_threshold=1.0)
+    builder.build_index(documents, ids=[f"id-{i}" for i in range(30)])
+    builder.save_index(path)
+    builder.delete(["id-4", "id-5"])
+    builder.save_index(path)
+    
+    reopened = LeannBuilder.open(path, embedding_function=embed)
+    assert reopened.deleted.sum() == 2
+    hits = LeannSearcher(path, embedding_function=embed).search(documents[4], top_k=5)
+    assert "id-4" not in [hit['id'] for hit in hits]
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from leann_backend_hnsw.tuner import tune_hnsw, scale_ef_search, ef_search_for
+from leann_backend_hnsw.hnsw_backend import HNSWBuilder
+
+@pytest.mark.parametrize("n", [0, 1, 3, 20])
+def test_tiny_corpus_does_not_crash(n):
+    embeddings = np.random.default_rng(0).standard_normal((n, 8)).astype('float32')
+    result = tune_hnsw(embeddings, m_values=(8, 16), ef_construction_values=(40,))
+    assert result['skipped'] and result['ef_search'] == {}
+    if n:
+        builder = HNSWBuilder(dimension=8, auto_tune=True)
+        builder.build_index(embeddings, [str(i) for i in range(n)])
+        assert builder.index.ntotal == n
+
+def test_ef_scales_to_corpus_size():
+    embeddings = np.random.default_rng(0).standard_normal((600, 8)).astype('float32')
+    result = tune_hnsw(embeddings, top_ks=(1, 10), sample_size=200, num_queries=20,
+                       m_values=(8,), ef_construction_values=(40,))
+    assert result['sample_size'] == 200 and result['corpus_size'] == 600
+    for k, ef in result['ef_search'].items():
+        assert ef > result['sample_ef_search'][k]
+
+def test_scale_ef_search():
+    assert scale_ef_search({10: 64}, 1000, 1000) == {10: 64}
+    assert scale_ef_search({10: 64}, 10 ** 4, 10 ** 8) == {10: 128}
+    assert ef_search_for(10, scale_ef_search({10: 64}, 10 ** 4, 10 ** 8)) == 128
@@ -19,6 +19,20 @@ import faiss
 from datetime import datetime
 import re
 
+# LEANN packages from this checkout (the app also runs from ultrasearch/)
+for _root in (Path(__file__).resolve().parent, Path(__file__).resolve().parent.parent):
+    if (_root / 'packages' / 'leann-core' / 'src').is_dir():
+        sys.path.insert(0, str(_root / 'packages' / 'leann-core' / 'src'))
+        break
+from leann.governor import ResourceGovernor
+from leann.embeddings import load_embedding_model
+from leann.checkpoint import BuildCheckpoint, checkpoint_path, fingerprint
+from leann.docstore import CompressedStrings, compress_strings, default_codec
+from leann.container import metadata_rows
+from leann.references import ReferencedDocuments
+from leann.ingest import iter_files, load_file
+from leann.results import SearchResults
+
 # Configuration
 DEFAULT_SEARCH_FOLDERS = [
     ".",
@@ -27,97 +41,122 @@ DEFAULT_SEARCH_FOLDERS = [
     "C:/Users/Ibrah/Desktop/Research-Jummana"
 ]
 
-SEARCH_EXTENSIONS = ['.py', '.txt', '.md', '.json', '.yaml', '.yml', '.csv', '.log', '.js', '.html', '.css', '.xml', '.sql', '.java', '.cpp', '.c', '.h']
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+# The index lives in memory; an interrupted build (crash, rerun) resumes from the
+# crawl and embeddings checkpointed next to this path
+INDEX_PATH = str(Path.home() / ".ultrasearch" / "index")
+CHECKPOINT_BATCH_SIZE = 256
+
+@st.cache_resource
+def get_governor() -> ResourceGovernor:
+    """One governor per server, so a build in any session yields to searches in all"""
+    return ResourceGovernor()
 
 class UltraSearch:
     def __init__(self):
+        self.governor = get_governor()
         self.model = None
         self.index = None
         self.documents = []
+        self.metadata = []
+        self.reference_only = False
         self.embeddings = []
         self.folder_stats = {}
+        self.last_timings = {}
         
     def load_model(self):
         """Load the sentence transformer model"""
         if self.model is None:
             with st.spinner("🤖 Loading AI model..."):
-                self.model = SentenceTransformer('all-MiniLM-L6-v2')
+                self.model = SentenceTransformer(EMBEDDING_MODEL)
         return self.model
-    
-    def build_index(self, folders: List[str], max_files: int = 1000):
-        """Build search index from folders"""
+        
+    def build_index(self, folders: List[str], max_files: int = 1000, reference_only: bool = False):
+        """Build search index from folders
+        
+        With reference_only, chunks are byte ranges of their files and only
+        offsets and hashes are kept; result text is read from disk.
+        """
         self.documents = []
+        self.metadata = []
+        self.reference_only = reference_only
         self.embeddings = []
         self.folder_stats = {}
+        texts, metadata = [], []
+        
+        # Files already crawled by an interrupted build of the same folders
+        checkpoint = BuildCheckpoint(checkpoint_path(INDEX_PATH))
+        crawl_key = fingerprint([], folders, max_files, reference_only)
+        crawled = set()
+        saved = checkpoint.load_crawl()
+        if saved and saved[2]['key'] == crawl_key:
+            texts, metadata = saved[0], saved[1]
+            crawled = {tuple(entry) for entry in saved[2]['files']}
+        else:
+            checkpoint.clear()
+        last_save = time.monotonic()
         
-        total_files = 0
-        processed_files = 0
+        def save_crawl():
+            checkpoint.save_inputs(texts, metadata, crawl={'key': crawl_key, 'files': sorted(crawled)})
+        
+        processed_files = len(crawled)
+        folder_files = {folder: sum(1 for done, _ in crawled if done == folder) for folder in folders}
         
         # Count total files first
-        for folder in folders:
-            if not os.path.exists(folder):
-                continue
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if any(file.endswith(ext) for ext in SEARCH_EXTENSIONS):
-                        total_files += 1
+        total_files = sum(1 for _ in iter_files(folders, max_files=max_files))
         
         progress_bar = st.progress(0)
         status_text = st.empty()
         
         # Process files
-        for folder in folders:
-            if not os.path.exists(folder):
+        for folder, file_path in iter_files(folders, max_files=max_files):
+            if (folder, file_path) in crawled:
                 continue
+            try:
+                file_texts, file_metadata = load_file(folder, file_path, max_chunk_size=1000,
+                                                      reference_only=reference_only)
+            except Exception as e:
+                continue
+            texts.extend(file_texts)
+            metadata.extend(file_metadata)
+            
+            folder_files[folder] += 1
+            processed_files += 1
+            crawled.add((folder, file_path))
+            if time.monotonic() - last_save >= checkpoint.interval:
+                save_crawl()
+                last_save = time.monotonic()
                 
-            folder_files = 0
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if any(file.endswith(ext) for ext in SEARCH_EXTENSIONS):
-                        if processed_files >= max_files:
-                            break
-                            
-                        file_path = Path(root) / file
-                        try:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                content = f.read()
-                                
-                            # Chunk content if too large
-                            chunks = self._chunk_text(content, max_chunk_size=1000)
-                            
-                            for i, chunk in enumerate(chunks):
-                                if chunk.strip():
-                                    self.documents.append({
-                                        'file_path': str(file_path),
-                                        'content': chunk,
-                                        'folder': folder,
-                                        'chunk_id': i,
-                                        'file_size': len(content)
-                                    })
-                            
-                            folder_files += 1
-                            processed_files += 1
-                            
-                            # Update progress
-                            progress = processed_files / min(total_files, max_files)
-                            progress_bar.progress(progress)
-                            status_text.text(f"Processing {file_path.name}... ({processed_files}/{min(total_files, max_files)})")
-                            
-                        except Exception as e:
-                            continue
-                            
-            self.folder_stats[folder] = {
-                'files_processed': folder_files,
-                'exists': True
-            }
+            # Update progress
+            progress_bar.progress(min(1.0, processed_files / max(total_files, 1)))
+            status_text.text(f"Processing {Path(file_path).name}... ({processed_files}/{total_files})")
+            
+        self.folder_stats = {
+            folder: {'files_processed': folder_files[folder], 'exists': True}
+            for folder in folders if os.path.exists(folder)
+        }
+        save_crawl()
         
         # Generate embeddings
-        if self.documents:
+        if texts:
             status_text.text("🤖 Generating embeddings...")
-            model = self.load_model()
-            
-            texts = [doc['content'] for doc in self.documents]
-            self.embeddings = model.encode(texts, show_progress_bar=True)
+            # A lower-priority worker process on the governor's thread budget, so
+            # searches keep their torch threads
+            model = load_embedding_model(EMBEDDING_MODEL, 'sentence-transformers',
+                                         self.governor.embedding_options())
+            try:
+                self.embeddings = self._embed_with_checkpoint(model, texts, checkpoint, progress_bar, status_text)
+            finally:
+                model.close()
+                
+            # Text is kept block-compressed, or not at all when it can be read from the files
+            self.metadata = metadata_rows(metadata)
+            if reference_only:
+                self.documents = ReferencedDocuments(self.metadata)
+            else:
+                codec = default_codec()
+                self.documents = CompressedStrings.from_sections(codec, compress_strings(texts, codec))
             
             # Build FAISS index
             status_text.text("🔍 Building search index...")
@@ -130,64 +169,61 @@ class UltraSearch:
             
             status_text.text(f"✅ Index built with {len(self.documents)} documents")
             progress_bar.progress(1.0)
+        checkpoint.clear()
         
         return len(self.documents)
-    
-    def _chunk_text(self, text: str, max_chunk_size: int = 1000) -> List[str]:
-        """Split text into chunks"""
-        if len(text) <= max_chunk_size:
-            return [text]
         
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_size = 0
+    def _embed_with_checkpoint(self, model, texts: List[str], checkpoint: BuildCheckpoint,
+                               progress_bar, status_text) -> np.ndarray:
+        """Embed in batches, saving them periodically so a rerun skips work already done"""
+        # Vectors from another model can't be reused, so it is part of the fingerprint
+        done = checkpoint.open(fingerprint(texts, EMBEDDING_MODEL, 'sentence-transformers'))
+        batches = checkpoint.load()
+        if done:
+            status_text.text(f"♻️ Resuming: {done} chunks already embedded")
         
-        for word in words:
-            if current_size + len(word) + 1 > max_chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_size = len(word)
-            else:
-                current_chunk.append(word)
-                current_size += len(word) + 1
+        for start in range(done, len(texts), CHECKPOINT_BATCH_SIZE):
+            # Wait while searches are running
+            self.governor.throttle()
+            batch = np.asarray(model.encode(texts[start:start + CHECKPOINT_BATCH_SIZE]), dtype='float32')
+            checkpoint.add(batch)
+            batches.append(batch)
+            progress_bar.progress(min(1.0, (start + len(batch)) / len(texts)))
+        checkpoint.flush()
         
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
+        return np.concatenate(batches)
         
-        return chunks
-    
-    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    def search(self, query: str, top_k: int = 10) -> SearchResults:
         """Search using RAG"""
         if not self.index or not self.documents:
             return []
-        
+            
         start_time = time.time()
         
-        # Generate query embedding
-        model = self.load_model()
-        query_embedding = model.encode([query])
-        faiss.normalize_L2(query_embedding)
-        
-        # Search
-        scores, indices = self.index.search(query_embedding, top_k)
+        with self.governor.query():
+            # Generate query embedding
+            model = self.load_model()
+            query_embedding = model.encode([query])
+            faiss.normalize_L2(query_embedding)
+            embed_time = time.time()
+            
+            # Search
+            scores, indices = self.index.search(query_embedding, top_k)
+            ann_time = time.time()
         
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.documents):
-                doc = self.documents[idx]
-                results.append({
-                    'file_path': doc['file_path'],
-                    'content': doc['content'],
-                    'folder': doc['folder'],
-                    'score': float(score),
-                    'chunk_id': doc['chunk_id']
-                })
+        results = SearchResults(scores[0], indices[0], self.documents, self.metadata,
+                                reference_only=self.reference_only)
         
         search_time = time.time() - start_time
         
+        # Per-stage breakdown of search_time (results are read lazily)
+        self.last_timings = {
+            'embedding': embed_time - start_time,
+            'ann_search': ann_time - embed_time
+        }
+        
         return results, search_time
-    
+        
     def get_folder_stats(self) -> Dict[str, Any]:
         """Get statistics about indexed folders"""
         return self.folder_stats
@@ -205,10 +241,10 @@ def main():
     # Initialize session state
     if 'ultra_search' not in st.session_state:
         st.session_state.ultra_search = UltraSearch()
-    
+        
     if 'search_folders' not in st.session_state:
         st.session_state.search_folders = DEFAULT_SEARCH_FOLDERS.copy()
-    
+        
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Configuration")
@@ -225,7 +261,7 @@ def main():
                 if st.button("🗑️", key=f"remove_{i}"):
                     st.session_state.search_folders.pop(i)
                     st.rerun()
-        
+                    
         # Add new folder
         new_folder = st.text_input("Add folder:", placeholder="C:/Users/Ibrah/Desktop/NewFolder")
         if st.button("➕ Add") and new_folder:
@@ -238,16 +274,20 @@ def main():
                     st.warning("⚠️ Already in list")
             else:
                 st.error("❌ Folder not found")
-        
+                
         # Reset folders
         if st.button("🔄 Reset to Default"):
             st.session_state.search_folders = DEFAULT_SEARCH_FOLDERS.copy()
             st.rerun()
-        
+            
         # Search settings
         st.subheader("🔧 Search Settings")
         max_files = st.slider("Max files to index:", 100, 5000, 1000)
         top_k = st.slider("Results to show:", 5, 50, 10)
+        reference_only = st.checkbox(
+            "Reference-only index",
+            help="Store file offsets instead of chunk text; results are read from the files when shown"
+        )
         
         # Build index button
         if st.button("🔨 Build Index", type="primary"):
@@ -255,12 +295,13 @@ def main():
                 with st.spinner("Building search index..."):
                     doc_count = st.session_state.ultra_search.build_index(
                         st.session_state.search_folders, 
-                        max_files
+                        max_files,
+                        reference_only
                     )
                     st.success(f"✅ Index built with {doc_count} documents!")
             else:
                 st.warning("⚠️ Add some folders first")
-    
+                
     # Main content
     col1, col2 = st.columns([2, 1])
     
@@ -282,42 +323,46 @@ def main():
             else:
                 with st.spinner("🔍 Searching..."):
                     results, search_time = st.session_state.ultra_search.search(query, top_k)
-                
+                    
                 if results:
                     st.success(f"✅ Found {len(results)} results in {search_time:.3f}s")
+                    timings = st.session_state.ultra_search.last_timings
+                    st.caption(" • ".join(f"{stage}: {seconds * 1000:.1f}ms" for stage, seconds in timings.items()))
                     
                     # Display results
                     for i, result in enumerate(results):
                         with st.expander(f"📄 {Path(result['file_path']).name} (Score: {result['score']:.3f})"):
+                            if result.get('stale'):
+                                st.warning("⚠️ File changed since indexing; rebuild to refresh this result")
                             st.code(result['content'], language="text")
                             st.text(f"📁 Path: {result['file_path']}")
                             st.text(f"📂 Folder: {result['folder']}")
                             st.text(f"🎯 Score: {result['score']:.3f}")
-                    
+                            
                     # AI Analysis
                     st.subheader("🤖 AI Analysis")
                     analysis = f"Found {len(results)} relevant results for '{query}':\n\n"
                     
-                    # Group by file type
+                    # Group by file type (reads paths and folders only, not chunk text)
                     file_types = {}
-                    folders_found = set()
+                    file_paths = results.field('file_path')
+                    folders_found = set(results.field('folder'))
                     
-                    for result in results:
-                        ext = Path(result['file_path']).suffix
+                    for file_path in file_paths:
+                        ext = Path(file_path).suffix
                         file_types[ext] = file_types.get(ext, 0) + 1
-                        folders_found.add(result['folder'])
-                    
+                        
                     analysis += f"📁 Folders: {len(folders_found)}\n"
                     analysis += f"📄 File types: {', '.join(file_types.keys())}\n\n"
                     
                     if file_types:
                         most_common = max(file_types.items(), key=lambda x: x[1])
                         analysis += f"Most common: {most_common[0]} ({most_common[1]} files)\n\n"
-                    
+                        
                     analysis += "Top matches:\n"
-                    for i, result in enumerate(results[:3]):
-                        analysis += f"{i+1}. {Path(result['file_path']).name} (Score: {result['score']:.3f})\n"
-                    
+                    for i, (file_path, score) in enumerate(zip(file_paths[:3], results.scores[:3])):
+                        analysis += f"{i+1}. {Path(file_path).name} (Score: {score:.3f})\n"
+                        
                     st.write(analysis)
                     
                 else:
@@ -326,7 +371,7 @@ def main():
                     st.text("• Different keywords")
                     st.text("• Build index first")
                     st.text("• Check folder paths")
-    
+                    
     with col2:
         st.header("📊 Index Status")
         
@@ -338,7 +383,7 @@ def main():
                 else:
                     st.error(f"❌ {Path(folder).name}")
                 st.divider()
-        
+                
         # Performance info
         st.header("⚡ Performance")
         st.info("""
@@ -353,7 +398,7 @@ def main():
             st.success(f"✅ Index ready: {len(st.session_state.ultra_search.documents)} documents")
         else:
             st.warning("⚠️ No index built yet")
-    
+            
     # Footer
     st.markdown("---")
     st.markdown("**🚀 UltraSearch** - Lightning Fast RAG Search")